@@ -0,0 +1,142 @@
+import re
+from datetime import datetime, timezone
+
+from app import clients, counter
+
+PREFIX = "agg#"
+TOTALS_ID = "agg#totals"
+TOTAL_ATTRIBUTE = "total"
+UPDATED_ATTRIBUTE = "updated_at"
+# Stream sequence numbers run to 40 digits, past the 38 a DynamoDB number
+# holds, so they are stored as zero-padded strings and compared lexically.
+SEQUENCE_DIGITS = 40
+
+# page_counter, page#about and their #<n> shards; uniques sketches, derived
+# items and anything else written to the table are ignored.
+SOURCE_PATTERN = re.compile(r'(page_counter|page#[a-z0-9][a-z0-9_-]{0,63})(?:#\d+)?')
+
+_deserializer = None
+
+
+def daily_id(day):
+    return f"{PREFIX}daily#{day}"
+
+
+def value(attribute):
+    """Decode one DynamoDB attribute value.
+
+    Counters only ever hold ``{'N': ...}`` and keys ``{'S': ...}``, so those
+    are decoded inline; other shapes go through boto3's TypeDeserializer.
+    """
+    if 'N' in attribute:
+        number = attribute['N']
+        return int(number) if number.lstrip('-').isdigit() else float(number)
+    if 'S' in attribute:
+        return attribute['S']
+    global _deserializer
+    if _deserializer is None:
+        from boto3.dynamodb.types import TypeDeserializer
+        _deserializer = TypeDeserializer()
+    return _deserializer.deserialize(attribute)
+
+
+def changes(records):
+    """Yield ``(record, key, source, delta, day)`` for counter changes.
+
+    ``key`` is the page counter the source item belongs to, with any shard
+    suffix removed. ``delta`` is the difference between the new and old
+    images, so the consumer needs a NEW_AND_OLD_IMAGES stream.
+    """
+    for record in records:
+        change = record['dynamodb']
+        source = value(change['Keys']['ID'])
+        match = SOURCE_PATTERN.fullmatch(source)
+        if not match:
+            continue
+        new = change.get('NewImage', {}).get(counter.COUNT_ATTRIBUTE)
+        old = change.get('OldImage', {}).get(counter.COUNT_ATTRIBUTE)
+        delta = (value(new) if new else 0) - (value(old) if old else 0)
+        if delta == 0:
+            continue
+        created = datetime.fromtimestamp(change['ApproximateCreationDateTime'], timezone.utc)
+        yield record, match.group(1), source, delta, created.strftime('%Y-%m-%d')
+
+
+def apply(client, table_name, records):
+    """Fold stream records into the derived items; return failed sequence numbers.
+
+    Changes are grouped per derived item and source item, and each group is
+    one UpdateItem that adds the summed delta and records the source's
+    highest sequence number in ``seq#<source>``. The write is conditional on
+    that attribute being lower than the group's first sequence number, so a
+    redelivered batch cannot count the same change twice. When the check
+    fails the group is replayed one record at a time, which skips exactly
+    the records that were already applied. A number left by an earlier
+    version, which stored them as N, is overwritten.
+    """
+    groups = {}
+    for record, key, source, delta, day in changes(records):
+        sequence = record['dynamodb']['SequenceNumber'].zfill(SEQUENCE_DIGITS)
+        for item in (TOTALS_ID, daily_id(day)):
+            groups.setdefault((item, source, key), []).append((sequence, delta))
+
+    failed = []
+    for (item, source, key), entries in groups.items():
+        try:
+            try:
+                _add(client, table_name, item, source, key, entries)
+            except Exception as exc:
+                if clients.error_code(exc) != 'ConditionalCheckFailedException':
+                    raise
+                for entry in entries:
+                    try:
+                        _add(client, table_name, item, source, key, [entry])
+                    except Exception as exc:
+                        if clients.error_code(exc) != 'ConditionalCheckFailedException':
+                            raise
+        except Exception as exc:
+            print(f"Failed to update {item} from {source}: {exc!r}")
+            failed.append(min(sequence for sequence, _ in entries))
+    return [str(int(sequence)) for sequence in sorted(set(failed))]
+
+
+def leaderboard(client, table_name, limit=10):
+    """Pages ordered by lifetime visits, read from the single totals item."""
+    item = client.get_item(TableName=table_name, Key={'ID': {'S': TOTALS_ID}}).get('Item', {})
+    return _pages(item)[:limit], value(item[TOTAL_ATTRIBUTE]) if item else 0
+
+
+def daily_totals(client, table_name, day):
+    item = client.get_item(TableName=table_name, Key={'ID': {'S': daily_id(day)}}).get('Item', {})
+    return dict(_pages(item)), value(item[TOTAL_ATTRIBUTE]) if item else 0
+
+
+def _pages(item):
+    counts = [(name, value(attribute)) for name, attribute in item.items()
+              if SOURCE_PATTERN.fullmatch(name)]
+    return sorted(counts, key=lambda pair: (-pair[1], pair[0]))
+
+
+def _add(client, table_name, item, source, key, entries):
+    first = min(sequence for sequence, _ in entries)
+    last = max(sequence for sequence, _ in entries)
+    client.update_item(
+        TableName=table_name,
+        Key={'ID': {'S': item}},
+        UpdateExpression='ADD #key :delta, #total :delta SET #seq = :last, #updated = :now',
+        ConditionExpression=('attribute_not_exists(#seq) OR attribute_type(#seq, :number)'
+                             ' OR #seq < :first'),
+        ExpressionAttributeNames={
+            '#key': key,
+            '#total': TOTAL_ATTRIBUTE,
+            '#seq': f"seq#{source}",
+            '#updated': UPDATED_ATTRIBUTE
+        },
+        ExpressionAttributeValues={
+            ':delta': {'N': str(sum(delta for _, delta in entries))},
+            ':first': {'S': first},
+            ':last': {'S': last},
+            ':number': {'S': 'N'},
+            ':now': {'S': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+        }
+    )
@@ -0,0 +1,59 @@
+import random
+import time
+
+MAX_BATCH_GET = 100
+MAX_BATCH_WRITE = 25
+MAX_ATTEMPTS = 8
+BASE_DELAY = 0.05
+MAX_DELAY = 1.0
+
+
+def batch_get(client, table_name, keys, projection=None, names=None,
+              consistent=False):
+    """Fetch ``keys`` with as few BatchGetItem calls as possible.
+
+    Keys are sent in chunks of 100, the BatchGetItem limit. Unprocessed
+    keys are retried with jittered exponential backoff; missing items are
+    simply absent from the result.
+    """
+    items = []
+    for start in range(0, len(keys), MAX_BATCH_GET):
+        request = {'Keys': keys[start:start + MAX_BATCH_GET], 'ConsistentRead': consistent}
+        if projection:
+            request['ProjectionExpression'] = projection
+        if names:
+            request['ExpressionAttributeNames'] = names
+        pending = {table_name: request}
+        attempt = 0
+        while pending:
+            if attempt:
+                if attempt >= MAX_ATTEMPTS:
+                    raise RuntimeError(
+                        f"BatchGetItem left keys unprocessed after {attempt} attempts")
+                time.sleep(random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt)))
+            response = client.batch_get_item(RequestItems=pending)
+            items.extend(response['Responses'].get(table_name, []))
+            pending = response.get('UnprocessedKeys')
+            attempt += 1
+    return items
+
+
+def batch_write(client, table_name, items):
+    """Put ``items`` with BatchWriteItem in chunks of 25, the API limit.
+
+    Unprocessed items are retried with the same jittered backoff as
+    ``batch_get``.
+    """
+    for start in range(0, len(items), MAX_BATCH_WRITE):
+        pending = {table_name: [{'PutRequest': {'Item': item}}
+                                for item in items[start:start + MAX_BATCH_WRITE]]}
+        attempt = 0
+        while pending:
+            if attempt:
+                if attempt >= MAX_ATTEMPTS:
+                    raise RuntimeError(
+                        f"BatchWriteItem left items unprocessed after {attempt} attempts")
+                time.sleep(random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt)))
+            response = client.batch_write_item(RequestItems=pending)
+            pending = response.get('UnprocessedItems')
+            attempt += 1
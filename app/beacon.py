@@ -0,0 +1,103 @@
+import base64
+import json
+import os
+import re
+import secrets
+import time
+from datetime import datetime, timezone
+
+from app import batch, pages, visits
+
+CLIENT_PATTERN = re.compile(r'[0-9a-f]{8,64}')
+TTL_ATTRIBUTE = "ExpiresAt"
+
+
+def events_table():
+    return os.getenv('BEACON_EVENTS_TABLE')
+
+
+def parse(event, now=None):
+    """Validated ``(key, timestamp, client)`` tuples from a beacon request.
+
+    The body is ``{"events": [{"page": "about", "ts": 1792221729,
+    "client": "<hex>"}, ...]}``; ``page`` and ``client`` are optional.
+    Any invalid entry rejects the whole beacon, so nothing is written for
+    a malformed request.
+    """
+    now = time.time() if now is None else now
+    max_events = int(os.getenv('BEACON_MAX_EVENTS', '100'))
+    max_age = int(os.getenv('BEACON_MAX_AGE', '86400'))
+
+    body = event.get('body') or ''
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    try:
+        entries = json.loads(body)['events']
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Body must be a JSON object with an 'events' list")
+    if not isinstance(entries, list) or not 0 < len(entries) <= max_events:
+        raise ValueError(f"A beacon must carry between 1 and {max_events} events")
+
+    parsed = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise ValueError("Each event must be a JSON object")
+        page = entry.get('page')
+        timestamp = entry.get('ts')
+        client = entry.get('client')
+        if page is not None and not isinstance(page, str):
+            raise ValueError("'page' must be a string")
+        if (not isinstance(timestamp, int) or isinstance(timestamp, bool)
+                or not now - max_age <= timestamp <= now + 300):
+            raise ValueError("'ts' must be a recent Unix timestamp in seconds")
+        if client is not None and not (isinstance(client, str)
+                                       and CLIENT_PATTERN.fullmatch(client)):
+            raise ValueError("'client' must be a hex digest")
+        parsed.append((pages.key_for(pages.validate(page) if page else None),
+                       timestamp, client))
+    return parsed
+
+
+def record(client, table_name, entries):
+    """Apply parsed beacon events with one counter update per key.
+
+    Each key's visits are added at once, and each rollup bucket gets one
+    update for the views that fall in it. When ``BEACON_EVENTS_TABLE`` is
+    set, the raw events are also stored there with BatchWriteItem.
+
+    A beacon is sent once and not retried, so a failed write does not
+    stop the others: it is logged, and the keys whose visits could not be
+    counted are returned.
+    """
+    grouped = {}
+    for key, timestamp, _ in entries:
+        grouped.setdefault(key, []).append(datetime.fromtimestamp(timestamp, timezone.utc))
+
+    failed = []
+    for key, moments in grouped.items():
+        try:
+            visits.record_many(client, table_name, key, moments)
+        except Exception as exc:
+            print(f"Failed to record {len(moments)} beacon visits to {key}: {exc!r}")
+            failed.append(key)
+
+    if events_table():
+        try:
+            batch.batch_write(client, events_table(), [_item(*entry) for entry in entries])
+        except Exception as exc:
+            print(f"Failed to store {len(entries)} beacon events: {exc!r}")
+    return failed
+
+
+def _item(key, timestamp, client):
+    item = {
+        'ID': {'S': key},
+        # The random suffix keeps events with the same second apart.
+        'EventAt': {'S': f"{timestamp:010d}#{secrets.token_hex(4)}"}
+    }
+    if client:
+        item['client'] = {'S': client}
+    retention = int(os.getenv('BEACON_EVENT_RETENTION', str(30 * 86400)))
+    if retention:
+        item[TTL_ATTRIBUTE] = {'N': str(timestamp + retention)}
+    return item
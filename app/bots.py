@@ -0,0 +1,61 @@
+import functools
+import os
+import re
+
+from app import events
+
+# Tokens found in lowercased crawler, monitor and HTTP library user
+# agents. ``bot`` is not matched after ``cu`` so Cubot phones are still
+# counted; the lookbehind sits after the ``b`` so it only runs there.
+# Case-insensitive matching and leading lookbehinds make ``re`` several
+# times slower, see ``benchmarks/bots.py``.
+BOT_PATTERN = re.compile(
+    r'b(?<!cub)ot|crawl|spider|slurp|scrap|archiver|fetcher|facebookexternalhit'
+    r'|headless|phantomjs|lighthouse|pagespeed|pingdom|uptime|monitor|checker'
+    r'|curl/|wget/|httpie/|python-|aiohttp|httpx|go-http-client|java/|okhttp'
+    r'|apache-httpclient|libwww|node-fetch|axios/|undici|postman|insomnia'
+    r'|selenium|puppeteer|playwright|feedparser|rss')
+# Only this much of a user agent is matched and cached.
+MAX_USER_AGENT = 512
+
+
+def enabled():
+    return os.getenv('BOT_FILTER', '0') == '1'
+
+
+def classify(event):
+    """Why a request should not be counted as a visit, or None.
+
+    Looks only at the request, so it costs no I/O. The user agent is
+    matched against ``BOT_PATTERN``; a browser user agent that comes
+    without ``Accept-Language``, which every browser sends, is taken for
+    a script, and prefetches are not visits.
+    """
+    user_agent = _header(event, 'User-Agent')
+    if not user_agent:
+        return 'no-user-agent'
+    if _matches(user_agent[:MAX_USER_AGENT]):
+        return 'user-agent'
+    purpose = _header(event, 'Sec-Purpose', scan=False) or _header(event, 'Purpose', scan=False)
+    if purpose and purpose.startswith('prefetch'):
+        return 'prefetch'
+    if _header(event, 'Accept-Language') is None:
+        return 'headers'
+    return None
+
+
+def _header(event, name, scan=True):
+    # Browsers send headers title-cased over HTTP/1.1 and lowercased over
+    # HTTP/2; only other spellings pay for the case-insensitive scan.
+    headers = event.get('headers') or {}
+    value = headers.get(name)
+    if value is None:
+        value = headers.get(name.lower())
+    if value is None and scan and headers:
+        value = events.header(event, name)
+    return value
+
+
+@functools.lru_cache(maxsize=4096)
+def _matches(user_agent):
+    return BOT_PATTERN.search(user_agent.lower()) is not None
@@ -0,0 +1,121 @@
+import os
+import threading
+
+from app import metrics
+
+_lock = threading.Lock()
+_clients = {}
+_session = None
+_config = None
+
+
+def get(service):
+    """Return the shared client for ``service``, creating it on first use."""
+    client = _clients.get(service)
+    if client is None:
+        with _lock:
+            client = _clients.get(service)
+            if client is None:
+                client = _clients[service] = _create(service)
+    return client
+
+
+def dynamodb():
+    return get('dynamodb')
+
+
+def error_code(exc):
+    """Error code of a botocore ClientError or a dynamodb_lite error."""
+    return (getattr(exc, 'response', None) or {}).get('Error', {}).get('Code')
+
+
+def register(service, client):
+    """Use ``client`` for ``service`` instead of creating one."""
+    with _lock:
+        _clients[service] = client
+
+
+def configure(config):
+    """Use ``config`` for clients created from now on."""
+    global _config
+    with _lock:
+        _config = config
+
+
+def reset():
+    global _session, _config
+    with _lock:
+        _clients.clear()
+        _session = None
+        _config = None
+
+
+def preload(services=('dynamodb',)):
+    """Load the service models clients will need into the session cache.
+
+    Meant to be called during the init phase so the first invocation does
+    not pay for reading and parsing the model files.
+    """
+    session = _get_session()
+    loader = session.get_component('data_loader')
+    for service in services:
+        session.get_service_model(service)
+        loader.load_service_model(service, 'endpoint-rule-set-1')
+
+
+def client_config():
+    from botocore.config import Config
+
+    return Config(
+        connect_timeout=float(os.getenv('DDB_CONNECT_TIMEOUT', '2')),
+        read_timeout=float(os.getenv('DDB_READ_TIMEOUT', '5')),
+        max_pool_connections=int(os.getenv('DDB_MAX_POOL_CONNECTIONS', '10')),
+        retries={
+            'mode': os.getenv('DDB_RETRY_MODE', 'standard'),
+            'total_max_attempts': int(os.getenv('DDB_MAX_ATTEMPTS', '3'))
+        },
+        tcp_keepalive=True
+    )
+
+
+def service_config():
+    """Config for services other than DynamoDB.
+
+    The ``DDB_*`` settings are tuned per function for DynamoDB; with
+    ``DDB_RESILIENCE=1`` they turn botocore's retries off, which would
+    leave an SQS ``SendMessage`` without any. Other services keep
+    botocore's standard retries.
+    """
+    from botocore.config import Config
+
+    return Config(
+        connect_timeout=2,
+        read_timeout=5,
+        retries={'mode': 'standard'},
+        tcp_keepalive=True
+    )
+
+
+def _get_session():
+    global _session
+    if _session is None:
+        import botocore.session
+
+        _session = botocore.session.get_session()
+    return _session
+
+
+def _create(service):
+    if service == 'dynamodb' and os.getenv('DYNAMODB_CLIENT', 'boto3') == 'lite':
+        from app.dynamodb_lite import DynamoDBClient
+
+        return DynamoDBClient.from_environment()
+
+    import boto3.session
+
+    session = boto3.session.Session(botocore_session=_get_session())
+    config = _config or (client_config() if service == 'dynamodb' else service_config())
+    client = session.client(service, config=config)
+    if service == 'dynamodb' and metrics.enabled():
+        metrics.attach(client)
+    return client
@@ -0,0 +1,77 @@
+import base64
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the bundle
+    brotli = None
+
+
+def min_size():
+    return int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+
+
+def available():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate(accept_encoding):
+    """Pick the encoding to use for an ``Accept-Encoding`` header, or None.
+
+    Codings with ``q=0`` are refused. Among the acceptable codings the
+    client's highest q-value wins, with brotli preferred over gzip on a tie.
+    """
+    weights = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        quality = 1.0
+        name, _, value = params.strip().partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        if coding:
+            weights[coding] = quality
+
+    best = None
+    for coding in available():
+        quality = weights.get(coding, weights.get('*', 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (coding, quality)
+    return best[0] if best else None
+
+
+def compress(response, accept_encoding):
+    """Compress ``response`` in place when it is large enough and accepted.
+
+    Bodies shorter than ``COMPRESSION_MIN_SIZE`` bytes are left alone, since
+    the headers and base64 overhead would outweigh the saving. Larger
+    bodies always get ``Vary: Accept-Encoding`` so shared caches keep the
+    compressed and plain variants apart.
+    """
+    body = response.get('body')
+    if not body or response.get('isBase64Encoded') or min_size() <= 0:
+        return response
+    data = body.encode()
+    if len(data) < min_size():
+        return response
+
+    headers = response.setdefault('headers', {})
+    headers['Vary'] = 'Accept-Encoding'
+    coding = negotiate(accept_encoding)
+    if coding is None:
+        return response
+
+    if coding == 'br':
+        encoded = brotli.compress(
+            data, quality=int(os.getenv('COMPRESSION_BROTLI_QUALITY', '4')))
+    else:
+        encoded = gzip.compress(
+            data, compresslevel=int(os.getenv('COMPRESSION_LEVEL', '6')), mtime=0)
+    headers['Content-Encoding'] = coding
+    response['body'] = base64.b64encode(encoded).decode()
+    response['isBase64Encoded'] = True
+    return response
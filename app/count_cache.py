@@ -0,0 +1,38 @@
+import os
+import threading
+import time
+
+from app import counter
+
+
+class CountCache:
+    """Serves counter totals read within the last ``COUNT_CACHE_TTL`` seconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, client, table_name, key):
+        ttl = float(os.getenv('COUNT_CACHE_TTL', '5'))
+        with self._lock:
+            entry = self._entries.get((table_name, key))
+        if entry is not None and time.monotonic() - entry[1] < ttl:
+            return entry[0]
+
+        count = counter.read_total(client, table_name, key)
+        with self._lock:
+            self._entries[(table_name, key)] = (count, time.monotonic())
+        return count
+
+    def last(self, table_name, key):
+        """The most recent total read for ``key``, however old, or None."""
+        with self._lock:
+            entry = self._entries.get((table_name, key))
+        return entry[0] if entry else None
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = CountCache()
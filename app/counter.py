@@ -0,0 +1,118 @@
+import os
+import random
+
+from app import batch
+
+DEFAULT_KEY = "page_counter"
+COUNT_ATTRIBUTE = "count"
+
+
+def shard_count():
+    return max(1, int(os.getenv('COUNTER_SHARDS', '1')))
+
+
+def shard_keys(key, shards):
+    return [f"{key}#{i}" for i in range(shards)]
+
+
+def increment(client, table_name, key=DEFAULT_KEY, amount=1, shards=None):
+    """Add ``amount`` to the counter and return the new total.
+
+    With a single shard the counter is the ``key`` item itself. With more
+    shards each increment lands on a random ``key#i`` item so writes are
+    spread over several partitions, and the total is rebuilt from the
+    shards plus the legacy unsharded item with a strongly consistent
+    read, so a caller's successive totals never go down. Only a failed
+    write raises: once it is applied, a failed read of the other shards
+    is logged and None is returned, so callers never retry visits
+    already counted.
+    """
+    shards = shard_count() if shards is None else shards
+    if shards <= 1:
+        return _add(client, table_name, key, amount)
+
+    shard = random.choice(shard_keys(key, shards))
+    total = _add(client, table_name, shard, amount)
+    others = [key] + [k for k in shard_keys(key, shards) if k != shard]
+    try:
+        counts = _get_counts(client, table_name, others, consistent=True)
+        return total + sum(counts.values())
+    except Exception as exc:
+        print(f"Counted {amount} visits to {key} but could not read the total: {exc!r}")
+        return None
+
+
+def read_total(client, table_name, key=DEFAULT_KEY, shards=None,
+               consistent=False):
+    shards = shard_count() if shards is None else shards
+    if shards > 1:
+        return read_totals(client, table_name, [key], shards, consistent)[key]
+
+    response = client.get_item(
+        TableName=table_name,
+        Key={'ID': {'S': key}},
+        ProjectionExpression="#attrName",
+        ExpressionAttributeNames={"#attrName": COUNT_ATTRIBUTE},
+        ConsistentRead=consistent
+    )
+    return int(response.get('Item', {}).get(COUNT_ATTRIBUTE, {}).get('N', 0))
+
+
+def read_totals(client, table_name, keys, shards=None, consistent=False):
+    """Totals for several counters, read together in one batched fetch."""
+    shards = shard_count() if shards is None else shards
+    items = {}
+    for key in dict.fromkeys(keys):
+        items[key] = [key] if shards <= 1 else [key] + shard_keys(key, shards)
+    counts = _get_counts(client, table_name,
+                         [item for group in items.values() for item in group],
+                         consistent)
+    return {key: sum(counts[item] for item in group) for key, group in items.items()}
+
+
+def increment_update(table_name, key=DEFAULT_KEY, amount=1, shards=None):
+    """The Update for adding ``amount`` to ``key``'s counter, for a transaction.
+
+    With several shards the update lands on a random shard, as in
+    ``increment``.
+    """
+    shards = shard_count() if shards is None else shards
+    if shards > 1:
+        key = random.choice(shard_keys(key, shards))
+    return _update(table_name, key, amount)
+
+
+def _add(client, table_name, key, amount):
+    response = client.update_item(**_update(table_name, key, amount),
+                                  ReturnValues="UPDATED_NEW")
+    return int(response['Attributes'][COUNT_ATTRIBUTE]['N'])
+
+
+def _update(table_name, key, amount):
+    return {
+        'TableName': table_name,
+        'Key': {
+            'ID': {'S': key}
+        },
+        'UpdateExpression': "SET #attrName = if_not_exists(#attrName, :start) + :inc",
+        'ExpressionAttributeNames': {
+            "#attrName": COUNT_ATTRIBUTE
+        },
+        'ExpressionAttributeValues': {
+            ":start": {"N": "0"},
+            ":inc": {"N": str(amount)}
+        }
+    }
+
+
+def _get_counts(client, table_name, keys, consistent=False):
+    counts = dict.fromkeys(keys, 0)
+    items = batch.batch_get(
+        client, table_name, [{'ID': {'S': k}} for k in counts],
+        projection="ID, #attrName", names={"#attrName": COUNT_ATTRIBUTE},
+        consistent=consistent
+    )
+    for item in items:
+        if COUNT_ATTRIBUTE in item:
+            counts[item['ID']['S']] = int(item[COUNT_ATTRIBUTE]['N'])
+    return counts
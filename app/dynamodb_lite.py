@@ -0,0 +1,207 @@
+"""Minimal DynamoDB data-plane client that avoids importing boto3.
+
+Speaks the DynamoDB JSON protocol over a small pool of keep-alive HTTPS
+connections and signs requests with SigV4. Methods take and return the
+same shapes as the boto3 client, so it can be swapped in through
+``DYNAMODB_CLIENT=lite``.
+"""
+import base64
+import hashlib
+import hmac
+import http.client
+import json
+import os
+import queue
+import time
+from urllib.parse import urlsplit
+
+from app import metrics
+
+SERVICE = 'dynamodb'
+TARGET_PREFIX = 'DynamoDB_20120810.'
+CONTENT_TYPE = 'application/x-amz-json-1.0'
+# How a keep-alive connection the server has already closed fails. Only
+# these are retried, and only on a pooled connection.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError,
+                           BrokenPipeError)
+
+
+class DynamoDBError(Exception):
+    """Error returned by DynamoDB, shaped like botocore's ClientError."""
+
+    def __init__(self, code, message, status_code, operation, reasons=None):
+        super().__init__(f"An error occurred ({code}) when calling the "
+                         f"{operation} operation: {message}")
+        self.operation_name = operation
+        self.response = {
+            'Error': {'Code': code, 'Message': message},
+            'ResponseMetadata': {'HTTPStatusCode': status_code}
+        }
+        if reasons is not None:
+            self.response['CancellationReasons'] = reasons
+
+
+class DynamoDBClient:
+    def __init__(self, region, access_key, secret_key, session_token=None,
+                 endpoint_url=None, timeout=5.0, max_connections=10):
+        self.region = region
+        self._access_key = access_key
+        self._secret_key = secret_key
+        self._session_token = session_token
+        url = urlsplit(endpoint_url or f"https://dynamodb.{region}.amazonaws.com")
+        self._secure = url.scheme == 'https'
+        self._host = url.hostname
+        self._port = url.port
+        self._host_header = url.netloc
+        self._timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=max_connections)
+        self._signing_key = None
+
+    @classmethod
+    def from_environment(cls):
+        region = os.getenv('AWS_REGION') or os.getenv('AWS_DEFAULT_REGION')
+        return cls(
+            region=region,
+            access_key=os.environ['AWS_ACCESS_KEY_ID'],
+            secret_key=os.environ['AWS_SECRET_ACCESS_KEY'],
+            session_token=os.getenv('AWS_SESSION_TOKEN'),
+            endpoint_url=(os.getenv('AWS_ENDPOINT_URL_DYNAMODB')
+                          or os.getenv('AWS_ENDPOINT_URL')),
+            timeout=float(os.getenv('DDB_READ_TIMEOUT', '5')),
+            max_connections=int(os.getenv('DDB_MAX_POOL_CONNECTIONS', '10'))
+        )
+
+    def update_item(self, **params):
+        return self._call('UpdateItem', params)
+
+    def get_item(self, **params):
+        return self._call('GetItem', params)
+
+    def batch_get_item(self, **params):
+        return self._call('BatchGetItem', params)
+
+    def batch_write_item(self, **params):
+        return self._call('BatchWriteItem', params)
+
+    def transact_write_items(self, **params):
+        return self._call('TransactWriteItems', params)
+
+    def query(self, **params):
+        return self._call('Query', params)
+
+    def describe_table(self, **params):
+        return self._call('DescribeTable', params)
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _call(self, operation, params):
+        started = time.perf_counter()
+        try:
+            return self._send(operation, params)
+        finally:
+            metrics.api_call(operation, started)
+
+    def _send(self, operation, params):
+        body = json.dumps(params, separators=(',', ':'), default=_encode_blob).encode()
+        headers = self._sign(operation, body)
+
+        while True:
+            connection, pooled = self._acquire()
+            try:
+                connection.request('POST', '/', body, headers)
+                response = connection.getresponse()
+                data = response.read()
+            except STALE_CONNECTION_ERRORS:
+                connection.close()
+                # The server closed a pooled keep-alive connection before
+                # answering; the request never reached it, so send it again.
+                if pooled:
+                    continue
+                raise
+            except BaseException:
+                # Anything else, a timeout included, may come after the
+                # server applied the request, so it is never resent.
+                connection.close()
+                raise
+            self._release(connection, response)
+            break
+
+        if response.status != 200:
+            error = json.loads(data or b'{}')
+            code = error.get('__type', 'UnknownError').rpartition('#')[2]
+            message = error.get('message') or error.get('Message', '')
+            raise DynamoDBError(code, message, response.status, operation,
+                                error.get('CancellationReasons'))
+        return json.loads(data)
+
+    def _acquire(self):
+        """A ``(connection, pooled)`` pair, reusing an idle connection if any."""
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            cls = http.client.HTTPSConnection if self._secure else http.client.HTTPConnection
+            return cls(self._host, self._port, timeout=self._timeout), False
+
+    def _release(self, connection, response):
+        if response.will_close:
+            connection.close()
+            return
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _sign(self, operation, body):
+        now = time.gmtime()
+        amz_date = time.strftime('%Y%m%dT%H%M%SZ', now)
+        date = amz_date[:8]
+        headers = {
+            'content-type': CONTENT_TYPE,
+            'host': self._host_header,
+            'x-amz-date': amz_date,
+            'x-amz-target': TARGET_PREFIX + operation,
+        }
+        if self._session_token:
+            headers['x-amz-security-token'] = self._session_token
+
+        signed_headers = ';'.join(sorted(headers))
+        canonical_request = '\n'.join((
+            'POST', '/', '',
+            ''.join(f'{name}:{headers[name]}\n' for name in sorted(headers)),
+            signed_headers,
+            hashlib.sha256(body).hexdigest()
+        ))
+        scope = f'{date}/{self.region}/{SERVICE}/aws4_request'
+        string_to_sign = '\n'.join((
+            'AWS4-HMAC-SHA256', amz_date, scope,
+            hashlib.sha256(canonical_request.encode()).hexdigest()
+        ))
+        signature = hmac.new(self._key_for(date), string_to_sign.encode(),
+                             hashlib.sha256).hexdigest()
+        headers['authorization'] = (
+            f'AWS4-HMAC-SHA256 Credential={self._access_key}/{scope}, '
+            f'SignedHeaders={signed_headers}, Signature={signature}'
+        )
+        return headers
+
+    def _key_for(self, date):
+        if self._signing_key is None or self._signing_key[0] != date:
+            key = ('AWS4' + self._secret_key).encode()
+            for part in (date, self.region, SERVICE, 'aws4_request'):
+                key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+            self._signing_key = (date, key)
+        return self._signing_key[1]
+
+
+def _encode_blob(value):
+    # Binary attribute values travel base64-encoded in the JSON protocol.
+    # Responses are not decoded back, so callers reading B values from
+    # this client receive the base64 string.
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,29 @@
+import hashlib
+import os
+
+
+def header(event, name):
+    """Case-insensitive lookup of a request header in an API Gateway event."""
+    headers = event.get('headers') or {}
+    value = headers.get(name)
+    if value is None:
+        name = name.lower()
+        for key, candidate in headers.items():
+            if key.lower() == name:
+                return candidate
+    return value
+
+
+def source_ip(event):
+    identity = (event.get('requestContext') or {}).get('identity') or {}
+    return identity.get('sourceIp') or ''
+
+
+def client_fingerprint(event):
+    """Salted digest of the caller's IP and user agent.
+
+    Only the digest is stored, so raw IP addresses never reach the table.
+    """
+    salt = os.getenv('FINGERPRINT_SALT', '')
+    material = '\n'.join((salt, source_ip(event), header(event, 'User-Agent') or ''))
+    return hashlib.sha256(material.encode()).digest()
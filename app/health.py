@@ -0,0 +1,49 @@
+import os
+import threading
+import time
+
+SENTINEL_KEY = "health#sentinel"
+
+_lock = threading.Lock()
+_last_check = None
+
+
+def mode():
+    return os.getenv('HEALTH_MODE', 'deep')
+
+
+def debug():
+    return os.getenv('HEALTH_DEBUG', '0') == '1'
+
+
+def check(client, table_name):
+    """Return True when the table answers a data-plane read.
+
+    The probe is an eventually consistent GetItem on a key that is never
+    written, which costs half a read unit. Its result is reused for
+    ``HEALTH_CHECK_INTERVAL`` seconds so frequent pollers cannot use up the
+    table's read capacity.
+    """
+    global _last_check
+    interval = float(os.getenv('HEALTH_CHECK_INTERVAL', '5'))
+    with _lock:
+        if _last_check is not None and time.monotonic() - _last_check[1] < interval:
+            return _last_check[0]
+
+    try:
+        client.get_item(TableName=table_name, Key={'ID': {'S': SENTINEL_KEY}},
+                        ProjectionExpression='ID')
+        healthy = True
+    except Exception as exc:
+        print(f"Health check against {table_name} failed: {exc!r}")
+        healthy = False
+
+    with _lock:
+        _last_check = (healthy, time.monotonic())
+    return healthy
+
+
+def reset():
+    global _last_check
+    with _lock:
+        _last_check = None
@@ -0,0 +1,88 @@
+"""HyperLogLog cardinality sketch with 6-bit registers.
+
+With ``PRECISION = 10`` there are m = 1024 registers and the sketch
+serialises to 768 bytes, small enough that the DynamoDB item holding it
+costs one write unit. The relative standard error is 1.04 / sqrt(m),
+about 3.25%: roughly two estimates in three fall within 3.25% of the
+true count, and 99.7% within 9.75%. Below 2.5 * m (about 2560) distinct
+values, linear counting is used instead, and it is more accurate there.
+"""
+import hashlib
+import math
+
+PRECISION = 10
+REGISTERS = 1 << PRECISION
+SIZE = REGISTERS * 6 // 8
+_VALUE_BITS = 64 - PRECISION
+RELATIVE_ERROR = 1.04 / math.sqrt(REGISTERS)
+_ALPHA = 0.7213 / (1 + 1.079 / REGISTERS)
+_INVERSE_POWERS = [2.0 ** -rank for rank in range(64)]
+
+
+def hash64(value):
+    """64-bit hash of a str or bytes value."""
+    if isinstance(value, str):
+        value = value.encode()
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    __slots__ = ('registers',)
+
+    def __init__(self, registers=None):
+        self.registers = bytearray(registers) if registers else bytearray(REGISTERS)
+
+    def add(self, value):
+        return self.add_hash(hash64(value))
+
+    def add_hash(self, hashed):
+        """Fold a 64-bit hash in; return True if a register changed."""
+        index = hashed >> _VALUE_BITS
+        rank = _VALUE_BITS - (hashed & ((1 << _VALUE_BITS) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def would_change(self, hashed):
+        index = hashed >> _VALUE_BITS
+        rank = _VALUE_BITS - (hashed & ((1 << _VALUE_BITS) - 1)).bit_length() + 1
+        return rank > self.registers[index]
+
+    def merge(self, other):
+        """Register-wise maximum; the result counts the union of both."""
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def copy(self):
+        return HyperLogLog(self.registers)
+
+    def estimate(self):
+        harmonic = math.fsum(map(_INVERSE_POWERS.__getitem__, self.registers))
+        raw = _ALPHA * REGISTERS * REGISTERS / harmonic
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * REGISTERS and zeros:
+            return round(REGISTERS * math.log(REGISTERS / zeros))
+        return round(raw)
+
+    def to_bytes(self):
+        out = bytearray(SIZE)
+        r = self.registers
+        for i, o in zip(range(0, REGISTERS, 4), range(0, SIZE, 3)):
+            packed = r[i] << 18 | r[i + 1] << 12 | r[i + 2] << 6 | r[i + 3]
+            out[o:o + 3] = packed.to_bytes(3, 'big')
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) != SIZE:
+            raise ValueError(f"Expected {SIZE} bytes, got {len(data)}")
+        registers = bytearray(REGISTERS)
+        for i, o in zip(range(0, REGISTERS, 4), range(0, SIZE, 3)):
+            packed = int.from_bytes(data[o:o + 3], 'big')
+            registers[i:i + 4] = bytes((packed >> 18, packed >> 12 & 63,
+                                        packed >> 6 & 63, packed & 63))
+        return cls(registers)
+
+    def __eq__(self, other):
+        return isinstance(other, HyperLogLog) and self.registers == other.registers
@@ -0,0 +1,154 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from app import clients, counter, events, rollups
+
+KEY_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,128}')
+TTL_ATTRIBUTE = "ExpiresAt"
+
+_lock = threading.Lock()
+_recent = OrderedDict()
+_totals = {}
+_warned_unsupported = False
+
+
+def enabled():
+    """Whether ``IDEMPOTENCY=1`` is in effect.
+
+    Buffered and queued visits are not written through ``record``, so the
+    setting is refused, with one log line, when ``VISIT_BUFFERING=1`` or
+    ``VISIT_INGEST_MODE=queue`` rather than silently counting repeats.
+    """
+    if os.getenv('IDEMPOTENCY', '0') != '1':
+        return False
+    if os.getenv('VISIT_BUFFERING', '0') == '1' or os.getenv('VISIT_INGEST_MODE') == 'queue':
+        global _warned_unsupported
+        if not _warned_unsupported:
+            _warned_unsupported = True
+            print("IDEMPOTENCY=1 is ignored: it cannot be combined with "
+                  "VISIT_BUFFERING=1 or VISIT_INGEST_MODE=queue")
+        return False
+    return True
+
+
+def item_id(idempotency_key):
+    return f"idem#{idempotency_key}"
+
+
+def key_from_event(event):
+    """The ``Idempotency-Key`` header, else API Gateway's request ID, or None."""
+    supplied = events.header(event, 'Idempotency-Key')
+    if supplied is not None:
+        if not KEY_PATTERN.fullmatch(supplied):
+            raise ValueError("Idempotency-Key must be 1-128 letters, digits, '-' or '_'")
+        return f"client#{supplied}"
+    request_id = (event.get('requestContext') or {}).get('requestId')
+    return f"request#{request_id}" if request_id else None
+
+
+def record(client, table_name, key, idempotency_key, now=None):
+    """Count one visit unless ``idempotency_key`` was already seen.
+
+    Returns ``(count, duplicate)``. Duplicates this container has already
+    seen within ``IDEMPOTENCY_CACHE_TTL`` are answered from memory. Other
+    visits are written with a single TransactWriteItems: a Put of an
+    ``idem#<key>`` record, conditional on it not existing and expiring
+    after ``IDEMPOTENCY_TTL`` seconds, together with the counter and rollup
+    updates. When another container already wrote the record, the whole
+    transaction is cancelled and nothing is counted.
+
+    Transactions return no attributes, so the count is the container's
+    last read total plus the visits it has added since; it is re-read at
+    most every ``IDEMPOTENCY_COUNT_TTL`` seconds. Once the transaction has
+    run a failed re-read is not raised, since the visit is already
+    counted; the count is None instead.
+    """
+    cached = _seen(idempotency_key)
+    if cached is not None:
+        return cached, True
+
+    epoch = int(time.time())
+    items = [{'Put': {
+        'TableName': table_name,
+        'Item': {
+            'ID': {'S': item_id(idempotency_key)},
+            TTL_ATTRIBUTE: {'N': str(epoch + int(os.getenv('IDEMPOTENCY_TTL', '86400')))}
+        },
+        # TTL deletion lags expiry, so an expired record counts as absent.
+        'ConditionExpression': 'attribute_not_exists(ID) OR #ttl < :now',
+        'ExpressionAttributeNames': {'#ttl': TTL_ATTRIBUTE},
+        'ExpressionAttributeValues': {':now': {'N': str(epoch)}}
+    }}, {'Update': counter.increment_update(table_name, key)}]
+    if rollups.enabled():
+        items.extend({'Update': update} for update in rollups.updates(key, 1, now))
+
+    duplicate = False
+    try:
+        client.transact_write_items(TransactItems=items)
+    except Exception as exc:
+        if not _conflicts(exc):
+            raise
+        duplicate = True
+
+    try:
+        count = _total(client, table_name, key, 0 if duplicate else 1)
+    except Exception as exc:
+        print(f"Recorded {idempotency_key} but could not read the total: {exc!r}")
+        return None, duplicate
+    _remember(idempotency_key, count)
+    return count, duplicate
+
+
+def reset():
+    global _warned_unsupported
+    with _lock:
+        _recent.clear()
+        _totals.clear()
+        _warned_unsupported = False
+
+
+def _conflicts(exc):
+    if clients.error_code(exc) != 'TransactionCanceledException':
+        return False
+    reasons = exc.response.get('CancellationReasons') or [{}]
+    return reasons[0].get('Code') == 'ConditionalCheckFailed'
+
+
+def _seen(idempotency_key):
+    ttl = float(os.getenv('IDEMPOTENCY_CACHE_TTL', '300'))
+    with _lock:
+        entry = _recent.get(idempotency_key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] >= ttl:
+            del _recent[idempotency_key]
+            return None
+        _recent.move_to_end(idempotency_key)
+        return entry[0]
+
+
+def _remember(idempotency_key, count):
+    size = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '1024'))
+    with _lock:
+        _recent[idempotency_key] = (count, time.monotonic())
+        _recent.move_to_end(idempotency_key)
+        while len(_recent) > size:
+            _recent.popitem(last=False)
+
+
+def _total(client, table_name, key, added):
+    ttl = float(os.getenv('IDEMPOTENCY_COUNT_TTL', '30'))
+    with _lock:
+        entry = _totals.get((table_name, key))
+        if entry is not None and time.monotonic() - entry[1] < ttl:
+            count = entry[0] + added
+            _totals[(table_name, key)] = (count, entry[1])
+            return count
+
+    count = counter.read_total(client, table_name, key, consistent=True)
+    with _lock:
+        _totals[(table_name, key)] = (count, time.monotonic())
+    return count
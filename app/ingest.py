@@ -0,0 +1,70 @@
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from app import clients, uniques, visits
+
+
+def enabled():
+    return os.getenv('VISIT_INGEST_MODE', 'direct') == 'queue'
+
+
+def enqueue(key, fingerprint=None):
+    """Send one compact visit event to ``VISIT_QUEUE_URL``."""
+    message = {"k": key, "t": int(time.time())}
+    if fingerprint is not None:
+        message["f"] = fingerprint.hex()
+    clients.get('sqs').send_message(
+        QueueUrl=os.getenv('VISIT_QUEUE_URL'),
+        MessageBody=json.dumps(message, separators=(',', ':'))
+    )
+
+
+def consume(records, client, table_name):
+    """Apply a batch of queued visits and return the failed message IDs.
+
+    Visits are summed per key in memory and written with one increment per
+    key, so write cost follows the number of distinct pages in the batch
+    rather than the number of visits. When an increment fails, every
+    message for that key is reported for retry. Messages that cannot be
+    parsed are logged and dropped, because retrying them would fail again.
+    """
+    grouped = {}
+    for record in records:
+        try:
+            message = json.loads(record['body'])
+            key, sent_at = message['k'], message['t']
+            if not isinstance(key, str):
+                raise TypeError("'k' must be a string")
+            if not isinstance(sent_at, int) or isinstance(sent_at, bool):
+                raise TypeError("'t' must be an integer")
+            fingerprint = bytes.fromhex(message['f']) if 'f' in message else None
+        except (KeyError, TypeError, ValueError):
+            print(f"Dropping malformed visit message {record.get('messageId')}")
+            continue
+        group = grouped.setdefault(key, {'ids': [], 'first': sent_at, 'fingerprints': []})
+        group['ids'].append(record['messageId'])
+        group['first'] = min(group['first'], sent_at)
+        if fingerprint is not None:
+            group['fingerprints'].append((fingerprint, sent_at))
+
+    failed = []
+    for key, group in grouped.items():
+        try:
+            visits.record(client, table_name, key, len(group['ids']),
+                          now=datetime.fromtimestamp(group['first'], timezone.utc))
+        except Exception as exc:
+            print(f"Failed to record {len(group['ids'])} visits to {key}: {exc!r}")
+            failed.extend(group['ids'])
+            continue
+        for fingerprint, sent_at in group['fingerprints']:
+            try:
+                # The day the visit was made, as for the rollups.
+                uniques.observe(client, table_name, fingerprint, key,
+                                now=datetime.fromtimestamp(sent_at, timezone.utc))
+            except Exception as exc:
+                # The visits are already counted; retrying the messages would
+                # count them twice, so a missed sketch update is only logged.
+                print(f"Failed to update unique visitors for {key}: {exc!r}")
+    return failed
@@ -1,67 +1,341 @@
-import json
-import boto3
+import functools
 import os
-from datetime import datetime
+import time
+from datetime import datetime, timezone
 
-client = boto3.client('dynamodb') 
+# Imported first, so the init time it reports covers the imports below.
+from app import metrics
+from app import (aggregates, beacon, bots, clients, compression, count_cache,
+                 counter, events, health, hll, idempotency, ingest, pages,
+                 rate_limit, recorder, resilience, rollups, serialization,
+                 table_cache, uniques, visit_buffer, visits)
 
+if os.getenv('PRELOAD_CLIENTS', '0') == '1':
+    clients.preload()
 
+if visit_buffer.enabled():
+    visit_buffer.register_extension()
 
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return json.JSONEncoder.default(self, obj)
 
+HEALTHY = serialization.constant({"message": "Hello World", "status": "ok"})
+UNHEALTHY = serialization.constant({"message": "Hello World", "status": "unavailable"})
+ACCEPTED = serialization.constant({"message": "Visit accepted"})
+NO_STORE = {"Cache-Control": "no-store"}
 
+
+def _compressed(handler):
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        response = handler(event, context)
+        started = time.perf_counter()
+        response = compression.compress(response, events.header(event, 'Accept-Encoding'))
+        metrics.record('Compression', started)
+        return response
+    return wrapper
+
+
+@metrics.instrument
+@recorder.recorded
+@_compressed
 def lambda_handler(event, context):
-    response = client.describe_table(
-        TableName=os.getenv('TABLE_NAME')
-    )
-    return {
-        "statusCode": 200,
-        "headers": {
-             "Access-Control-Allow-Origin": '*',
-            "Content-Type": "application/json"
-        },
-        "body": json.dumps({
+    if health.debug():
+        response = table_cache.cache.get(clients.dynamodb(), os.getenv('TABLE_NAME'))
+        return _response(200, {
             "message": "Hello World",
             'table': response,
             "event": event
-        }, cls=DateTimeEncoder)
-    }
+        })
+
+    # Shallow mode answers without creating a client at all.
+    healthy = health.mode() == 'shallow' or health.check(
+        clients.dynamodb(), os.getenv('TABLE_NAME'))
+    if healthy:
+        return _response(200, HEALTHY, NO_STORE)
+    return _response(503, UNHEALTHY, NO_STORE)
 
 
+@metrics.instrument
+@recorder.recorded
+@_compressed
 def visit_handler(event, context):
-    
+
+    try:
+        key = pages.key_for(pages.page_from_event(event))
+        idempotency_key = idempotency.key_from_event(event) if idempotency.enabled() else None
+    except ValueError as exc:
+        return _response(400, {"message": str(exc)})
+
+    if bots.enabled() and bots.classify(event):
+        count = visit_buffer.buffer.estimate(key)
+        body = {"message": "Not counted"}
+        if count is not None:
+            body["updated_value"] = str(count)
+        return _response(200, body)
+
+    limited = _rate_limited(event, context)
+    if limited:
+        return limited
+
+    if ingest.enabled():
+        fingerprint = events.client_fingerprint(event) if uniques.enabled() else None
+        ingest.enqueue(key, fingerprint)
+        return _response(202, ACCEPTED)
+
+    table_name = os.getenv('TABLE_NAME')
+    client = resilience.guard(clients.dynamodb(), context)
+    extra = {}
+    try:
+        if visit_buffer.enabled():
+            count, estimated = visit_buffer.buffer.record(client, table_name, key)
+            extra['estimated'] = estimated
+        elif idempotency_key:
+            count, duplicate = idempotency.record(client, table_name, key, idempotency_key)
+            if duplicate:
+                extra['duplicate'] = True
+            if count is None:
+                count = visit_buffer.buffer.estimate(key)
+                extra['estimated'] = True
+        else:
+            total = visits.record(client, table_name, key)
+            count = visit_buffer.buffer.remember(key, total)
+            if total is None:
+                extra['estimated'] = True
+    except resilience.Unavailable:
+        # Raised only when the visit itself was not written.
+        return _deferred_visit(key)
+
+    if uniques.enabled():
+        try:
+            extra['unique_visitors_today'] = uniques.observe(
+                client, table_name, events.client_fingerprint(event), key)
+        except resilience.Unavailable:
+            pass
+
+    body = {"message": "Update successful"}
+    if count is not None:
+        body["updated_value"] = str(count)
+    return _response(200, {**body, **extra})
+
+
+@metrics.instrument
+@recorder.recorded
+def beacon_handler(event, context):
+    try:
+        entries = beacon.parse(event)
+    except ValueError as exc:
+        return _response(400, {"message": str(exc)})
+
+    if bots.enabled() and bots.classify(event):
+        return {"statusCode": 204, "headers": {"Access-Control-Allow-Origin": '*'}}
+
+    limited = _rate_limited(event, context)
+    if limited:
+        return limited
+
     table_name = os.getenv('TABLE_NAME')
-    key_value = "page_counter"
-
-    response = client.update_item(
-        TableName=table_name,
-        Key={
-            'ID': {'S': key_value}
-        },
-        UpdateExpression="SET #attrName = if_not_exists(#attrName, :start) + :inc",
-        ExpressionAttributeNames={
-            "#attrName": "count" 
-        },
-        ExpressionAttributeValues={
-            ":start": {"N": "0"},
-            ":inc": {"N": "1"}
-        },
-        ReturnValues="UPDATED_NEW"
-    )
+    client = resilience.guard(clients.dynamodb(), context)
+    # Failures are logged and still answered 204: a client retrying the
+    # beacon would count its other pages twice.
+    failed = beacon.record(client, table_name, entries)
+    if uniques.enabled():
+        fingerprint = events.client_fingerprint(event)
+        for key in dict.fromkeys(key for key, _, _ in entries):
+            if key in failed:
+                continue
+            try:
+                uniques.observe(client, table_name, fingerprint, key)
+            except Exception as exc:
+                print(f"Failed to update unique visitors for {key}: {exc!r}")
+    return {"statusCode": 204, "headers": {"Access-Control-Allow-Origin": '*'}}
+
+
+@metrics.instrument
+def ingest_handler(event, context):
+    failed = ingest.consume(event.get('Records', []), clients.dynamodb(),
+                            os.getenv('TABLE_NAME'))
+    return {"batchItemFailures": [{"itemIdentifier": i} for i in failed]}
+
+
+@metrics.instrument
+def stream_handler(event, context):
+    failed = aggregates.apply(clients.dynamodb(), os.getenv('TABLE_NAME'),
+                              event.get('Records', []))
+    return {"batchItemFailures": [{"itemIdentifier": i} for i in failed]}
+
+
+@metrics.instrument
+@recorder.recorded
+@_compressed
+def top_handler(event, context):
+    params = event.get('queryStringParameters') or {}
+    try:
+        limit = int(params.get('limit', '10'))
+        if not 1 <= limit <= 100:
+            raise ValueError
+    except ValueError:
+        return _response(400, {"message": "limit must be between 1 and 100"})
+
+    top, total = aggregates.leaderboard(clients.dynamodb(), os.getenv('TABLE_NAME'), limit)
+    return _response(200, {
+        "total": total,
+        "pages": [{"page": key.removeprefix('page#'), "count": count} for key, count in top]
+    })
+
 
+@metrics.instrument
+@recorder.recorded
+@_compressed
+def series_handler(event, context):
+    params = event.get('queryStringParameters') or {}
+    granularity = params.get('granularity', 'hour')
+    try:
+        key = pages.key_for(pages.page_from_event(event))
+        if granularity not in rollups.GRANULARITIES:
+            raise ValueError(f"Unknown granularity {granularity!r}")
+        end = _parse_time(params.get('to')) or datetime.now(timezone.utc)
+        start = (_parse_time(params.get('from'))
+                 or end - 23 * rollups.GRANULARITIES[granularity][1])
+        points = rollups.series(clients.dynamodb(), key, granularity, start, end)
+    except ValueError as exc:
+        return _response(400, {"message": str(exc)})
+
+    return _response(200, {
+        "granularity": granularity,
+        "series": points
+    })
+
+
+@metrics.instrument
+@recorder.recorded
+@_compressed
+def uniques_handler(event, context):
+    params = event.get('queryStringParameters') or {}
+    try:
+        key = pages.key_for(pages.page_from_event(event))
+        end = _parse_time(params.get('to')) or datetime.now(timezone.utc)
+        start = _parse_time(params.get('from')) or end
+        estimate = uniques.unique_visitors(
+            clients.dynamodb(), os.getenv('TABLE_NAME'), start.date(), end.date(), key)
+    except ValueError as exc:
+        return _response(400, {"message": str(exc)})
+
+    return _response(200, {
+        "from": start.date().isoformat(),
+        "to": end.date().isoformat(),
+        "unique_visitors": estimate,
+        "relative_error": round(hll.RELATIVE_ERROR, 4)
+    })
+
+
+@metrics.instrument
+@recorder.recorded
+@_compressed
+def count_handler(event, context):
+    try:
+        page = pages.page_from_event(event)
+    except ValueError as exc:
+        return _response(400, {"message": str(exc)})
+
+    table_name = os.getenv('TABLE_NAME')
+    key = pages.key_for(page)
+    try:
+        count = count_cache.cache.get(resilience.guard(clients.dynamodb(), context),
+                                      table_name, key)
+    except resilience.Unavailable:
+        count = count_cache.cache.last(table_name, key)
+        if count is None:
+            return _response(503, {"message": "Visit counter is busy"}, {"Retry-After": "1"})
+        return _response(200, {"count": count, "stale": True}, NO_STORE)
+
+    etag = f'"{count}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age={}, stale-while-revalidate={}".format(
+            os.getenv('COUNT_MAX_AGE', '10'), os.getenv('COUNT_STALE_WHILE_REVALIDATE', '60'))
+    }
+    if _etag_matches(events.header(event, 'If-None-Match'), etag):
+        return {"statusCode": 304, "headers": {"Access-Control-Allow-Origin": '*', **headers}}
+
+    return _response(200, {"count": count}, headers)
+
+
+@metrics.instrument
+@recorder.recorded
+@_compressed
+def counts_handler(event, context):
+    params = event.get('queryStringParameters') or {}
+    requested = [p.strip() for p in params.get('pages', '').split(',') if p.strip()]
+    try:
+        if not requested:
+            raise ValueError("Query parameter 'pages' is required")
+        requested = [pages.validate(page) for page in dict.fromkeys(requested)]
+    except ValueError as exc:
+        return _response(400, {"message": str(exc)})
+
+    totals = counter.read_totals(clients.dynamodb(), os.getenv('TABLE_NAME'),
+                                 [pages.key_for(page) for page in requested])
+    return _response(200, {
+        "counts": {page: totals[pages.key_for(page)] for page in requested}
+    })
+
+
+def _rate_limited(event, context):
+    """A 429 response if the caller is over its limit, else None."""
+    if not rate_limit.enabled():
+        return None
+    client = resilience.guard(clients.dynamodb(), context)
+    retry_after = rate_limit.check(event, client, os.getenv('TABLE_NAME'))
+    if not retry_after:
+        return None
+    return _response(429, {"message": "Too many requests"}, {"Retry-After": str(retry_after)})
+
+
+def _deferred_visit(key):
+    """Answer a visit the table could not take.
+
+    With ``VISIT_BUFFERING=1`` the visit is already pending in the
+    container's buffer, so the answer is the last known count plus what
+    is pending. Otherwise nothing would write it if the container were
+    reclaimed, so the client is asked to retry.
+    """
+    if not visit_buffer.enabled():
+        return _response(503, {"message": "Visit counter is busy"}, {"Retry-After": "1"})
+    count = visit_buffer.buffer.estimate(key)
+    if count is None:
+        return _response(503, {"message": "Visit counter is busy"}, {"Retry-After": "1"})
+    return _response(200, {
+        "message": "Update deferred",
+        "updated_value": str(count),
+        "stale": True
+    })
+
+
+def _response(status_code, body, headers=None):
+    started = time.perf_counter()
+    body = serialization.dumps(body)
+    metrics.record('Serialization', started)
     return {
-        "statusCode": 200,
-        "headers": {
-             "Access-Control-Allow-Origin": '*',
-            "Content-Type": "application/json"
-        },
-        "body": json.dumps({
-            "message": "Update successful",
-            "updated_value": response['Attributes']['count']['N']
-        })
+        "statusCode": status_code,
+        "headers": {**serialization.JSON_HEADERS, **(headers or {})},
+        "body": body
     }
 
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or any(
+        tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+metrics.initialized()
@@ -0,0 +1,138 @@
+import functools
+import json
+import os
+import threading
+import time
+
+# Metrics are written with these dimensions: the Lambda function, the
+# handler ("operation") and whether the invocation was a cold start.
+DIMENSIONS = ['Function', 'Operation', 'Start']
+
+# Imported before the rest of the app, so init is timed from here.
+_init_started = time.perf_counter()
+
+
+class _Local(threading.local):
+    # A class default: a missed attribute lookup would cost a microsecond.
+    invocation = None
+
+
+_local = _Local()
+_init_ms = None
+_cold = True
+
+
+def enabled():
+    return os.getenv('METRICS', '0') == '1'
+
+
+def initialized():
+    """Note the end of the init phase; called once the handler module is loaded."""
+    global _init_ms
+    _init_ms = (time.perf_counter() - _init_started) * 1000
+
+
+def instrument(handler):
+    """Time each invocation and log its metrics as one EMF line.
+
+    ``METRICS`` is read when the handler module is imported, like
+    ``PRELOAD_CLIENTS``; with ``METRICS=0`` the handler is returned
+    unwrapped, and the timing points below find no invocation and
+    return at once.
+    """
+    if not enabled():
+        return handler
+    name = handler.__name__
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        global _cold
+        cold, _cold = _cold, False
+        values = _local.invocation = {}
+        started = time.perf_counter()
+        try:
+            return handler(event, context)
+        finally:
+            values['HandlerDuration'] = (time.perf_counter() - started) * 1000
+            _local.invocation = None
+            if cold and _init_ms is not None:
+                values['InitDuration'] = _init_ms
+            _emit(name, cold, values, getattr(context, 'aws_request_id', None))
+    return wrapper
+
+
+def record(name, started):
+    """Add the milliseconds since ``started`` to ``<name>Duration``."""
+    values = _local.invocation
+    if values is None:
+        return
+    key = name + 'Duration'
+    values[key] = values.get(key, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def api_call(operation, started, retries=0):
+    """Count one DynamoDB call that began at ``started``."""
+    values = _local.invocation
+    if values is None:
+        return
+    elapsed = (time.perf_counter() - started) * 1000
+    for key, amount in ((operation + 'Duration', elapsed), ('DynamoDBDuration', elapsed),
+                        ('DynamoDBCalls', 1), ('DynamoDBRetries', retries)):
+        values[key] = values.get(key, 0) + amount
+
+
+def attach(client):
+    """Time every API call ``client`` makes through botocore's event hooks.
+
+    The time runs from ``before-call``, before the request is serialized
+    and signed, to ``after-call``, after retries and parsing, so it is
+    what the handler waited for.
+    """
+    events = client.meta.events
+    events.register('before-call.dynamodb', _before_call)
+    events.register('after-call.dynamodb', _after_call)
+    events.register('after-call-error.dynamodb', _after_call)
+
+
+def _before_call(model, context, **kwargs):
+    context['metrics_call'] = (model.name, time.perf_counter())
+
+
+def _after_call(context, parsed=None, **kwargs):
+    # after-call-error, sent when no response came back, has no model.
+    call = context.get('metrics_call')
+    if call is not None:
+        metadata = (parsed or {}).get('ResponseMetadata') or {}
+        api_call(*call, metadata.get('RetryAttempts', 0))
+
+
+def _emit(operation, cold, values, request_id):
+    names = sorted(values)
+    document = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': os.getenv('METRICS_NAMESPACE', 'PortfolioBackend'),
+                'Dimensions': [DIMENSIONS],
+                'Metrics': [{'Name': name, 'Unit': _unit(name)} for name in names]
+            }]
+        },
+        'Function': os.getenv('AWS_LAMBDA_FUNCTION_NAME', 'local'),
+        'Operation': operation,
+        'Start': 'cold' if cold else 'warm',
+        **{name: round(values[name], 3) for name in names},
+    }
+    if request_id:
+        document['requestId'] = request_id
+    print(json.dumps(document, separators=(',', ':')))
+
+
+def _unit(name):
+    return 'Milliseconds' if name.endswith('Duration') else 'Count'
+
+
+def reset():
+    global _init_ms, _cold
+    _local.invocation = None
+    _init_ms = None
+    _cold = True
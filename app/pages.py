@@ -0,0 +1,29 @@
+import os
+import re
+
+from app import counter
+
+PAGE_PATTERN = re.compile(r'[a-z0-9][a-z0-9_-]{0,63}')
+
+
+def allowed_pages():
+    """Pages configured in ``COUNTER_PAGES``; only these get their own counter."""
+    configured = os.getenv('COUNTER_PAGES', '')
+    return {page.strip() for page in configured.split(',') if page.strip()}
+
+
+def validate(page):
+    if not PAGE_PATTERN.fullmatch(page) or page not in allowed_pages():
+        raise ValueError(f"Unknown page {page[:64]!r}")
+    return page
+
+
+def page_from_event(event):
+    """Page named by the ``page`` path or query parameter, or None."""
+    page = ((event.get('pathParameters') or {}).get('page')
+            or (event.get('queryStringParameters') or {}).get('page'))
+    return validate(page) if page else None
+
+
+def key_for(page):
+    return counter.DEFAULT_KEY if page is None else f"page#{page}"
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app import clients, events
+from app.resilience import THROTTLING_CODES, TokenBucket, Unavailable
+
+COUNT_ATTRIBUTE = "count"
+TTL_ATTRIBUTE = "ExpiresAt"
+# Rejections are logged once and then every LOG_EVERY times, so a client
+# stuck in a loop cannot flood the logs.
+LOG_EVERY = 100
+
+_lock = threading.Lock()
+_buckets = OrderedDict()
+_windows = {}
+_blocked = {}
+_stats = {'allowed': 0, 'rejected_local': 0, 'rejected_shared': 0, 'shared_failed_open': 0}
+_warned_unsalted = False
+
+
+def enabled():
+    return os.getenv('RATE_LIMIT', '0') == '1'
+
+
+def shared():
+    """Whether ``RATE_LIMIT_SHARED=1`` is in effect.
+
+    The shared window's items are keyed by the client hash, which without
+    ``FINGERPRINT_SALT`` is as good as the IP itself, so the setting is
+    refused, and the limit kept per container, until a salt is set.
+    """
+    if os.getenv('RATE_LIMIT_SHARED', '0') != '1':
+        return False
+    if not os.getenv('FINGERPRINT_SALT'):
+        global _warned_unsalted
+        if not _warned_unsalted:
+            _warned_unsalted = True
+            print("RATE_LIMIT_SHARED=1 is ignored: FINGERPRINT_SALT is not set")
+        return False
+    return True
+
+
+def client_id(event):
+    """Salted hash of the caller's IP, or of IP and user agent.
+
+    ``RATE_LIMIT_KEY=fingerprint`` tells apart clients behind one NAT by
+    their user agent; the default ``ip`` cannot be dodged by changing it.
+    """
+    if os.getenv('RATE_LIMIT_KEY', 'ip') == 'fingerprint':
+        return events.client_fingerprint(event).hex()[:32]
+    material = '\n'.join((os.getenv('FINGERPRINT_SALT', ''), events.source_ip(event)))
+    return hashlib.sha256(material.encode()).hexdigest()[:32]
+
+
+def item_id(client, window):
+    return f"rl#{client}#{window}"
+
+
+def check(event, client, table_name):
+    """Return 0 if the request may proceed, else seconds until it may retry.
+
+    Each caller first takes a token from a bucket in this container that
+    holds ``RATE_LIMIT_BURST`` tokens and refills at
+    ``RATE_LIMIT_PER_MINUTE``. With ``RATE_LIMIT_SHARED=1`` the request
+    must then also fit a per-minute sliding window kept in DynamoDB, so
+    the limit holds across containers. Rejected requests never write a
+    visit.
+    """
+    caller = client_id(event)
+    if not _bucket(caller).try_take():
+        return _reject('rejected_local', 1)
+    if shared():
+        retry_after = _check_window(client, table_name, caller)
+        if retry_after:
+            return _reject('rejected_shared', retry_after)
+    with _lock:
+        _stats['allowed'] += 1
+    return 0
+
+
+def stats():
+    with _lock:
+        return dict(_stats)
+
+
+def reset():
+    with _lock:
+        _buckets.clear()
+        _windows.clear()
+        _blocked.clear()
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _bucket(caller):
+    max_clients = int(os.getenv('RATE_LIMIT_MAX_CLIENTS', '10000'))
+    with _lock:
+        bucket = _buckets.get(caller)
+        if bucket is None:
+            bucket = _buckets[caller] = TokenBucket(
+                float(os.getenv('RATE_LIMIT_BURST', '10')),
+                float(os.getenv('RATE_LIMIT_PER_MINUTE', '30')) / 60)
+            while len(_buckets) > max_clients:
+                _buckets.popitem(last=False)
+        else:
+            _buckets.move_to_end(caller)
+        return bucket
+
+
+def _check_window(client, table_name, caller):
+    """Count the request in the caller's shared window, or refuse it.
+
+    This is the sliding-window counter approximation: one item per caller
+    and minute, and a request is allowed while the current minute's count
+    plus the previous minute's, weighted by how much of it still overlaps
+    the last 60 seconds, stays under the limit. DynamoDB conditions cannot
+    do arithmetic, so the weighted allowance is worked out here and sent
+    as the bound of a conditional ``ADD``. The previous minute's count is
+    whatever this container last saw for it.
+
+    A refused caller is then refused locally until the minute ends, so it
+    costs at most one failed conditional write per container and minute.
+    When the table throttles the write, the request fails open: the
+    container's own bucket has already allowed it.
+    """
+    limit = int(os.getenv('RATE_LIMIT_PER_MINUTE', '30'))
+    now = time.time()
+    window = int(now // 60)
+    with _lock:
+        blocked_until = _blocked.get(caller, 0)
+        previous = _windows.get((caller, window - 1), 0)
+    if now < blocked_until:
+        return math.ceil(blocked_until - now)
+
+    allowance = limit - math.floor(previous * (1 - (now % 60) / 60))
+    if allowance <= 0:
+        return _block(caller, window)
+    try:
+        response = client.update_item(
+            TableName=table_name,
+            Key={'ID': {'S': item_id(caller, window)}},
+            UpdateExpression="ADD #count :one SET #ttl = if_not_exists(#ttl, :ttl)",
+            ConditionExpression="attribute_not_exists(#count) OR #count < :allowance",
+            ExpressionAttributeNames={'#count': COUNT_ATTRIBUTE, '#ttl': TTL_ATTRIBUTE},
+            ExpressionAttributeValues={
+                ':one': {'N': '1'},
+                ':allowance': {'N': str(allowance)},
+                ':ttl': {'N': str((window + 2) * 60)}
+            },
+            ReturnValues="UPDATED_NEW"
+        )
+    except Unavailable as exc:
+        return _fail_open(exc)
+    except Exception as exc:
+        if clients.error_code(exc) in THROTTLING_CODES:
+            return _fail_open(exc)
+        if clients.error_code(exc) != 'ConditionalCheckFailedException':
+            raise
+        with _lock:
+            _windows[(caller, window)] = max(_windows.get((caller, window), 0), allowance)
+        return _block(caller, window)
+
+    with _lock:
+        _windows[(caller, window)] = int(response['Attributes'][COUNT_ATTRIBUTE]['N'])
+        for stale in [k for k in _windows if k[1] < window - 1]:
+            del _windows[stale]
+    return 0
+
+
+def _block(caller, window):
+    until = (window + 1) * 60
+    with _lock:
+        _blocked[caller] = until
+        for stale in [k for k, t in _blocked.items() if t <= window * 60]:
+            del _blocked[stale]
+    return max(1, math.ceil(until - time.time()))
+
+
+def _reject(reason, retry_after):
+    _count(reason)
+    return retry_after
+
+
+def _fail_open(exc):
+    _count('shared_failed_open', repr(exc))
+    return 0
+
+
+def _count(reason, error=None):
+    with _lock:
+        _stats[reason] += 1
+        snapshot = dict(_stats)
+    if snapshot[reason] % LOG_EVERY == 1:
+        line = {"rate_limit": snapshot}
+        if error:
+            line["error"] = error
+        print(json.dumps(line))
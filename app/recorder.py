@@ -0,0 +1,129 @@
+import functools
+import hashlib
+import json
+import os
+import random
+import secrets
+import threading
+import time
+
+# Values of these headers and query parameters are kept; the names of all
+# others are kept with REDACTED as their value, so cookies, tokens and
+# tracking parameters never reach a recording.
+HEADERS = {
+    'accept', 'accept-encoding', 'accept-language', 'content-type', 'idempotency-key',
+    'if-none-match', 'origin', 'purpose', 'sec-ch-ua-mobile', 'sec-fetch-dest',
+    'sec-fetch-mode', 'sec-fetch-site', 'sec-purpose', 'user-agent',
+}
+QUERY_PARAMETERS = {'from', 'granularity', 'limit', 'page', 'pages', 'to'}
+REDACTED = 'redacted'
+# Bodies larger than this are recorded as None.
+MAX_BODY = 16384
+# Prefix of recordings written to the function log.
+LOG_PREFIX = 'RECORDED_EVENT '
+
+_lock = threading.Lock()
+_file = None
+# Salts the pseudonyms when RECORD_SALT is unset, so they are never a
+# plain hash of the IP; they then only stay stable within a container.
+_container_salt = secrets.token_hex(16)
+
+
+def enabled():
+    return os.getenv('RECORD_EVENTS', '0') == '1'
+
+
+def recorded(handler):
+    """Record the events ``handler`` receives while ``RECORD_EVENTS=1``."""
+    name = handler.__name__
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if enabled():
+            try:
+                record(name, event)
+            except Exception as exc:
+                print(f"Failed to record event: {exc!r}")
+        return handler(event, context)
+    return wrapper
+
+
+def record(handler_name, event):
+    """Write one sanitized event as a compact JSON line.
+
+    Lines go to ``RECORD_EVENTS_PATH`` when it is set and otherwise to the
+    log, prefixed with ``LOG_PREFIX``. ``RECORD_SAMPLE_RATE`` is the share
+    of events kept.
+    """
+    if random.random() >= float(os.getenv('RECORD_SAMPLE_RATE', '1')):
+        return
+    line = json.dumps({'t': round(time.time(), 3), 'h': handler_name, 'e': sanitize(event)},
+                      separators=(',', ':'))
+    path = os.getenv('RECORD_EVENTS_PATH')
+    if not path:
+        print(LOG_PREFIX + line)
+        return
+    global _file
+    with _lock:
+        if _file is None or _file.name != path:
+            if _file is not None:
+                _file.close()
+            _file = open(path, 'a', buffering=1)
+        _file.write(line + '\n')
+
+
+def sanitize(event):
+    """The parts of an API Gateway event the handlers read, without secrets.
+
+    The source IP is replaced by a salted pseudonym in 10.0.0.0/8, so one
+    client keeps one address across a recording and rate limits and
+    unique visitor counts behave as they did.
+    """
+    context = event.get('requestContext') or {}
+    identity = context.get('identity') or {}
+    sanitized = {
+        'httpMethod': event.get('httpMethod'),
+        'resource': event.get('resource'),
+        'path': event.get('path'),
+        'headers': _filter(event.get('headers'), HEADERS, str.lower),
+        'queryStringParameters': _filter(event.get('queryStringParameters'),
+                                         QUERY_PARAMETERS),
+        'pathParameters': event.get('pathParameters'),
+        'body': _body(event),
+        'isBase64Encoded': event.get('isBase64Encoded') or None,
+        'requestContext': {
+            'requestId': context.get('requestId'),
+            'identity': {'sourceIp': _pseudonym(identity.get('sourceIp'))}
+        },
+    }
+    return {key: value for key, value in sanitized.items() if value is not None}
+
+
+def _filter(values, allowed, normalize=str):
+    if not values:
+        return None
+    return {name: value if normalize(name) in allowed else REDACTED
+            for name, value in values.items()}
+
+
+def _body(event):
+    body = event.get('body')
+    if body is None or len(body) > MAX_BODY:
+        return None
+    return body
+
+
+def _pseudonym(ip):
+    if not ip:
+        return None
+    salt = os.getenv('RECORD_SALT') or _container_salt
+    digest = hashlib.sha256(f"{salt}\n{ip}".encode()).digest()
+    return '10.{}.{}.{}'.format(*digest[:3])
+
+
+def reset():
+    global _file
+    with _lock:
+        if _file is not None:
+            _file.close()
+        _file = None
@@ -0,0 +1,225 @@
+import os
+import random
+import threading
+import time
+
+from app import clients
+
+THROTTLING_CODES = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'InternalServerError',
+    'ServiceUnavailable',
+}
+TRANSACTION_THROTTLING_CODES = {'ThrottlingError', 'ProvisionedThroughputExceeded'}
+WRITE_OPERATIONS = {'update_item', 'put_item', 'batch_write_item', 'transact_write_items'}
+READ_OPERATIONS = {'get_item', 'batch_get_item', 'query'}
+BASE_DELAY = 0.025
+MAX_DELAY = 0.5
+
+_lock = threading.Lock()
+_buckets = {}
+_breakers = {}
+
+
+class Unavailable(Exception):
+    """The table is throttling and the call could not finish in time."""
+
+
+def enabled():
+    return os.getenv('DDB_RESILIENCE', '0') == '1'
+
+
+class TokenBucket:
+    """Client-side rate limit that backs off while the table throttles.
+
+    The bucket holds up to ``capacity`` tokens and refills at ``rate``
+    tokens per second (``capacity`` by default). Every throttled call
+    halves the refill rate and every successful call wins back a tenth of
+    it, so a container slows down on its own instead of spending its
+    retries against an exhausted table.
+    """
+
+    def __init__(self, capacity, rate=None):
+        self.capacity = float(capacity)
+        self.base_rate = self.capacity if rate is None else float(rate)
+        self.rate = self.base_rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait_time(self):
+        """Take a token and return how long to wait before using it."""
+        with self._lock:
+            self._refill()
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_take(self):
+        """Take a token if one is available right now."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+    def refund(self):
+        with self._lock:
+            self._tokens += 1
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.base_rate / 16, self.rate / 2)
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class CircuitBreaker:
+    """Fails fast for ``CIRCUIT_RESET_SECONDS`` after repeated throttling.
+
+    After ``CIRCUIT_FAILURE_THRESHOLD`` consecutive calls give up, the
+    circuit opens and calls are refused without a request. Once the reset
+    time has passed a single trial call is let through; its outcome closes
+    the circuit or opens it again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            reset = float(os.getenv('CIRCUIT_RESET_SECONDS', '5'))
+            if self._trial or time.monotonic() - self._opened_at < reset:
+                return False
+            self._trial = True
+            return True
+
+    def succeeded(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failed(self):
+        with self._lock:
+            self._failures += 1
+            self._trial = False
+            if (self._opened_at is not None
+                    or self._failures >= int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '3'))):
+                self._opened_at = time.monotonic()
+
+    def is_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+
+class GuardedClient:
+    """Client proxy that rate-limits, retries and sheds DynamoDB calls.
+
+    Each request is retried on its own, so a retry never repeats a write
+    that already succeeded. Waiting for a token and backing off after a
+    throttled attempt share one deadline taken from the invocation's
+    remaining time; when it would be exceeded, ``Unavailable`` is raised.
+    Other errors are passed through untouched.
+    """
+
+    def __init__(self, client, deadline):
+        self._client = client
+        self._deadline = deadline
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if name in WRITE_OPERATIONS:
+            kind = 'write'
+        elif name in READ_OPERATIONS:
+            kind = 'read'
+        else:
+            return method
+        return lambda **params: self._call(kind, method, params)
+
+    def _call(self, kind, method, params):
+        bucket = _bucket(kind)
+        breaker = _breaker(kind)
+        max_attempts = int(os.getenv('DDB_RESILIENCE_MAX_ATTEMPTS', '6'))
+        if not breaker.allow():
+            raise Unavailable(f"DynamoDB {kind} circuit is open")
+
+        for attempt in range(max_attempts):
+            wait = bucket.wait_time()
+            if attempt:
+                wait += random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** attempt))
+            # The first attempt is always made, even past the deadline (a
+            # flush at shutdown); only waiting is bounded.
+            if wait and time.monotonic() + wait > self._deadline:
+                bucket.refund()
+                break
+            if wait:
+                time.sleep(wait)
+            try:
+                response = method(**params)
+            except Exception as exc:
+                if not _throttled(exc):
+                    breaker.succeeded()
+                    raise
+                bucket.throttled()
+                continue
+            bucket.succeeded()
+            breaker.succeeded()
+            return response
+
+        breaker.failed()
+        raise Unavailable(f"DynamoDB kept throttling {kind}s")
+
+
+def _throttled(exc):
+    code = clients.error_code(exc)
+    if code == 'TransactionCanceledException':
+        reasons = exc.response.get('CancellationReasons') or []
+        return any(reason.get('Code') in TRANSACTION_THROTTLING_CODES for reason in reasons)
+    return code in THROTTLING_CODES
+
+
+def guard(client, context):
+    """Wrap ``client`` for one invocation, or return it as is when disabled."""
+    if not enabled():
+        return client
+    budget = float(os.getenv('DDB_RESILIENCE_MAX_WAIT_MS', '2000'))
+    remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    if callable(remaining):
+        margin = float(os.getenv('DDB_RESILIENCE_MARGIN_MS', '500'))
+        budget = min(budget, remaining() - margin)
+    return GuardedClient(client, time.monotonic() + budget / 1000)
+
+
+def _bucket(kind):
+    with _lock:
+        bucket = _buckets.get(kind)
+        if bucket is None:
+            capacity = os.getenv(f'DDB_{kind.upper()}_CAPACITY', '5')
+            bucket = _buckets[kind] = TokenBucket(float(capacity))
+        return bucket
+
+
+def _breaker(kind):
+    with _lock:
+        return _breakers.setdefault(kind, CircuitBreaker())
+
+
+def reset():
+    with _lock:
+        _buckets.clear()
+        _breakers.clear()
@@ -0,0 +1,137 @@
+import os
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+COUNT_ATTRIBUTE = "count"
+TTL_ATTRIBUTE = "ExpiresAt"
+MAX_POINTS = 1440
+
+GRANULARITIES = {
+    'minute': ('%Y-%m-%dT%H:%M', timedelta(minutes=1)),
+    'hour': ('%Y-%m-%dT%H', timedelta(hours=1)),
+    'day': ('%Y-%m-%d', timedelta(days=1)),
+}
+
+DEFAULT_RETENTION = {'minute': 86400, 'hour': 90 * 86400, 'day': 0}
+
+
+def table_name():
+    return os.getenv('ROLLUP_TABLE_NAME')
+
+
+def enabled():
+    return bool(table_name())
+
+
+def granularities():
+    names = os.getenv('ROLLUP_GRANULARITIES', 'minute,hour,day')
+    return [name.strip() for name in names.split(',') if name.strip() in GRANULARITIES]
+
+
+def retention(granularity):
+    """Seconds a bucket is kept before DynamoDB TTL expires it; 0 keeps it."""
+    configured = dict(DEFAULT_RETENTION)
+    for entry in os.getenv('ROLLUP_RETENTION', '').split(','):
+        name, _, seconds = entry.partition('=')
+        if name.strip() in GRANULARITIES and seconds.strip():
+            configured[name.strip()] = int(seconds)
+    return configured[granularity]
+
+
+def series_key(key, granularity):
+    return f"{key}#{granularity}"
+
+
+def bucket(granularity, moment):
+    fmt, _ = GRANULARITIES[granularity]
+    return moment.astimezone(timezone.utc).strftime(fmt)
+
+
+def record(client, key, amount=1, now=None):
+    """Add ``amount`` to the current bucket of every configured granularity."""
+    for update in updates(key, amount, now):
+        client.update_item(**update)
+
+
+def record_many(client, key, moments):
+    """Add one visit at each of ``moments``, with one update per bucket."""
+    for granularity in granularities():
+        counts = Counter(_floor(granularity, moment) for moment in moments)
+        for start, amount in sorted(counts.items()):
+            client.update_item(**_update(key, granularity, amount, start))
+
+
+def updates(key, amount=1, now=None):
+    """The UpdateItem requests ``record`` makes, usable in a transaction."""
+    now = now or datetime.now(timezone.utc)
+    return [_update(key, granularity, amount, now) for granularity in granularities()]
+
+
+def _update(key, granularity, amount, now):
+    names = {"#attrName": COUNT_ATTRIBUTE}
+    values = {":inc": {"N": str(amount)}}
+    expression = "ADD #attrName :inc"
+    keep = retention(granularity)
+    if keep:
+        expires_at = _floor(granularity, now) + GRANULARITIES[granularity][1]
+        names["#ttl"] = TTL_ATTRIBUTE
+        values[":ttl"] = {"N": str(int(expires_at.timestamp()) + keep)}
+        expression += " SET #ttl = if_not_exists(#ttl, :ttl)"
+
+    return {
+        'TableName': table_name(),
+        'Key': {
+            'ID': {'S': series_key(key, granularity)},
+            'Bucket': {'S': bucket(granularity, now)}
+        },
+        'UpdateExpression': expression,
+        'ExpressionAttributeNames': names,
+        'ExpressionAttributeValues': values
+    }
+
+
+def series(client, key, granularity, start, end):
+    """Counts per bucket from ``start`` to ``end`` inclusive, zero-filled."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity {granularity!r}")
+    labels = _labels(granularity, start, end)
+    if len(labels) > MAX_POINTS:
+        raise ValueError(f"Range spans more than {MAX_POINTS} {granularity} buckets")
+
+    counts = dict.fromkeys(labels, 0)
+    params = {
+        'TableName': table_name(),
+        'KeyConditionExpression': "ID = :id AND #bucket BETWEEN :start AND :end",
+        'ProjectionExpression': "#bucket, #attrName",
+        'ExpressionAttributeNames': {"#bucket": "Bucket", "#attrName": COUNT_ATTRIBUTE},
+        'ExpressionAttributeValues': {
+            ":id": {"S": series_key(key, granularity)},
+            ":start": {"S": labels[0]},
+            ":end": {"S": labels[-1]}
+        }
+    }
+    while True:
+        response = client.query(**params)
+        for item in response['Items']:
+            counts[item['Bucket']['S']] = int(item[COUNT_ATTRIBUTE]['N'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    return [{'bucket': label, 'count': counts[label]} for label in labels]
+
+
+def _floor(granularity, moment):
+    fmt, _ = GRANULARITIES[granularity]
+    return datetime.strptime(bucket(granularity, moment), fmt).replace(tzinfo=timezone.utc)
+
+
+def _labels(granularity, start, end):
+    step = GRANULARITIES[granularity][1]
+    current, last = _floor(granularity, start), _floor(granularity, end)
+    labels = []
+    while current <= last and len(labels) <= MAX_POINTS:
+        labels.append(bucket(granularity, current))
+        current += step
+    if not labels:
+        raise ValueError("Range end is before its start")
+    return labels
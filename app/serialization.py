@@ -0,0 +1,57 @@
+import json
+import os
+from datetime import date
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the bundle
+    orjson = None
+
+JSON_HEADERS = {
+    "Access-Control-Allow-Origin": '*',
+    "Content-Type": "application/json"
+}
+
+
+class Fragment(str):
+    """A body that is already JSON, returned by ``dumps`` unchanged."""
+
+
+def backend():
+    """``orjson`` when it is installed, unless ``JSON_BACKEND=json``."""
+    if orjson is not None and os.getenv('JSON_BACKEND', 'auto') != 'json':
+        return 'orjson'
+    return 'json'
+
+
+def dumps(obj):
+    """Serialise a response body to compact JSON.
+
+    orjson encodes datetimes itself, so ``describe_table`` timestamps no
+    longer go through a Python-level hook; Decimals from DynamoDB still
+    use ``_default`` with either backend.
+    """
+    if isinstance(obj, Fragment):
+        return obj
+    if backend() == 'orjson':
+        return orjson.dumps(obj, default=_default).decode()
+    return _encoder.encode(obj)
+
+
+def constant(obj):
+    """Serialise a body that never changes once, at import time."""
+    return Fragment(_encoder.encode(obj))
+
+
+def _default(obj):
+    if isinstance(obj, date):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# json.dumps builds a new encoder whenever it is given options, so the
+# stdlib backend keeps one.
+_encoder = json.JSONEncoder(default=_default, separators=(',', ':'), ensure_ascii=False)
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+
+
+class TableMetadataCache:
+    """Keeps ``describe_table`` responses for ``TABLE_CACHE_TTL`` seconds.
+
+    DescribeTable is a control-plane call with a low account-wide rate
+    limit, so a warm container should make it at most once per TTL. With
+    ``TABLE_CACHE_BACKGROUND_REFRESH=1`` an expired entry is still served
+    while a background thread fetches the new one.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._refreshing = set()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'refreshes': 0}
+
+    def get(self, client, table_name):
+        ttl = float(os.getenv('TABLE_CACHE_TTL', '300'))
+        background = os.getenv('TABLE_CACHE_BACKGROUND_REFRESH', '0') == '1'
+
+        with self._lock:
+            entry = self._entries.get(table_name)
+            if entry is not None:
+                value, fetched_at = entry
+                if time.monotonic() - fetched_at < ttl:
+                    self._stats['hits'] += 1
+                    return value
+                if background:
+                    self._stats['stale_hits'] += 1
+                    if table_name not in self._refreshing:
+                        self._refreshing.add(table_name)
+                        threading.Thread(
+                            target=self._background_refresh,
+                            args=(client, table_name),
+                            daemon=True
+                        ).start()
+                    return value
+            self._stats['misses'] += 1
+
+        return self.refresh(client, table_name)
+
+    def refresh(self, client, table_name):
+        value = client.describe_table(TableName=table_name)
+        with self._lock:
+            self._entries[table_name] = (value, time.monotonic())
+            self._stats['refreshes'] += 1
+            stats = dict(self._stats)
+        print(json.dumps({"table_cache": stats, "table": table_name}))
+        return value
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self._refreshing.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def _background_refresh(self, client, table_name):
+        try:
+            self.refresh(client, table_name)
+        except Exception as exc:
+            print(f"Background refresh of {table_name} failed: {exc!r}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(table_name)
+
+
+cache = TableMetadataCache()
@@ -0,0 +1,133 @@
+import base64
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app import batch, clients, counter
+from app.hll import HyperLogLog, hash64
+
+SKETCH_ATTRIBUTE = "hll"
+VERSION_ATTRIBUTE = "version"
+MAX_ATTEMPTS = 5
+MAX_DAYS = 366
+
+_lock = threading.Lock()
+_sketches = {}
+
+
+def enabled():
+    return os.getenv('UNIQUE_VISITORS', '0') == '1'
+
+
+def item_id(key, day):
+    return f"{key}#uniques#{day}"
+
+
+def observe(client, table_name, fingerprint, key=counter.DEFAULT_KEY, now=None):
+    """Add a visitor fingerprint to today's sketch and return its estimate.
+
+    The container keeps its own copy of the sketch, so a visitor that
+    cannot raise any register (every repeat visit, and most new ones once
+    the sketch fills up) costs no DynamoDB request. Changes are written
+    with a version check; on a conflicting write the stored sketch is
+    reloaded and the change is merged into it again.
+    """
+    now = now or datetime.now(timezone.utc)
+    day = now.strftime('%Y-%m-%d')
+    item = item_id(key, day)
+    hashed = hash64(fingerprint)
+
+    with _lock:
+        cached = _sketches.get((key, day))
+    if cached is None:
+        cached = _load(client, table_name, item)
+    sketch, version = cached
+
+    for _ in range(MAX_ATTEMPTS):
+        if not sketch.would_change(hashed):
+            break
+        updated = sketch.copy()
+        updated.add_hash(hashed)
+        try:
+            _store(client, table_name, item, updated, version)
+        except Exception as exc:
+            if clients.error_code(exc) != 'ConditionalCheckFailedException':
+                raise
+            sketch, version = _load(client, table_name, item)
+            continue
+        sketch, version = updated, version + 1
+        break
+
+    # One sketch per page is kept, bounded by COUNTER_PAGES; only earlier
+    # days are dropped.
+    with _lock:
+        for stale in [cached_key for cached_key in _sketches if cached_key[1] < day]:
+            del _sketches[stale]
+        _sketches[(key, day)] = (sketch, version)
+    return sketch.estimate()
+
+
+def unique_visitors(client, table_name, start_day, end_day, key=counter.DEFAULT_KEY):
+    """Estimated distinct visitors over a range of days, inclusive."""
+    days = []
+    day = start_day
+    while day <= end_day:
+        days.append(day.strftime('%Y-%m-%d'))
+        day += timedelta(days=1)
+    if not days or len(days) > MAX_DAYS:
+        raise ValueError(f"Range must cover between 1 and {MAX_DAYS} days")
+
+    merged = HyperLogLog()
+    items = batch.batch_get(
+        client, table_name, [{'ID': {'S': item_id(key, d)}} for d in days],
+        projection="#sketch", names={"#sketch": SKETCH_ATTRIBUTE}
+    )
+    for stored in items:
+        merged.merge(HyperLogLog.from_bytes(_blob(stored[SKETCH_ATTRIBUTE]['B'])))
+    return merged.estimate()
+
+
+def reset():
+    with _lock:
+        _sketches.clear()
+
+
+def _load(client, table_name, item):
+    response = client.get_item(
+        TableName=table_name,
+        Key={'ID': {'S': item}},
+        ProjectionExpression="#sketch, #version",
+        ExpressionAttributeNames={"#sketch": SKETCH_ATTRIBUTE, "#version": VERSION_ATTRIBUTE},
+        ConsistentRead=True
+    )
+    stored = response.get('Item')
+    if not stored:
+        return HyperLogLog(), 0
+    sketch = HyperLogLog.from_bytes(_blob(stored[SKETCH_ATTRIBUTE]['B']))
+    return sketch, int(stored[VERSION_ATTRIBUTE]['N'])
+
+
+def _store(client, table_name, item, sketch, version):
+    if version:
+        condition = "#version = :version"
+        values = {":version": {"N": str(version)}}
+    else:
+        condition = "attribute_not_exists(#version)"
+        values = {}
+    values.update({
+        ":sketch": {"B": sketch.to_bytes()},
+        ":next": {"N": str(version + 1)}
+    })
+    client.update_item(
+        TableName=table_name,
+        Key={'ID': {'S': item}},
+        UpdateExpression="SET #sketch = :sketch, #version = :next",
+        ConditionExpression=condition,
+        ExpressionAttributeNames={"#sketch": SKETCH_ATTRIBUTE, "#version": VERSION_ATTRIBUTE},
+        ExpressionAttributeValues=values
+    )
+
+
+def _blob(value):
+    # boto3 hands back bytes, the lite client the base64 text.
+    return value if isinstance(value, (bytes, bytearray)) else base64.b64decode(value)
@@ -0,0 +1,203 @@
+import atexit
+import json
+import os
+import signal
+import threading
+import time
+
+from app import counter, visits
+
+
+def enabled():
+    return os.getenv('VISIT_BUFFERING', '0') == '1'
+
+
+class VisitBuffer:
+    """Coalesces increments in a warm container into one write per key.
+
+    Pending increments are flushed as a single ``ADD`` once
+    ``VISIT_BUFFER_MAX_COUNT`` visits are waiting, once the oldest pending
+    visit is ``VISIT_BUFFER_MAX_AGE`` seconds old, or when the runtime shuts
+    the container down. Until then the returned count is an estimate made
+    of the last flushed total plus what is still pending.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._oldest = None
+        self._last_counts = {}
+        self._target = None
+
+    def record(self, client, table_name, key=counter.DEFAULT_KEY, amount=1):
+        _install_shutdown_hooks()
+        with self._lock:
+            self._target = (client, table_name)
+            self._pending[key] = self._pending.get(key, 0) + amount
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            must_flush = key not in self._last_counts or self._due()
+            estimate = self._last_counts.get(key, 0) + self._pending[key]
+
+        if not must_flush:
+            return estimate, True
+        self.flush()
+        count = self.last_count(key)
+        if count is None:
+            return estimate, True
+        return count, False
+
+    def remember(self, key, count, added=1):
+        """Record a total written outside the buffer as the last known count.
+
+        When the total is unknown (None), a known count is raised by
+        ``added`` instead; the new count is returned.
+        """
+        with self._lock:
+            if count is not None:
+                self._last_counts[key] = count
+            elif key in self._last_counts:
+                self._last_counts[key] += added
+            return self._last_counts.get(key)
+
+    def estimate(self, key=counter.DEFAULT_KEY):
+        """Last known count plus pending visits, or None if never counted."""
+        with self._lock:
+            if key not in self._last_counts:
+                return None
+            return self._last_counts[key] + self._pending.get(key, 0)
+
+    def flush(self, client=None):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._oldest = None
+            target = self._target
+        if not pending or target is None:
+            return
+
+        table_name = target[1]
+        client = client or target[0]
+        for key, amount in list(pending.items()):
+            try:
+                count = visits.record(client, table_name, key, amount)
+            except Exception:
+                # Only the increment itself raises, so nothing restored
+                # here has been written.
+                self._restore(pending)
+                raise
+            del pending[key]
+            self.remember(key, count, amount)
+
+    def pending(self):
+        with self._lock:
+            return sum(self._pending.values())
+
+    def last_count(self, key=counter.DEFAULT_KEY):
+        with self._lock:
+            return self._last_counts.get(key)
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+            self._oldest = None
+            self._last_counts = {}
+            self._target = None
+
+    def _restore(self, pending):
+        with self._lock:
+            for key, amount in pending.items():
+                self._pending[key] = self._pending.get(key, 0) + amount
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+
+    def _due(self):
+        max_count = int(os.getenv('VISIT_BUFFER_MAX_COUNT', '25'))
+        max_age = float(os.getenv('VISIT_BUFFER_MAX_AGE', '5'))
+        return (sum(self._pending.values()) >= max_count
+                or time.monotonic() - self._oldest >= max_age)
+
+
+buffer = VisitBuffer()
+
+
+_previous_sigterm = None
+_hooks_installed = False
+
+EXTENSION_NAME = 'visit-buffer'
+
+
+def register_extension():
+    """Register an internal Lambda extension so pending visits survive shutdown.
+
+    Lambda only sends the runtime ``SIGTERM`` before reclaiming a container
+    when an extension is registered, and gives it 500 ms to flush. The
+    extension subscribes to no events; its thread waits on the Extensions
+    API for the life of the container. It must be registered during init,
+    so ``app.lambda_module`` calls this on import when buffering is on.
+    Outside Lambda there is no Extensions API and this does nothing.
+    """
+    api = os.getenv('AWS_LAMBDA_RUNTIME_API')
+    if not api:
+        return False
+    # Imported here: urllib.request alone would add ~25 ms to every init.
+    import urllib.request
+
+    try:
+        request = urllib.request.Request(
+            f'http://{api}/2020-01-01/extension/register',
+            data=json.dumps({'events': []}).encode(),
+            headers={'Lambda-Extension-Name': EXTENSION_NAME}, method='POST')
+        with urllib.request.urlopen(request, timeout=2) as response:
+            identifier = response.headers['Lambda-Extension-Identifier']
+    except Exception as exc:
+        print(f"Failed to register the {EXTENSION_NAME} extension; buffered visits "
+              f"are not flushed when the container is reclaimed: {exc!r}")
+        return False
+    _install_shutdown_hooks()
+    threading.Thread(target=_wait_for_events, args=(api, identifier),
+                     name=EXTENSION_NAME, daemon=True).start()
+    return True
+
+
+def _wait_for_events(api, identifier):
+    # Init only completes once every registered extension asks for its
+    # next event; with no events subscribed the request never returns.
+    import urllib.request
+
+    request = urllib.request.Request(
+        f'http://{api}/2020-01-01/extension/event/next',
+        headers={'Lambda-Extension-Identifier': identifier})
+    while True:
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read()
+        except Exception as exc:
+            print(f"The {EXTENSION_NAME} extension stopped: {exc!r}")
+            return
+
+
+def _install_shutdown_hooks():
+    # Lambda sends SIGTERM before shutting a container down when an
+    # extension is registered (see register_extension); atexit covers a
+    # plain interpreter exit.
+    global _previous_sigterm, _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+    atexit.register(_flush_on_shutdown)
+    if threading.current_thread() is threading.main_thread():
+        _previous_sigterm = signal.signal(signal.SIGTERM, _flush_on_shutdown)
+
+
+def _flush_on_shutdown(signum=None, frame=None):
+    try:
+        buffer.flush()
+    except Exception as exc:
+        print(f"Failed to flush buffered visits on shutdown: {exc!r}")
+    if signum is None:
+        return
+    if callable(_previous_sigterm):
+        _previous_sigterm(signum, frame)
+    elif _previous_sigterm in (signal.SIG_DFL, None):
+        signal.signal(signum, signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
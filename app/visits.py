@@ -0,0 +1,35 @@
+from app import counter, rollups
+
+
+def record(client, table_name, key=counter.DEFAULT_KEY, amount=1, now=None):
+    """Count ``amount`` visits to ``key`` and return the new lifetime total.
+
+    The lifetime counter and, when a rollup table is configured, the
+    minute/hour/day buckets are updated in the same invocation. Only the
+    counter write can make this raise, so a caller that retries or defers
+    on an error never counts a visit twice. After it, a failed rollup
+    update is logged and dropped, and the total is None when it could not
+    be read back.
+    """
+    total = counter.increment(client, table_name, key, amount)
+    if rollups.enabled():
+        try:
+            rollups.record(client, key, amount, now)
+        except Exception as exc:
+            print(f"Failed to update rollups for {amount} visits to {key}: {exc!r}")
+    return total
+
+
+def record_many(client, table_name, key, moments):
+    """Count one visit to ``key`` at each of ``moments`` as ``record`` does.
+
+    The lifetime counter gets a single update, and the rollups one per
+    bucket the moments fall in.
+    """
+    total = counter.increment(client, table_name, key, len(moments))
+    if rollups.enabled():
+        try:
+            rollups.record_many(client, key, moments)
+        except Exception as exc:
+            print(f"Failed to update rollups for {len(moments)} visits to {key}: {exc!r}")
+    return total
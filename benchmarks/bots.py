@@ -0,0 +1,63 @@
+"""Cost and accuracy of ``app.bots.classify`` on real user agents.
+
+    python -m benchmarks.bots
+
+``benchmarks/user_agents.tsv`` holds labelled user agents from current
+browsers, in-app browsers, crawlers, link previewers, monitors and HTTP
+libraries. Cold timings clear the user agent cache before every call.
+"""
+import json
+import os
+import timeit
+
+from app import bots
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'user_agents.tsv')
+
+
+def corpus():
+    with open(CORPUS) as f:
+        return [line.rstrip('\n').split('\t', 1) for line in f if line.strip('\n')]
+
+
+def browser_event(user_agent):
+    return {'headers': {
+        'Accept': '*/*',
+        'Accept-Encoding': 'gzip, deflate, br, zstd',
+        'Accept-Language': 'en-GB,en;q=0.9',
+        'Origin': 'https://example.com',
+        'Referer': 'https://example.com/',
+        'User-Agent': user_agent,
+    }}
+
+
+def per_call_us(function, events, number):
+    seconds = min(timeit.repeat(lambda: [function(event) for event in events],
+                                number=number, repeat=5))
+    return round(seconds / number / len(events) * 1e6, 3)
+
+
+def cold(event):
+    bots._matches.cache_clear()
+    return bots.classify(event)
+
+
+def main():
+    labelled = corpus()
+    events = {label: [browser_event(ua) for l, ua in labelled if l == label]
+              for label in ('human', 'bot')}
+    misses = [ua for label, ua in labelled
+              if (bots.classify(browser_event(ua)) is not None) != (label == 'bot')]
+
+    print(json.dumps({
+        'user_agents': len(labelled),
+        'misclassified': misses,
+        'cold_human_us': per_call_us(cold, events['human'], 200),
+        'cold_bot_us': per_call_us(cold, events['bot'], 200),
+        'warm_human_us': per_call_us(bots.classify, events['human'], 2000),
+        'warm_bot_us': per_call_us(bots.classify, events['bot'], 2000),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
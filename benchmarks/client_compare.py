@@ -0,0 +1,87 @@
+"""Compare the boto3 and lightweight DynamoDB clients.
+
+Each client runs in a fresh interpreter against a local HTTP stand-in and
+reports time to the first completed call (imports, client creation,
+signing and the request itself), peak RSS, and per-call latency over
+warm UpdateItem calls.
+
+    python -m benchmarks.client_compare --calls 2000 --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from tests.http_dynamodb import HTTPDynamoDB, canned
+
+RESPONSES = {'UpdateItem': {'Attributes': {'count': {'N': '1'}}}}
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from app import clients
+client = clients.dynamodb()
+params = dict(
+    TableName='BenchTable',
+    Key={'ID': {'S': 'page_counter'}},
+    UpdateExpression='SET #c = if_not_exists(#c, :start) + :inc',
+    ExpressionAttributeNames={'#c': 'count'},
+    ExpressionAttributeValues={':start': {'N': '0'}, ':inc': {'N': '1'}},
+    ReturnValues='UPDATED_NEW',
+)
+client.update_item(**params)
+first = time.perf_counter()
+latencies = []
+for _ in range(int(sys.argv[1])):
+    call_started = time.perf_counter()
+    client.update_item(**params)
+    latencies.append((time.perf_counter() - call_started) * 1e6)
+latencies.sort()
+# VmHWM belongs to this process image; ru_maxrss can report the
+# parent's peak from before exec.
+with open('/proc/self/status') as status:
+    peak_kb = next(int(l.split()[1]) for l in status if l.startswith('VmHWM'))
+print(json.dumps({
+    'first_call_ms': (first - started) * 1000,
+    'peak_rss_mb': peak_kb / 1024,
+    'p50_us': latencies[len(latencies) // 2],
+    'p99_us': latencies[int(len(latencies) * 0.99)],
+}))
+"""
+
+
+def run(client, endpoint_url, calls, runs):
+    env = dict(
+        os.environ,
+        DYNAMODB_CLIENT=client,
+        AWS_ENDPOINT_URL_DYNAMODB=endpoint_url,
+        AWS_ACCESS_KEY_ID='bench',
+        AWS_SECRET_ACCESS_KEY='bench',
+        AWS_REGION='eu-west-1',
+        AWS_DEFAULT_REGION='eu-west-1',
+    )
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', CHILD, str(calls)],
+                                env=env, capture_output=True, text=True, check=True)
+        samples.append(json.loads(result.stdout))
+    return {name: round(statistics.median(s[name] for s in samples), 1)
+            for name in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with HTTPDynamoDB(canned(RESPONSES)) as standin:
+        for client in ('boto3', 'lite'):
+            result = run(client, standin.endpoint_url, args.calls, args.runs)
+            print(json.dumps({'client': client, **result}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Measure handler import time and first-invocation latency.
+
+Each run starts a fresh interpreter that imports ``app.lambda_module`` and
+invokes a handler once against a local HTTP endpoint answering with canned
+DynamoDB responses, so the numbers include client creation, request
+signing and a real HTTP round trip but no network latency.
+
+    python -m benchmarks.cold_start --runs 10 --handler visit_handler
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from tests.http_dynamodb import HTTPDynamoDB, canned
+
+CANNED = {
+    'UpdateItem': {'Attributes': {'count': {'N': '1'}}},
+    'DescribeTable': {'Table': {
+        'TableName': 'BenchTable', 'TableStatus': 'ACTIVE',
+        'CreationDateTime': 1700000000.0, 'ItemCount': 1
+    }},
+    'BatchGetItem': {'Responses': {'BenchTable': []}},
+}
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app.lambda_module as module
+imported = time.perf_counter()
+getattr(module, sys.argv[1])({}, {})
+invoked = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'first_invocation_ms': (invoked - imported) * 1000,
+}))
+"""
+
+
+def measure(repo, handler, runs, extra_env=None):
+    standin = HTTPDynamoDB(canned(CANNED)).start()
+    env = dict(
+        os.environ,
+        TABLE_NAME='BenchTable',
+        AWS_ENDPOINT_URL_DYNAMODB=standin.endpoint_url,
+        AWS_ACCESS_KEY_ID='bench',
+        AWS_SECRET_ACCESS_KEY='bench',
+        AWS_DEFAULT_REGION='eu-west-1',
+        PYTHONDONTWRITEBYTECODE='1',
+        **(extra_env or {})
+    )
+    samples = []
+    try:
+        for _ in range(runs):
+            result = subprocess.run(
+                [sys.executable, '-c', CHILD, handler],
+                cwd=repo, env=env, capture_output=True, text=True, check=True
+            )
+            samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    finally:
+        standin.stop()
+    return {
+        name: statistics.median(sample[name] for sample in samples)
+        for name in ('import_ms', 'first_invocation_ms')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repo', default=os.getcwd())
+    parser.add_argument('--handler', default='visit_handler')
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    result = measure(args.repo, args.handler, args.runs)
+    result['total_ms'] = result['import_ms'] + result['first_invocation_ms']
+    print(json.dumps({'handler': args.handler, 'runs': args.runs,
+                      **{k: round(v, 1) for k, v in result.items()}}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""CPU cost against bytes saved for each response encoding and level.
+
+    python -m benchmarks.compression
+
+Times ``app.compression.compress`` end to end (encode, compress, base64)
+on the debug ``GET /`` body, a full-day minute series and a visit body.
+"""
+import json
+import os
+import timeit
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from app import compression, serialization
+from benchmarks.serialization import api_event, describe_table
+
+
+def bodies():
+    start = datetime(2026, 10, 17, tzinfo=timezone.utc)
+    series = [{"bucket": (start + timedelta(minutes=i)).strftime('%Y-%m-%dT%H:%M'),
+               "count": (i * 7) % 13} for i in range(1440)]
+    return {
+        'debug_root': serialization.dumps(
+            {"message": "Hello World", 'table': describe_table(), "event": api_event()}),
+        'series_minute_day': serialization.dumps({"granularity": "minute", "series": series}),
+        'visit': serialization.dumps({"message": "Update successful", "updated_value": "1234"}),
+    }
+
+
+def settings():
+    for level in (1, 6, 9):
+        yield 'gzip', {'COMPRESSION_LEVEL': str(level)}, level
+    if compression.brotli is not None:
+        for quality in (1, 4, 11):
+            yield 'br', {'COMPRESSION_BROTLI_QUALITY': str(quality)}, quality
+
+
+def main():
+    for name, body in bodies().items():
+        size = len(body.encode())
+        for coding, env, level in settings():
+            with patch.dict(os.environ, {'COMPRESSION_MIN_SIZE': '1', **env}):
+                response = compression.compress({'body': body}, coding)
+                seconds = min(timeit.repeat(
+                    lambda: compression.compress({'body': body}, coding), number=200, repeat=5))
+            # API Gateway decodes the base64 payload, so clients receive
+            # the compressed bytes.
+            received = len(compression.base64.b64decode(response['body']))
+            print(json.dumps({
+                'body': name,
+                'coding': coding,
+                'level': level,
+                'bytes': size,
+                'received_bytes': received,
+                'lambda_payload_bytes': len(response['body']),
+                'saved': round(1 - received / size, 3),
+                'us': round(seconds / 200 * 1e6, 1),
+            }))
+
+
+if __name__ == '__main__':
+    main()
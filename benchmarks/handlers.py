@@ -0,0 +1,220 @@
+"""Cold start, warm latency, throughput and memory of the API handlers.
+
+Each run starts a fresh interpreter that times ``import app.lambda_module``
+and the first invocation, then makes warm invocations and reports their
+p50/p95/p99 latency, invocations per second and peak RSS. Runs are
+summarised by their median and written as JSON, so results from two
+commits can be compared; ``--repo`` measures another checkout:
+
+    python -m benchmarks.handlers --repo ../baseline --output before.json
+    python -m benchmarks.handlers --output after.json
+    python -m benchmarks.handlers --compare before.json after.json
+
+``--backend`` chooses what DynamoDB calls reach: ``http`` is a local
+HTTP endpoint with canned responses (client, signing and a real round
+trip; the only backend whose import time matches Lambda's), ``memory``
+is ``tests.memory_dynamodb``, which keeps state in process without any
+HTTP, and ``moto`` is moto's much slower emulation. Feature flags are passed with ``--env``.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+TABLE_NAME = 'BenchTable'
+HANDLERS = ('lambda_handler', 'visit_handler')
+BACKENDS = ('http', 'memory', 'moto')
+# Lower is better for every metric but this one.
+HIGHER_IS_BETTER = {'ops_per_s'}
+CANNED = {
+    'UpdateItem': {'Attributes': {'count': {'N': '1'}}},
+    'GetItem': {},
+    'BatchGetItem': {'Responses': {TABLE_NAME: []}},
+    'DescribeTable': {'Table': {
+        'TableName': TABLE_NAME, 'TableStatus': 'ACTIVE',
+        'CreationDateTime': 1700000000.0, 'ItemCount': 1
+    }},
+}
+
+
+def child(handler, backend, invocations):
+    """Body of one run; prints its measurements as a JSON line.
+
+    This file runs as a script with ``--repo`` on the path, so nothing
+    from the checkout is imported before the timed import, and checkouts
+    that predate this benchmark can be measured. The event comes on stdin.
+    """
+    event = json.load(sys.stdin)
+    if backend == 'moto':
+        import boto3
+        from moto import mock_aws
+
+        mock_aws().start()
+        create_table(boto3.client('dynamodb'))
+
+    started = time.perf_counter()
+    import app.lambda_module as module
+    imported = time.perf_counter()
+
+    if backend == 'memory':
+        from app import clients
+        from tests.memory_dynamodb import MemoryDynamoDB
+
+        clients.register('dynamodb', MemoryDynamoDB())
+        create_table(clients.dynamodb())
+
+    function = getattr(module, handler)
+    prepared = time.perf_counter()
+    function(event, {})
+    invoked = time.perf_counter()
+
+    latencies = []
+    for _ in range(invocations):
+        call_started = time.perf_counter()
+        function(event, {})
+        latencies.append(time.perf_counter() - call_started)
+    latencies.sort()
+    # VmHWM belongs to this process image; ru_maxrss can report the
+    # parent's peak from before exec.
+    with open('/proc/self/status') as status:
+        peak_kb = next(int(line.split()[1]) for line in status if line.startswith('VmHWM'))
+    print(json.dumps({
+        'import_ms': (imported - started) * 1000,
+        'first_invocation_ms': (invoked - prepared) * 1000,
+        'p50_us': percentile(latencies, 0.50) * 1e6,
+        'p95_us': percentile(latencies, 0.95) * 1e6,
+        'p99_us': percentile(latencies, 0.99) * 1e6,
+        'ops_per_s': len(latencies) / sum(latencies),
+        'peak_rss_mb': peak_kb / 1024,
+    }))
+
+
+def create_table(dynamodb):
+    dynamodb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+        ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+    )
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(repo, handler, backend, invocations, runs, extra_env=None):
+    from benchmarks.serialization import api_event
+    from tests.http_dynamodb import HTTPDynamoDB, canned
+
+    env = dict(
+        os.environ,
+        TABLE_NAME=TABLE_NAME,
+        AWS_ACCESS_KEY_ID='bench',
+        AWS_SECRET_ACCESS_KEY='bench',
+        AWS_REGION='eu-west-1',
+        AWS_DEFAULT_REGION='eu-west-1',
+        PYTHONDONTWRITEBYTECODE='1',
+        PYTHONPATH=os.path.abspath(repo),
+        **(extra_env or {})
+    )
+    standin = None
+    if backend == 'http':
+        standin = HTTPDynamoDB(canned(CANNED)).start()
+        env['AWS_ENDPOINT_URL_DYNAMODB'] = standin.endpoint_url
+    samples = []
+    try:
+        for _ in range(runs):
+            result = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child',
+                 handler, backend, str(invocations)],
+                input=json.dumps(api_event()), cwd=repo, env=env,
+                capture_output=True, text=True, check=True
+            )
+            samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    finally:
+        if standin is not None:
+            standin.stop()
+    return {name: round(statistics.median(sample[name] for sample in samples), 2)
+            for name in samples[0]}
+
+
+def revision(repo):
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before, after, threshold):
+    """Print each metric's change; return the metrics that got worse."""
+    regressions = []
+    for handler, metrics in after['results'].items():
+        baseline = before['results'].get(handler)
+        if baseline is None:
+            continue
+        for name, value in metrics.items():
+            if not baseline.get(name):
+                continue
+            change = value / baseline[name] - 1
+            worse = -change if name in HIGHER_IS_BETTER else change
+            flag = ' REGRESSION' if worse > threshold else ''
+            if flag:
+                regressions.append((handler, name))
+            print(f"{handler:16} {name:20} {baseline[name]:>12} -> {value:>12} "
+                  f"{change:+.1%}{flag}")
+    return regressions
+
+
+def main():
+    if sys.argv[1:2] == ['--child']:
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repo', default=os.getcwd())
+    parser.add_argument('--backend', choices=BACKENDS, default='http')
+    parser.add_argument('--handler', action='append', choices=HANDLERS,
+                        help='handler to measure; repeat for several (default: all)')
+    parser.add_argument('--invocations', type=int, default=1000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='environment variable for the handlers, e.g. BOT_FILTER=1')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two result files instead of measuring')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='relative change reported as a regression (default 0.1)')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f, open(args.compare[1]) as g:
+            regressions = compare(json.load(f), json.load(g), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    extra_env = dict(item.split('=', 1) for item in args.env)
+    report = {
+        'revision': revision(args.repo),
+        'python': platform.python_version(),
+        'backend': args.backend,
+        'invocations': args.invocations,
+        'runs': args.runs,
+        'env': extra_env,
+        'results': {},
+    }
+    for handler in args.handler or HANDLERS:
+        report['results'][handler] = measure(
+            args.repo, handler, args.backend, args.invocations, args.runs, extra_env)
+        print(json.dumps({'handler': handler, **report['results'][handler]}))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Cost of HyperLogLog updates, merges and serialisation, plus accuracy.
+
+    python -m benchmarks.hll
+"""
+import json
+import timeit
+
+from app.hll import RELATIVE_ERROR, HyperLogLog, hash64
+
+
+def per_call_us(statement, number, setup_globals):
+    seconds = min(timeit.repeat(statement, globals=setup_globals, number=number, repeat=5))
+    return round(seconds / number * 1e6, 3)
+
+
+def main():
+    full = HyperLogLog()
+    for i in range(100000):
+        full.add(f'visitor-{i}')
+    other = HyperLogLog()
+    for i in range(50000, 150000):
+        other.add(f'visitor-{i}')
+    data = full.to_bytes()
+    hashed = hash64(b'returning visitor')
+    full.add_hash(hashed)
+    scope = {'full': full, 'other': other, 'data': data, 'hashed': hashed,
+             'hash64': hash64, 'HyperLogLog': HyperLogLog}
+
+    timings = {
+        'hash64_us': per_call_us("hash64(b'203.0.113.7 Mozilla/5.0')", 100000, scope),
+        'would_change_us': per_call_us("full.would_change(hashed)", 100000, scope),
+        'add_hash_us': per_call_us("full.add_hash(hashed)", 100000, scope),
+        'estimate_us': per_call_us("full.estimate()", 2000, scope),
+        'merge_us': per_call_us("full.copy().merge(other)", 2000, scope),
+        'to_bytes_us': per_call_us("full.to_bytes()", 2000, scope),
+        'from_bytes_us': per_call_us("HyperLogLog.from_bytes(data)", 2000, scope),
+    }
+    print(json.dumps({'serialised_bytes': len(data), **timings}))
+
+    for cardinality in (1000, 10000, 100000, 1000000):
+        sketch = HyperLogLog()
+        for i in range(cardinality):
+            sketch.add(f'id-{i}')
+        estimate = sketch.estimate()
+        print(json.dumps({
+            'cardinality': cardinality,
+            'estimate': estimate,
+            'error': round((estimate - cardinality) / cardinality, 4),
+            'standard_error': round(RELATIVE_ERROR, 4),
+        }))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""Drive ``visit_handler`` concurrently and check that no visit is lost.
+
+    python -m benchmarks.load --requests 5000 --concurrency 64
+    python -m benchmarks.load --pool process --concurrency 8 --rps 200 \\
+        --throttle --wcu 100 --rcu 100 --env COUNTER_SHARDS=4 \\
+        --env DDB_RESILIENCE=1 --env DDB_WRITE_CAPACITY=25 --env DDB_READ_CAPACITY=25
+
+Visits go to ``tests.memory_dynamodb``. With ``--pool thread`` (the
+default) every worker is a thread in this process calling the stand-in
+directly, which stresses atomicity but shares one container's module
+state. With ``--pool process`` every worker is a separate interpreter,
+so each behaves like its own container, and they reach the stand-in
+through a local HTTP endpoint. ``--rps`` paces requests on a fixed
+schedule shared by all workers; without it each worker sends its next
+request as soon as the last one returns.
+
+When the load is over, the stored total must equal the number of
+visits answered with 200, and each worker must have seen strictly
+increasing counts. Any other result makes the exit status 1. The
+report also gives DynamoDB request and throttle counts, handler
+outcomes and a latency histogram, for sizing ``COUNTER_SHARDS`` and
+capacity. ``--output`` writes it as JSON.
+"""
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+TABLE_NAME = 'LoadTable'
+# Invocation time budget reported to app.resilience.
+TIMEOUT_MS = 3000
+
+
+class Context:
+    def __init__(self):
+        self._deadline = time.monotonic() + TIMEOUT_MS / 1000
+
+    def get_remaining_time_in_millis(self):
+        return int((self._deadline - time.monotonic()) * 1000)
+
+
+def worker(offsets, start):
+    """Send one visit per offset.
+
+    Returns a ``[latency, lag, status, count, kind, finished]`` row per
+    visit, with ``finished`` in seconds from ``start``.
+    """
+    from app.lambda_module import visit_handler
+    from benchmarks.serialization import api_event
+
+    event = api_event()
+    rows = []
+    for offset in offsets:
+        lag = time.time() - (start + offset)
+        if lag < 0:
+            time.sleep(-lag)
+            lag = 0.0
+        started = time.perf_counter()
+        try:
+            response = visit_handler(event, Context())
+        except Exception:
+            # Lambda answers an unhandled error with a 502 from API Gateway.
+            response = {'statusCode': 502}
+        latency = time.perf_counter() - started
+        count, kind = None, 'error'
+        if response['statusCode'] == 200:
+            body = json.loads(response['body'])
+            count = int(body['updated_value'])
+            kind = ('stale' if body.get('stale')
+                    else 'estimated' if body.get('estimated') else 'ok')
+        rows.append([latency, lag, response['statusCode'], count, kind, time.time() - start])
+    return rows
+
+
+def child():
+    """One container of ``--pool process``.
+
+    Says when its imports are done and its client is created, so cold
+    starts (see ``benchmarks/handlers.py``) are not counted against the
+    schedule, then reads its work from stdin.
+    """
+    import app.lambda_module  # noqa: F401
+    from app import clients
+    from app.visit_buffer import buffer
+
+    clients.dynamodb()
+
+    print('ready', flush=True)
+    work = json.loads(sys.stdin.readline())
+    rows = worker(work['offsets'], work['start'])
+    try:
+        buffer.flush()
+    except Exception as exc:
+        # The visits it held are then missing from the total.
+        print(f"Final flush failed: {exc!r}", file=sys.stderr)
+    print(json.dumps(rows))
+
+
+def plan(requests, rps, concurrency):
+    """Each worker's send offsets in seconds from the start."""
+    offsets = [i / rps if rps else 0.0 for i in range(requests)]
+    return [offsets[i::concurrency] for i in range(concurrency)]
+
+
+def standin(args):
+    from tests.memory_dynamodb import MemoryDynamoDB
+
+    dynamodb = MemoryDynamoDB(throttling=args.throttle, burst_seconds=args.burst)
+    dynamodb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+        ProvisionedThroughput={'ReadCapacityUnits': args.rcu, 'WriteCapacityUnits': args.wcu}
+    )
+    return dynamodb
+
+
+def run_threads(dynamodb, plans, extra_env):
+    from concurrent.futures import ThreadPoolExecutor
+    from unittest.mock import patch
+
+    from app import clients
+    from app.visit_buffer import buffer
+
+    with patch.dict(os.environ, extra_env):
+        clients.register('dynamodb', dynamodb)
+        start = time.time() + 0.1
+        try:
+            with ThreadPoolExecutor(max_workers=len(plans)) as pool:
+                results = list(pool.map(lambda offsets: worker(offsets, start), plans))
+            buffer.flush()
+        finally:
+            buffer.reset()
+            clients.reset()
+    return results
+
+
+def run_processes(dynamodb, plans, extra_env):
+    from tests.http_dynamodb import HTTPDynamoDB
+
+    with HTTPDynamoDB(dynamodb.backend) as endpoint:
+        env = dict(
+            os.environ,
+            AWS_ENDPOINT_URL_DYNAMODB=endpoint.endpoint_url,
+            AWS_ACCESS_KEY_ID='load',
+            AWS_SECRET_ACCESS_KEY='load',
+            AWS_REGION='eu-west-1',
+            AWS_DEFAULT_REGION='eu-west-1',
+            PYTHONPATH=os.getcwd(),
+            **extra_env
+        )
+        children = [
+            subprocess.Popen([sys.executable, os.path.abspath(__file__), '--child'],
+                             stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env, text=True)
+            for _ in plans]
+        try:
+            for process in children:
+                if process.stdout.readline().strip() != 'ready':
+                    raise RuntimeError("Load worker failed to start")
+            start = time.time() + 0.1
+            for process, offsets in zip(children, plans):
+                process.stdin.write(json.dumps({'offsets': offsets, 'start': start}) + '\n')
+                process.stdin.close()
+            results = []
+            for process in children:
+                output = process.stdout.read()
+                if process.wait():
+                    raise RuntimeError(f"Load worker exited with status {process.returncode}")
+                results.append(json.loads(output))
+        finally:
+            for process in children:
+                if process.poll() is None:
+                    process.kill()
+    return results
+
+
+def histogram(latencies):
+    """Counts per power-of-two latency bucket, as ``[upper_us, count]``."""
+    buckets = Counter(2 ** max(0, math.ceil(math.log2(max(latency * 1e6, 1))))
+                      for latency in latencies)
+    return [[upper, buckets[upper]] for upper in sorted(buckets)]
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def report(results, dynamodb, shards):
+    from app import counter
+
+    rows = [row for rows in results for row in rows]
+    latencies = sorted(row[0] for row in rows)
+    lags = sorted(row[1] for row in rows)
+    outcomes = Counter(row[4] if row[2] == 200 else str(row[2]) for row in rows)
+    successful = sum(1 for row in rows if row[2] == 200)
+    operations = sum(dynamodb.operations.values())
+    throttles = sum(dynamodb.throttles.values())
+    requests, throttled = dict(dynamodb.operations), dict(dynamodb.throttles)
+    dynamodb.throttling = False
+    stored = counter.read_total(dynamodb, TABLE_NAME, shards=shards, consistent=True)
+
+    # Counts a worker saw straight from the table must keep rising.
+    regressions = 0
+    for worker_rows in results:
+        seen = [row[3] for row in worker_rows if row[4] == 'ok']
+        regressions += sum(1 for a, b in zip(seen, seen[1:]) if b <= a)
+    ok_counts = [row[3] for row in rows if row[4] == 'ok']
+
+    return {
+        'calls': len(rows),
+        'successful': successful,
+        'stored_total': stored,
+        'lost': successful - stored,
+        'non_monotonic': regressions,
+        # Sharded totals are summed from reads that can interleave.
+        'duplicate_counts': len(ok_counts) - len(set(ok_counts)) if shards == 1 else None,
+        'outcomes': dict(outcomes),
+        'achieved_rps': round(len(rows) / max(row[5] for row in rows), 1),
+        'schedule_lag_p99_ms': round(percentile(lags, 0.99) * 1000, 2),
+        'latency_us': {name: round(percentile(latencies, q) * 1e6, 1)
+                       for name, q in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99),
+                                       ('max', 1.0))},
+        'ddb_requests': requests,
+        'ddb_throttled': throttled,
+        'throttle_rate': round(throttles / operations, 4) if operations else 0.0,
+        'ddb_requests_per_call': round(operations / len(rows), 3),
+        'histogram_us': histogram(latencies),
+    }
+
+
+def print_histogram(buckets):
+    largest = max(count for _, count in buckets)
+    for upper, count in buckets:
+        bar = '#' * max(1, round(count / largest * 50))
+        print(f"  <= {upper:>9} us | {bar} {count}")
+
+
+def main():
+    if sys.argv[1:2] == ['--child']:
+        child()
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--pool', choices=('thread', 'process'), default='thread')
+    parser.add_argument('--rps', type=float, default=0,
+                        help='target requests per second over all workers (default: unpaced)')
+    parser.add_argument('--throttle', action='store_true',
+                        help='enforce the provisioned capacity below')
+    parser.add_argument('--wcu', type=int, default=5)
+    parser.add_argument('--rcu', type=int, default=5)
+    parser.add_argument('--burst', type=float, default=1,
+                        help='seconds of unused capacity a table may bank (DynamoDB: 300)')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE')
+    parser.add_argument('--output', help='write the report to this JSON file')
+    args = parser.parse_args()
+
+    extra_env = {'TABLE_NAME': TABLE_NAME, **dict(item.split('=', 1) for item in args.env)}
+    dynamodb = standin(args)
+    plans = [offsets for offsets in plan(args.requests, args.rps, args.concurrency)
+             if offsets]
+    run = run_threads if args.pool == 'thread' else run_processes
+    results = run(dynamodb, plans, extra_env)
+
+    result = report(results, dynamodb, int(extra_env.get('COUNTER_SHARDS', '1')))
+    print(json.dumps({key: value for key, value in result.items() if key != 'histogram_us'},
+                     indent=2))
+    print_histogram(result['histogram_us'])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'pool': args.pool, 'concurrency': args.concurrency, 'rps': args.rps,
+                       'env': extra_env, **result}, f, indent=2)
+            f.write('\n')
+    sys.exit(1 if result['lost'] or result['non_monotonic'] else 0)
+
+
+if __name__ == '__main__':
+    main()
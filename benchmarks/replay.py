@@ -0,0 +1,185 @@
+"""Replay recorded API Gateway events through the handlers.
+
+Recordings are the lines ``app.recorder`` writes with ``RECORD_EVENTS=1``,
+either a ``RECORD_EVENTS_PATH`` file or function logs exported from
+CloudWatch (everything before the JSON on a line is ignored):
+
+    python -m benchmarks.replay events.jsonl --speed 4 --workers 16 --output after.json
+    python -m benchmarks.handlers --compare before.json after.json
+
+Events are sent in recorded order at their recorded spacing divided by
+``--speed`` (``0`` sends them as fast as the workers take them), from a
+pool of ``--workers`` threads, so bursts arrive as they did. Each event
+goes to the handler that received it. The report has the same per-handler
+p50/p95/p99 latency and invocations per second as
+``benchmarks/handlers.py``, so the two can be compared, along with status
+codes, achieved rate and how far the pool fell behind the schedule.
+``--backend`` is ``memory`` (``tests.memory_dynamodb`` called directly)
+or ``http`` (the same stand-in behind a local endpoint, so the client's
+signing and HTTP round trip are included).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from benchmarks.handlers import TABLE_NAME, create_table, percentile, revision
+from benchmarks.load import Context
+
+
+def read(paths, handlers=None):
+    """Recorded ``(time, handler, event)`` tuples in time order."""
+    recorded = []
+    for path in paths:
+        with open(path) as f:
+            for line in f:
+                start = line.find('{')
+                if start < 0:
+                    continue
+                try:
+                    entry = json.loads(line[start:])
+                    item = (entry['t'], entry['h'], entry['e'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                if handlers is None or item[1] in handlers:
+                    recorded.append(item)
+    recorded.sort(key=lambda item: item[0])
+    return recorded
+
+
+def replay(recorded, speed, workers):
+    """Send every event on schedule; returns ``[handler, latency, lag, status]`` rows."""
+    import app.lambda_module as module
+
+    rows = []
+    lock = threading.Lock()
+
+    def invoke(name, event, scheduled):
+        lag = time.time() - scheduled
+        started = time.perf_counter()
+        try:
+            status = getattr(module, name)(event, Context())['statusCode']
+        except Exception:
+            # Lambda answers an unhandled error with a 502 from API Gateway.
+            status = 502
+        latency = time.perf_counter() - started
+        with lock:
+            rows.append([name, latency, lag, status])
+
+    first = recorded[0][0]
+    start = time.time() + 0.1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for recorded_at, name, event in recorded:
+            scheduled = start + ((recorded_at - first) / speed if speed else 0)
+            delay = scheduled - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(invoke, name, event, scheduled)
+    return rows, time.time() - start
+
+
+def run(recorded, backend, speed, workers, extra_env):
+    from app import clients, recorder, visit_buffer
+    from tests.http_dynamodb import HTTPDynamoDB
+    from tests.memory_dynamodb import MemoryDynamoDB
+
+    dynamodb = MemoryDynamoDB()
+    create_table(dynamodb)
+    env = {'TABLE_NAME': TABLE_NAME, 'RECORD_EVENTS': '0', **extra_env}
+    endpoint = None
+    if backend == 'http':
+        endpoint = HTTPDynamoDB(dynamodb.backend).start()
+        env.update(AWS_ENDPOINT_URL_DYNAMODB=endpoint.endpoint_url,
+                   AWS_ACCESS_KEY_ID='replay', AWS_SECRET_ACCESS_KEY='replay',
+                   AWS_REGION='eu-west-1', AWS_DEFAULT_REGION='eu-west-1')
+    try:
+        with patch.dict(os.environ, env):
+            clients.reset()
+            if backend == 'memory':
+                clients.register('dynamodb', dynamodb)
+            # Cold starts are measured by benchmarks/handlers.py.
+            clients.dynamodb()
+            try:
+                return replay(recorded, speed, workers)
+            finally:
+                visit_buffer.buffer.reset()
+                recorder.reset()
+                clients.reset()
+    finally:
+        if endpoint is not None:
+            endpoint.stop()
+
+
+def summarize(rows, wall):
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    for name, latency, _, status in rows:
+        latencies[name].append(latency)
+        statuses[name][str(status)] += 1
+    results = {}
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        results[name] = {
+            'p50_us': round(percentile(values, 0.50) * 1e6, 2),
+            'p95_us': round(percentile(values, 0.95) * 1e6, 2),
+            'p99_us': round(percentile(values, 0.99) * 1e6, 2),
+            'ops_per_s': round(len(values) / sum(values), 2),
+        }
+    lags = sorted(row[2] for row in rows)
+    return results, {
+        'statuses': {name: dict(counts) for name, counts in sorted(statuses.items())},
+        'achieved_rps': round(len(rows) / wall, 1),
+        'schedule_lag_p99_ms': round(percentile(lags, 0.99) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recordings', nargs='+')
+    parser.add_argument('--speed', type=float, default=1,
+                        help='replay this many times faster than recorded; 0 for no pauses')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--backend', choices=('memory', 'http'), default='memory')
+    parser.add_argument('--handler', action='append',
+                        help='only replay events for this handler; repeat for several')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='environment variable for the handlers, e.g. BOT_FILTER=1')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    args = parser.parse_args()
+
+    recorded = read(args.recordings, set(args.handler) if args.handler else None)
+    if not recorded:
+        sys.exit("No recorded events found")
+    extra_env = dict(item.split('=', 1) for item in args.env)
+    rows, wall = run(recorded, args.backend, args.speed, args.workers, extra_env)
+    results, totals = summarize(rows, wall)
+
+    for handler, metrics in results.items():
+        print(json.dumps({'handler': handler, **metrics,
+                          'statuses': totals['statuses'][handler]}))
+    print(json.dumps({'events': len(rows), 'achieved_rps': totals['achieved_rps'],
+                      'schedule_lag_p99_ms': totals['schedule_lag_p99_ms']}))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'revision': revision(os.getcwd()),
+                'python': platform.python_version(),
+                'backend': args.backend,
+                'speed': args.speed,
+                'workers': args.workers,
+                'events': len(rows),
+                'env': extra_env,
+                'results': results,
+                **totals,
+            }, f, indent=2)
+            f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
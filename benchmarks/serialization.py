@@ -0,0 +1,147 @@
+"""Response serialisation cost per backend on realistic payloads.
+
+    python -m benchmarks.serialization
+
+``legacy`` is the ``json.JSONEncoder`` subclass the handlers used before
+``app.serialization``; ``json`` and ``orjson`` are its two backends.
+"""
+import json
+import os
+import timeit
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app import serialization
+
+
+class DateTimeEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return json.JSONEncoder.default(self, obj)
+
+
+def describe_table():
+    created = datetime(2024, 3, 1, 12, 30, 5, 123000, tzinfo=timezone.utc)
+    return {
+        'Table': {
+            'AttributeDefinitions': [{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            'TableName': 'portfolio-backend-DynamoDBTable-1ABCDEFGHIJK',
+            'KeySchema': [{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            'TableStatus': 'ACTIVE',
+            'CreationDateTime': created,
+            'ProvisionedThroughput': {
+                'LastIncreaseDateTime': created,
+                'LastDecreaseDateTime': created,
+                'NumberOfDecreasesToday': 0,
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            },
+            'TableSizeBytes': 18234,
+            'ItemCount': 412,
+            'TableArn': 'arn:aws:dynamodb:us-east-1:123456789012:table/'
+                        'portfolio-backend-DynamoDBTable-1ABCDEFGHIJK',
+            'TableId': '6c1a5d3e-8f0b-4e7a-9b2c-1d4e5f6a7b8c',
+            'StreamSpecification': {'StreamEnabled': True, 'StreamViewType': 'NEW_AND_OLD_IMAGES'},
+            'LatestStreamLabel': '2024-03-01T12:30:05.123',
+            'LatestStreamArn': 'arn:aws:dynamodb:us-east-1:123456789012:table/'
+                               'portfolio-backend-DynamoDBTable-1ABCDEFGHIJK/stream/'
+                               '2024-03-01T12:30:05.123',
+            'DeletionProtectionEnabled': False
+        },
+        'ResponseMetadata': {
+            'RequestId': 'N5BV1BK8OO0G1AEJ3RFSHOSK1BVV4KQNSO5AEMVJF66Q9ASUAAJG',
+            'HTTPStatusCode': 200,
+            'HTTPHeaders': {
+                'server': 'Server',
+                'date': 'Sat, 17 Oct 2026 07:22:09 GMT',
+                'content-type': 'application/x-amz-json-1.0',
+                'content-length': '1024',
+                'connection': 'keep-alive',
+                'x-amzn-requestid': 'N5BV1BK8OO0G1AEJ3RFSHOSK1BVV4KQNSO5AEMVJF66Q9ASUAAJG',
+                'x-amz-crc32': '2134218832'
+            },
+            'RetryAttempts': 0
+        }
+    }
+
+
+def api_event():
+    headers = {
+        'Accept': 'application/json, text/plain, */*',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'Accept-Language': 'en-GB,en;q=0.9',
+        'CloudFront-Forwarded-Proto': 'https',
+        'CloudFront-Is-Desktop-Viewer': 'true',
+        'CloudFront-Viewer-Country': 'GB',
+        'Host': 'abcdef1234.execute-api.us-east-1.amazonaws.com',
+        'Origin': 'https://example.com',
+        'Referer': 'https://example.com/',
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 '
+                      '(KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36',
+        'Via': '2.0 0123456789abcdef0123456789abcdef.cloudfront.net (CloudFront)',
+        'X-Amz-Cf-Id': 'Zx8n0Jt2T5bq3Yk4vW9mP1cR6sL7hD0fG2aE5uI8oQ3yB4nM9kJ1wA==',
+        'X-Amzn-Trace-Id': 'Root=1-6710bd91-4f1c2a3b5d6e7f8091a2b3c4',
+        'X-Forwarded-For': '203.0.113.7, 130.176.1.1',
+        'X-Forwarded-Port': '443',
+        'X-Forwarded-Proto': 'https'
+    }
+    return {
+        'resource': '/',
+        'path': '/',
+        'httpMethod': 'GET',
+        'headers': headers,
+        'multiValueHeaders': {name: [value] for name, value in headers.items()},
+        'queryStringParameters': None,
+        'multiValueQueryStringParameters': None,
+        'pathParameters': None,
+        'stageVariables': None,
+        'requestContext': {
+            'resourceId': 'abc123',
+            'resourcePath': '/',
+            'httpMethod': 'GET',
+            'extendedRequestId': 'fJ3x8GcxIAMFZ0Q=',
+            'requestTime': '17/Oct/2026:07:22:09 +0000',
+            'path': '/Prod/',
+            'accountId': '123456789012',
+            'protocol': 'HTTP/1.1',
+            'stage': 'Prod',
+            'domainPrefix': 'abcdef1234',
+            'requestTimeEpoch': 1792221729000,
+            'requestId': '5b4c2f1e-9a8d-4c7b-b6a5-0f1e2d3c4b5a',
+            'identity': {'sourceIp': '203.0.113.7', 'userAgent': headers['User-Agent']},
+            'domainName': 'abcdef1234.execute-api.us-east-1.amazonaws.com',
+            'apiId': 'abcdef1234'
+        },
+        'body': None,
+        'isBase64Encoded': False
+    }
+
+
+def per_call_us(function, number):
+    seconds = min(timeit.repeat(function, number=number, repeat=5))
+    return round(seconds / number * 1e6, 2)
+
+
+def main():
+    payloads = {
+        'describe_table': {"message": "Hello World", 'table': describe_table(), "event": api_event()},
+        'visit': {"message": "Update successful", "updated_value": "1234",
+                  "unique_visitors_today": 57},
+        'health': serialization.constant({"message": "Hello World", "status": "ok"}),
+    }
+    backends = ['json'] + (['orjson'] if serialization.orjson is not None else [])
+
+    for name, payload in payloads.items():
+        result = {'payload': name, 'bytes': len(serialization.dumps(payload))}
+        if not isinstance(payload, serialization.Fragment):
+            result['legacy_us'] = per_call_us(
+                lambda: json.dumps(payload, cls=DateTimeEncoder), 20000)
+        for backend in backends:
+            with patch.dict(os.environ, {'JSON_BACKEND': backend}):
+                result[f'{backend}_us'] = per_call_us(lambda: serialization.dumps(payload), 20000)
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
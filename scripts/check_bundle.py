@@ -0,0 +1,72 @@
+"""Fail when a built function bundle exceeds its size or import-time budget.
+
+    python scripts/check_bundle.py .aws-sam/build/VisitorsCounterFunction \
+        --max-size-mb 1 --max-import-ms 30
+
+Import time is the cumulative ``python -X importtime`` figure for the
+handler module, imported from the bundle directory in a fresh interpreter;
+the fastest of ``--runs`` attempts is compared with the budget.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+def bundle_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def parse_importtime(stderr, module):
+    """Return the cumulative import time of ``module`` in microseconds."""
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if name.strip() == module:
+            return int(cumulative)
+    raise ValueError(f'{module} not found in -X importtime output')
+
+
+def import_time(path, module, python=sys.executable):
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(path))
+    result = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=path, env=env, capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr, module)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('bundle')
+    parser.add_argument('--module', default='app.lambda_module')
+    parser.add_argument('--max-size-mb', type=float, default=1.0)
+    parser.add_argument('--max-import-ms', type=float, default=30.0)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--python', default=sys.executable)
+    args = parser.parse_args(argv)
+
+    size_mb = bundle_size(args.bundle) / (1024 * 1024)
+    import_ms = min(import_time(args.bundle, args.module, args.python)
+                    for _ in range(args.runs)) / 1000
+
+    failures = []
+    if size_mb > args.max_size_mb:
+        failures.append(f'size {size_mb:.2f} MB exceeds {args.max_size_mb} MB')
+    if import_ms > args.max_import_ms:
+        failures.append(f'import of {args.module} took {import_ms:.1f} ms, '
+                        f'budget is {args.max_import_ms} ms')
+
+    print(f'{args.bundle}: {size_mb:.2f} MB, import {import_ms:.1f} ms')
+    for failure in failures:
+        print(f'FAIL: {failure}', file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TARGET_PREFIX = 'DynamoDB_20120810.'
+
+
+class HTTPDynamoDB:
+    """Local HTTP server speaking the DynamoDB JSON protocol.
+
+    ``backend`` is called with the operation name and decoded payload and
+    returns ``(status, body)``. Every request is kept in ``requests``, with
+    lower-cased header names, so tests can inspect headers and payloads.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.requests = []
+        self.connections = set()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                operation = self.headers.get('X-Amz-Target', '')[len(TARGET_PREFIX):]
+                payload = json.loads(body or b'{}')
+                standin.requests.append(
+                    (operation, {k.lower(): v for k, v in self.headers.items()}, body))
+                standin.connections.add(self.client_address)
+                status, response = standin.backend(operation, payload)
+                data = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/x-amz-json-1.0')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self.endpoint_url = f'http://127.0.0.1:{self._server.server_port}'
+
+    def start(self):
+        # A short poll interval keeps stop() from waiting up to half a second.
+        threading.Thread(target=self._server.serve_forever, args=(0.01,), daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def canned(responses):
+    """Backend answering each operation with a fixed response body."""
+    def backend(operation, payload):
+        return 200, responses.get(operation, {})
+    return backend
+
+
+def error(code, message='', status=400):
+    return status, {
+        '__type': f'com.amazonaws.dynamodb.v20120810#{code}',
+        'message': message
+    }
@@ -0,0 +1,803 @@
+import math
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from decimal import Decimal
+from functools import lru_cache
+
+from app.dynamodb_lite import DynamoDBError
+
+TOKEN = re.compile(r'\s*(?:(#\w+)|(:\w+)|([A-Za-z_]\w*)|(<>|<=|>=|[=<>(),+-]))')
+KEYWORDS = {'AND', 'OR', 'NOT', 'BETWEEN', 'IN', 'SET', 'ADD', 'REMOVE', 'DELETE'}
+COMPARATORS = {'=', '<>', '<', '<=', '>', '>='}
+UPDATE_CLAUSES = {'SET', 'ADD', 'REMOVE', 'DELETE'}
+
+
+class MemoryDynamoDB:
+    """In-process DynamoDB for tests and benchmarks.
+
+    Takes the same keyword arguments and returns the same shapes as a
+    boto3 client, and raises ``DynamoDBError`` for service errors, so it
+    can be registered with ``app.clients.register`` in place of one.
+    ``backend`` plugs it into ``HTTPDynamoDB`` for the lite client and
+    for benchmarks that want the HTTP round trip.
+
+    It supports the operations and expression forms this project uses:
+    ``SET`` with ``if_not_exists`` and ``+``/``-``, ``ADD``, ``REMOVE``,
+    conditions with comparisons, ``BETWEEN``, ``IN``, ``AND``/``OR``/
+    ``NOT``, ``attribute_exists``, ``attribute_not_exists``,
+    ``attribute_type`` and ``begins_with``, projections, key conditions
+    and transactions.
+    Like DynamoDB, each request is applied atomically, and unused
+    expression attribute names or values are rejected.
+
+    With ``throttling=True``, tables created with ``ProvisionedThroughput``
+    get read and write capacity that refills every second and keeps up to
+    ``burst_seconds`` of unused capacity. Requests that find too little
+    are refused with ``ProvisionedThroughputExceededException``, or a
+    ``ThrottlingError`` cancellation for transactions, and counted in
+    ``throttles``. ``operations`` counts every request.
+    """
+
+    def __init__(self, throttling=False, burst_seconds=300, clock=time.monotonic):
+        self.throttling = throttling
+        self.burst_seconds = burst_seconds
+        self.clock = clock
+        self.operations = Counter()
+        self.throttles = Counter()
+        self._tables = {}
+        self._lock = threading.RLock()
+
+    # Control plane
+
+    def create_table(self, TableName, KeySchema, AttributeDefinitions,
+                     ProvisionedThroughput=None, **params):
+        with self._lock:
+            if TableName in self._tables:
+                raise _error('ResourceInUseException', f"Table already exists: {TableName}",
+                             'CreateTable')
+            self._tables[TableName] = _Table(self, TableName, KeySchema,
+                                             AttributeDefinitions, ProvisionedThroughput)
+            return {'TableDescription': self._tables[TableName].describe()}
+
+    def delete_table(self, TableName):
+        with self._lock:
+            table = self._table(TableName, 'DeleteTable')
+            del self._tables[TableName]
+            return {'TableDescription': table.describe()}
+
+    def describe_table(self, TableName):
+        with self._lock:
+            self.operations['DescribeTable'] += 1
+            return {'Table': self._table(TableName, 'DescribeTable').describe()}
+
+    # Single items
+
+    def get_item(self, TableName, Key, ProjectionExpression=None,
+                 ExpressionAttributeNames=None, ConsistentRead=False):
+        with self._lock:
+            table = self._start('GetItem', TableName)
+            names = ExpressionAttributeNames or {}
+            _unused(names, {}, 'GetItem', ProjectionExpression)
+            projection = _parse(ProjectionExpression, 'projection', 'GetItem')
+            item = table.items.get(table.key(Key, 'GetItem'))
+            table.read('GetItem', _size(item), ConsistentRead)
+            if item is None:
+                return {}
+            return {'Item': _project(item, projection, names)}
+
+    def put_item(self, TableName, Item, ConditionExpression=None,
+                 ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                 ReturnValues='NONE'):
+        with self._lock:
+            table = self._start('PutItem', TableName)
+            key = table.key(Item, 'PutItem')
+            old = table.items.get(key)
+            _check(ConditionExpression, old, ExpressionAttributeNames,
+                   ExpressionAttributeValues, 'PutItem')
+            table.write('PutItem', _size(Item))
+            table.items[key] = _copy(Item)
+            return {'Attributes': _copy(old)} if ReturnValues == 'ALL_OLD' and old else {}
+
+    def update_item(self, TableName, Key, UpdateExpression, ConditionExpression=None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                    ReturnValues='NONE'):
+        with self._lock:
+            table = self._start('UpdateItem', TableName)
+            key = table.key(Key, 'UpdateItem')
+            old = table.items.get(key)
+            _check(ConditionExpression, old, ExpressionAttributeNames,
+                   ExpressionAttributeValues, 'UpdateItem', UpdateExpression)
+            new, updated = _update(old, Key, UpdateExpression, ExpressionAttributeNames,
+                                   ExpressionAttributeValues)
+            table.write('UpdateItem', max(_size(old), _size(new)))
+            table.items[key] = new
+            return _returned(ReturnValues, old or {}, new, updated)
+
+    def delete_item(self, TableName, Key, ConditionExpression=None,
+                    ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                    ReturnValues='NONE'):
+        with self._lock:
+            table = self._start('DeleteItem', TableName)
+            key = table.key(Key, 'DeleteItem')
+            old = table.items.get(key)
+            _check(ConditionExpression, old, ExpressionAttributeNames,
+                   ExpressionAttributeValues, 'DeleteItem')
+            table.write('DeleteItem', _size(old))
+            table.items.pop(key, None)
+            return {'Attributes': _copy(old)} if ReturnValues == 'ALL_OLD' and old else {}
+
+    # Several items
+
+    def query(self, TableName, KeyConditionExpression, FilterExpression=None,
+              ProjectionExpression=None, ExpressionAttributeNames=None,
+              ExpressionAttributeValues=None, ConsistentRead=False,
+              ScanIndexForward=True, Limit=None, ExclusiveStartKey=None):
+        with self._lock:
+            table = self._start('Query', TableName)
+            names = ExpressionAttributeNames or {}
+            values = ExpressionAttributeValues or {}
+            _unused(names, values, 'Query', KeyConditionExpression, FilterExpression,
+                    ProjectionExpression)
+            condition = _parse(KeyConditionExpression, 'condition', 'Query')
+            matches = [item for item in table.items.values()
+                       if _evaluate(condition, item, names, values)]
+            return self._page(table, 'Query', matches, FilterExpression,
+                              ProjectionExpression, names, values, ConsistentRead,
+                              ScanIndexForward, Limit, ExclusiveStartKey)
+
+    def scan(self, TableName, FilterExpression=None, ProjectionExpression=None,
+             ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+             ConsistentRead=False, Limit=None, ExclusiveStartKey=None):
+        with self._lock:
+            table = self._start('Scan', TableName)
+            names = ExpressionAttributeNames or {}
+            values = ExpressionAttributeValues or {}
+            _unused(names, values, 'Scan', FilterExpression, ProjectionExpression)
+            return self._page(table, 'Scan', list(table.items.values()), FilterExpression,
+                              ProjectionExpression, names, values, ConsistentRead,
+                              True, Limit, ExclusiveStartKey)
+
+    def batch_get_item(self, RequestItems):
+        with self._lock:
+            self.operations['BatchGetItem'] += 1
+            if sum(len(request['Keys']) for request in RequestItems.values()) > 100:
+                raise _error('ValidationException',
+                             "Too many items requested for the BatchGetItem call",
+                             'BatchGetItem')
+            responses, unprocessed, processed = {}, {}, 0
+            for table_name, request in RequestItems.items():
+                table = self._table(table_name, 'BatchGetItem')
+                names = request.get('ExpressionAttributeNames') or {}
+                projection = _parse(request.get('ProjectionExpression'), 'projection',
+                                    'BatchGetItem')
+                found = responses.setdefault(table_name, [])
+                for key in request['Keys']:
+                    item = table.items.get(table.key(key, 'BatchGetItem'))
+                    if not table.afford('read', _read_units(
+                            _size(item), request.get('ConsistentRead', False))):
+                        unprocessed.setdefault(table_name, {**request, 'Keys': []})
+                        unprocessed[table_name]['Keys'].append(key)
+                        continue
+                    processed += 1
+                    if item is not None:
+                        found.append(_project(item, projection, names))
+            self._all_throttled('BatchGetItem', unprocessed, processed)
+            return {'Responses': responses, 'UnprocessedKeys': unprocessed}
+
+    def batch_write_item(self, RequestItems):
+        with self._lock:
+            self.operations['BatchWriteItem'] += 1
+            if sum(len(requests) for requests in RequestItems.values()) > 25:
+                raise _error('ValidationException',
+                             "Too many items requested for the BatchWriteItem call",
+                             'BatchWriteItem')
+            unprocessed, processed = {}, 0
+            for table_name, requests in RequestItems.items():
+                table = self._table(table_name, 'BatchWriteItem')
+                for request in requests:
+                    if 'PutRequest' in request:
+                        item = request['PutRequest']['Item']
+                        key = table.key(item, 'BatchWriteItem')
+                    else:
+                        item = None
+                        key = table.key(request['DeleteRequest']['Key'], 'BatchWriteItem')
+                    if not table.afford('write', _write_units(
+                            _size(item or table.items.get(key)))):
+                        unprocessed.setdefault(table_name, []).append(request)
+                        continue
+                    processed += 1
+                    if item is None:
+                        table.items.pop(key, None)
+                    else:
+                        table.items[key] = _copy(item)
+            self._all_throttled('BatchWriteItem', unprocessed, processed)
+            return {'UnprocessedItems': unprocessed}
+
+    def transact_write_items(self, TransactItems, **params):
+        with self._lock:
+            self.operations['TransactWriteItems'] += 1
+            if len(TransactItems) > 100:
+                raise _error('ValidationException',
+                             "Member must have length less than or equal to 100",
+                             'TransactWriteItems')
+            results, reasons, seen = [], [], set()
+            for entry in TransactItems:
+                (kind, request), = entry.items()
+                table = self._table(request['TableName'], 'TransactWriteItems')
+                item_key = request['Item'] if kind == 'Put' else request['Key']
+                key = table.key(item_key, 'TransactWriteItems')
+                if (table.name, key) in seen:
+                    raise _error('ValidationException',
+                                 "Transaction request cannot include multiple operations "
+                                 "on one item", 'TransactWriteItems')
+                seen.add((table.name, key))
+                old = table.items.get(key)
+                names = request.get('ExpressionAttributeNames')
+                values = request.get('ExpressionAttributeValues')
+                try:
+                    _check(request.get('ConditionExpression'), old, names, values,
+                           'TransactWriteItems', request.get('UpdateExpression'))
+                except DynamoDBError as exc:
+                    if exc.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                        raise
+                    reasons.append({'Code': 'ConditionalCheckFailed',
+                                    'Message': 'The conditional request failed'})
+                    continue
+                if kind == 'Put':
+                    new = _copy(request['Item'])
+                elif kind == 'Update':
+                    new, _ = _update(old, request['Key'], request['UpdateExpression'],
+                                     names, values)
+                elif kind == 'Delete':
+                    new = None
+                else:
+                    new = old
+                results.append((table, key, kind, new, max(_size(old), _size(new))))
+                reasons.append({'Code': 'None'})
+
+            if all(reason['Code'] == 'None' for reason in reasons):
+                # Transactions cost twice the units of the plain writes.
+                for i, (table, _, kind, _, size) in enumerate(results):
+                    if kind != 'ConditionCheck' and not table.afford(
+                            'write', 2 * _write_units(size)):
+                        reasons[i] = {'Code': 'ThrottlingError',
+                                      'Message': 'Throughput exceeds the current capacity '
+                                                 'of your table or index.'}
+                        self.throttles['TransactWriteItems'] += 1
+            if any(reason['Code'] != 'None' for reason in reasons):
+                codes = ', '.join(reason['Code'] for reason in reasons)
+                raise DynamoDBError(
+                    'TransactionCanceledException',
+                    f"Transaction cancelled, please refer cancellation reasons for "
+                    f"specific reasons [{codes}]", 400, 'TransactWriteItems', reasons)
+
+            for table, key, kind, new, _ in results:
+                if kind == 'Delete':
+                    table.items.pop(key, None)
+                elif kind != 'ConditionCheck':
+                    table.items[key] = new
+            return {}
+
+    # HTTPDynamoDB
+
+    def backend(self, operation, payload):
+        """``HTTPDynamoDB`` backend serving requests from this stand-in."""
+        method = re.sub(r'(?<!^)(?=[A-Z])', '_', operation).lower()
+        try:
+            response = getattr(self, method)(**payload)
+        except DynamoDBError as exc:
+            body = {
+                '__type': f"com.amazonaws.dynamodb.v20120810#{exc.response['Error']['Code']}",
+                'message': exc.response['Error']['Message']
+            }
+            if 'CancellationReasons' in exc.response:
+                body['CancellationReasons'] = exc.response['CancellationReasons']
+            return exc.response['ResponseMetadata']['HTTPStatusCode'], body
+        table = response.get('Table') or response.get('TableDescription')
+        if table:
+            table['CreationDateTime'] = table['CreationDateTime'].timestamp()
+        return 200, response
+
+    def _start(self, operation, table_name):
+        self.operations[operation] += 1
+        return self._table(table_name, operation)
+
+    def _table(self, name, operation):
+        table = self._tables.get(name)
+        if table is None:
+            raise _error('ResourceNotFoundException', "Requested resource not found",
+                         operation)
+        return table
+
+    def _page(self, table, operation, items, filter_expression, projection_expression,
+              names, values, consistent, forward, limit, start_key):
+        items.sort(key=table.sort_key, reverse=not forward)
+        if start_key is not None:
+            start = table.sort_key(start_key)
+            items = [item for item in items
+                     if (table.sort_key(item) > start) == forward
+                     and table.sort_key(item) != start]
+        last_key = None
+        if limit is not None and len(items) > limit:
+            items = items[:limit]
+            last_key = {name: dict(items[-1][name]) for name in table.key_names}
+        table.read(operation, sum(_size(item) for item in items), consistent)
+
+        condition = _parse(filter_expression, 'condition', operation)
+        projection = _parse(projection_expression, 'projection', operation)
+        selected = [_project(item, projection, names) for item in items
+                    if condition is None or _evaluate(condition, item, names, values)]
+        response = {'Items': selected, 'Count': len(selected), 'ScannedCount': len(items)}
+        if last_key is not None:
+            response['LastEvaluatedKey'] = last_key
+        return response
+
+    def _all_throttled(self, operation, unprocessed, processed):
+        # Like DynamoDB, a batch is only refused when nothing in it fits.
+        if unprocessed:
+            self.throttles[operation] += 1
+            if not processed:
+                raise _throttled(operation)
+
+
+class _Table:
+    def __init__(self, owner, name, key_schema, attributes, provisioned):
+        self.owner = owner
+        self.name = name
+        self.key_schema = key_schema
+        self.attributes = attributes
+        self.provisioned = provisioned
+        self.key_names = [key['AttributeName'] for key in key_schema]
+        self.created = datetime.now(timezone.utc)
+        self.items = {}
+        self.capacity = {}
+        if provisioned and owner.throttling:
+            for kind, units in (('read', provisioned['ReadCapacityUnits']),
+                                ('write', provisioned['WriteCapacityUnits'])):
+                self.capacity[kind] = _Capacity(units, owner.burst_seconds, owner.clock)
+
+    def key(self, item, operation):
+        try:
+            return tuple(_comparable(item[name]) for name in self.key_names)
+        except KeyError:
+            raise _error('ValidationException',
+                         "The provided key element does not match the schema", operation)
+
+    def sort_key(self, item):
+        return self.key(item, 'Query')
+
+    def afford(self, kind, units):
+        # ``throttling`` can be turned off later, e.g. to check the result.
+        capacity = self.capacity.get(kind)
+        return capacity is None or not self.owner.throttling or capacity.take(units)
+
+    def read(self, operation, size, consistent):
+        if not self.afford('read', _read_units(size, consistent)):
+            self.owner.throttles[operation] += 1
+            raise _throttled(operation)
+
+    def write(self, operation, size):
+        if not self.afford('write', _write_units(size)):
+            self.owner.throttles[operation] += 1
+            raise _throttled(operation)
+
+    def describe(self):
+        description = {
+            'TableName': self.name,
+            'TableStatus': 'ACTIVE',
+            'KeySchema': self.key_schema,
+            'AttributeDefinitions': self.attributes,
+            'CreationDateTime': self.created,
+            'ItemCount': len(self.items),
+            'TableSizeBytes': sum(_size(item) for item in self.items.values()),
+            'TableArn': f"arn:aws:dynamodb:us-east-1:123456789012:table/{self.name}",
+        }
+        if self.provisioned:
+            description['ProvisionedThroughput'] = {
+                'NumberOfDecreasesToday': 0, **self.provisioned}
+        else:
+            description['BillingModeSummary'] = {'BillingMode': 'PAY_PER_REQUEST'}
+        return description
+
+
+class _Capacity:
+    def __init__(self, units, burst_seconds, clock):
+        self.rate = float(units)
+        self.limit = self.rate * max(1, burst_seconds)
+        self.clock = clock
+        self.tokens = self.limit
+        self.updated = clock()
+
+    def take(self, units):
+        now = self.clock()
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < units:
+            return False
+        self.tokens -= units
+        return True
+
+
+# Expressions
+
+class _Parser:
+    def __init__(self, text, operation):
+        self.operation = operation
+        self.tokens = []
+        position = 0
+        text = text.rstrip()
+        while position < len(text):
+            match = TOKEN.match(text, position)
+            if not match:
+                self.fail(f"Invalid syntax near {text[position:position + 20]!r}")
+            self.tokens.append(next(group for group in match.groups() if group))
+            position = match.end()
+        self.position = 0
+
+    def fail(self, message):
+        raise _error('ValidationException', f"Invalid expression: {message}", self.operation)
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def keyword(self):
+        token = self.peek()
+        return token.upper() if token and token.upper() in KEYWORDS else None
+
+    def take(self, expected=None):
+        token = self.peek()
+        if token is None or (expected and token.upper() != expected):
+            self.fail(f"expected {expected or 'a token'}, got {token!r}")
+        self.position += 1
+        return token
+
+    def done(self):
+        if self.peek() is not None:
+            self.fail(f"unexpected {self.peek()!r}")
+
+    def path(self):
+        token = self.take()
+        if token[0] == ':' or token in '(),+-=<>' or token.upper() in KEYWORDS:
+            self.fail(f"expected an attribute, got {token!r}")
+        return ('path', token)
+
+    def operand(self):
+        token = self.peek()
+        if token is not None and token[0] == ':':
+            return ('value', self.take())
+        if token == 'if_not_exists':
+            self.take()
+            self.take('(')
+            path = self.path()
+            self.take(',')
+            default = self.value()
+            self.take(')')
+            return ('if_not_exists', path, default)
+        return self.path()
+
+    def value(self):
+        left = self.operand()
+        if self.peek() in ('+', '-'):
+            return (self.take(), left, self.operand())
+        return left
+
+    def condition(self):
+        left = self.conjunction()
+        while self.keyword() == 'OR':
+            self.take()
+            left = ('or', left, self.conjunction())
+        return left
+
+    def conjunction(self):
+        left = self.negation()
+        while self.keyword() == 'AND':
+            self.take()
+            left = ('and', left, self.negation())
+        return left
+
+    def negation(self):
+        if self.keyword() == 'NOT':
+            self.take()
+            return ('not', self.negation())
+        if self.peek() == '(':
+            self.take()
+            inner = self.condition()
+            self.take(')')
+            return inner
+        if self.peek() in ('attribute_exists', 'attribute_not_exists', 'attribute_type',
+                           'begins_with'):
+            function = self.take()
+            self.take('(')
+            path = self.path()
+            argument = None
+            if function in ('attribute_type', 'begins_with'):
+                self.take(',')
+                argument = self.operand()
+            self.take(')')
+            return (function, path, argument)
+        left = self.operand()
+        token = self.peek()
+        if token in COMPARATORS:
+            return ('compare', self.take(), left, self.operand())
+        if self.keyword() == 'BETWEEN':
+            self.take()
+            low = self.operand()
+            self.take('AND')
+            return ('between', left, low, self.operand())
+        if self.keyword() == 'IN':
+            self.take()
+            self.take('(')
+            options = [self.operand()]
+            while self.peek() == ',':
+                self.take()
+                options.append(self.operand())
+            self.take(')')
+            return ('in', left, options)
+        self.fail(f"expected a comparison, got {token!r}")
+
+    def update(self):
+        actions = []
+        while self.peek() is not None:
+            clause = self.keyword()
+            if clause not in UPDATE_CLAUSES:
+                self.fail(f"expected SET, ADD, REMOVE or DELETE, got {self.peek()!r}")
+            self.take()
+            while True:
+                path = self.path()
+                if clause == 'SET':
+                    self.take('=')
+                    actions.append(('set', path, self.value()))
+                elif clause == 'REMOVE':
+                    actions.append(('remove', path, None))
+                else:
+                    actions.append((clause.lower(), path, self.operand()))
+                if self.peek() != ',':
+                    break
+                self.take()
+        return actions
+
+    def projection(self):
+        paths = [self.path()]
+        while self.peek() == ',':
+            self.take()
+            paths.append(self.path())
+        return paths
+
+
+@lru_cache(maxsize=256)
+def _parsed(expression, kind, operation):
+    parser = _Parser(expression, operation)
+    tree = getattr(parser, kind)()
+    parser.done()
+    return tree
+
+
+def _parse(expression, kind, operation):
+    if not expression:
+        return None
+    return _parsed(expression, kind, operation)
+
+
+def _placeholders(expression):
+    return set(re.findall(r'[#:]\w+', expression or ''))
+
+
+def _unused(names, values, operation, *expressions):
+    used = set().union(*(_placeholders(expression) for expression in expressions))
+    for placeholder in list(names) + list(values):
+        if placeholder not in used:
+            kind = 'names' if placeholder[0] == '#' else 'values'
+            raise _error('ValidationException',
+                         f"Value provided in ExpressionAttribute{kind.title()} unused in "
+                         f"expressions: keys: {{{placeholder}}}", operation)
+
+
+def _name(path, names, operation='UpdateItem'):
+    token = path[1]
+    if token[0] != '#':
+        return token
+    if token not in names:
+        raise _error('ValidationException',
+                     f"An expression attribute name used in the document path is not "
+                     f"defined; attribute name: {token}", operation)
+    return names[token]
+
+
+def _operand(node, item, names, values):
+    kind = node[0]
+    if kind == 'value':
+        if node[1] not in values:
+            raise _error('ValidationException',
+                         f"An expression attribute value used in expression is not "
+                         f"defined; attribute value: {node[1]}", 'UpdateItem')
+        return values[node[1]]
+    if kind == 'path':
+        return item.get(_name(node, names))
+    if kind == 'if_not_exists':
+        current = item.get(_name(node[1], names))
+        return current if current is not None else _operand(node[2], item, names, values)
+    left = _operand(node[1], item, names, values)
+    right = _operand(node[2], item, names, values)
+    if left is None or right is None:
+        raise _error('ValidationException',
+                     "The provided expression refers to an attribute that does not exist "
+                     "in the item", 'UpdateItem')
+    if 'N' not in left or 'N' not in right:
+        raise _error('ValidationException',
+                     "An operand in the update expression has an incorrect data type",
+                     'UpdateItem')
+    result = Decimal(left['N']) + Decimal(right['N']) * (1 if kind == '+' else -1)
+    return {'N': _number(result)}
+
+
+def _evaluate(node, item, names, values):
+    kind = node[0]
+    if kind == 'or':
+        return (_evaluate(node[1], item, names, values)
+                or _evaluate(node[2], item, names, values))
+    if kind == 'and':
+        return (_evaluate(node[1], item, names, values)
+                and _evaluate(node[2], item, names, values))
+    if kind == 'not':
+        return not _evaluate(node[1], item, names, values)
+    if kind == 'attribute_exists':
+        return _name(node[1], names) in item
+    if kind == 'attribute_not_exists':
+        return _name(node[1], names) not in item
+    if kind == 'attribute_type':
+        value = item.get(_name(node[1], names))
+        return value is not None and _operand(node[2], item, names, values)['S'] in value
+    if kind == 'begins_with':
+        value = item.get(_name(node[1], names))
+        prefix = _operand(node[2], item, names, values)
+        return (value is not None and 'S' in value and 'S' in prefix
+                and value['S'].startswith(prefix['S']))
+    if kind == 'compare':
+        left = _operand(node[2], item, names, values)
+        right = _operand(node[3], item, names, values)
+        return _compare(node[1], left, right)
+    if kind == 'between':
+        value = _operand(node[1], item, names, values)
+        return (_compare('>=', value, _operand(node[2], item, names, values))
+                and _compare('<=', value, _operand(node[3], item, names, values)))
+    value = _operand(node[1], item, names, values)
+    return any(_compare('=', value, _operand(option, item, names, values))
+               for option in node[2])
+
+
+def _compare(operator, left, right):
+    if left is None or right is None or left.keys() != right.keys():
+        return operator == '<>'
+    left, right = _comparable(left)[1], _comparable(right)[1]
+    return {
+        '=': left == right, '<>': left != right,
+        '<': left < right, '<=': left <= right,
+        '>': left > right, '>=': left >= right,
+    }[operator]
+
+
+def _check(condition, item, names, values, operation, *other_expressions):
+    names = names or {}
+    values = values or {}
+    _unused(names, values, operation, condition, *other_expressions)
+    tree = _parse(condition, 'condition', operation)
+    if tree is not None and not _evaluate(tree, item or {}, names, values):
+        raise _error('ConditionalCheckFailedException', "The conditional request failed",
+                     operation)
+
+
+def _update(old, key, expression, names, values):
+    names = names or {}
+    values = values or {}
+    source = old or {}
+    new = _copy(old) if old else _copy(key)
+    updated = []
+    for action, path, operand in _parse(expression, 'update', 'UpdateItem'):
+        name = _name(path, names)
+        updated.append(name)
+        if action == 'set':
+            new[name] = dict(_operand(operand, source, names, values))
+        elif action == 'remove':
+            new.pop(name, None)
+        elif action == 'add':
+            amount = _operand(operand, source, names, values)
+            current = new.get(name)
+            if 'N' in amount:
+                total = Decimal(amount['N']) + Decimal(current['N'] if current else 0)
+                new[name] = {'N': _number(total)}
+            else:
+                (kind, members), = amount.items()
+                existing = current[kind] if current else []
+                new[name] = {kind: existing + [m for m in members if m not in existing]}
+        else:
+            (kind, members), = _operand(operand, source, names, values).items()
+            if name in new:
+                remaining = [m for m in new[name][kind] if m not in members]
+                if remaining:
+                    new[name] = {kind: remaining}
+                else:
+                    del new[name]
+    return new, updated
+
+
+def _returned(return_values, old, new, updated):
+    if return_values == 'ALL_NEW':
+        return {'Attributes': _copy(new)}
+    if return_values == 'ALL_OLD':
+        return {'Attributes': _copy(old)} if old else {}
+    if return_values == 'UPDATED_NEW':
+        attributes = {name: dict(new[name]) for name in updated if name in new}
+    elif return_values == 'UPDATED_OLD':
+        attributes = {name: dict(old[name]) for name in updated if name in old}
+    else:
+        return {}
+    return {'Attributes': attributes} if attributes else {}
+
+
+def _project(item, projection, names):
+    if projection is None:
+        return _copy(item)
+    selected = {}
+    for path in projection:
+        name = _name(path, names, 'GetItem')
+        if name in item:
+            selected[name] = dict(item[name])
+    return selected
+
+
+# Values
+
+def _comparable(value):
+    (kind, raw), = value.items()
+    if kind == 'N':
+        return kind, Decimal(raw)
+    return kind, raw
+
+
+def _number(value):
+    if value == value.to_integral_value():
+        return str(int(value))
+    return str(value.normalize())
+
+
+def _copy(item):
+    return {name: dict(value) for name, value in item.items()} if item else {}
+
+
+def _size(item):
+    if not item:
+        return 0
+    size = 0
+    for name, value in item.items():
+        (kind, raw), = value.items()
+        if kind == 'N':
+            size += len(raw) // 2 + 1
+        elif kind in ('S', 'B'):
+            size += len(raw)
+        else:
+            size += len(str(raw))
+        size += len(name)
+    return size
+
+
+def _read_units(size, consistent):
+    units = max(1, math.ceil(size / 4096))
+    return units if consistent else units / 2
+
+
+def _write_units(size):
+    return max(1, math.ceil(size / 1024))
+
+
+def _error(code, message, operation, status=400):
+    return DynamoDBError(code, message, status, operation)
+
+
+def _throttled(operation):
+    return _error('ProvisionedThroughputExceededException',
+                  "The level of configured provisioned throughput for the table was "
+                  "exceeded. Consider increasing your provisioning level with the "
+                  "UpdateTable API.", operation)
@@ -0,0 +1,153 @@
+import os
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+import boto3
+from moto import mock_aws
+import json
+
+
+from app import aggregates, clients
+from app.lambda_module import stream_handler, top_handler, visit_handler
+
+
+@mock_aws
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'COUNTER_PAGES': 'about,projects'})
+class TestStreamAggregates(unittest.TestCase):
+    def setUp(self):
+        clients.reset()
+        self.dynamodb = boto3.client('dynamodb')
+        table = self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            },
+            StreamSpecification={'StreamEnabled': True, 'StreamViewType': 'NEW_AND_OLD_IMAGES'}
+        )
+        self.stream_arn = table['TableDescription']['LatestStreamArn']
+        self.streams = boto3.client('dynamodbstreams')
+        shard = self.streams.describe_stream(
+            StreamArn=self.stream_arn)['StreamDescription']['Shards'][0]
+        self.iterator = self.streams.get_shard_iterator(
+            StreamArn=self.stream_arn, ShardId=shard['ShardId'],
+            ShardIteratorType='TRIM_HORIZON')['ShardIterator']
+
+    def tearDown(self):
+        clients.reset()
+
+    def read_stream(self):
+        """New stream records, shaped like a Lambda DynamoDB event."""
+        response = self.streams.get_records(ShardIterator=self.iterator)
+        self.iterator = response['NextShardIterator']
+        records = []
+        for record in response['Records']:
+            change = dict(record['dynamodb'])
+            change['ApproximateCreationDateTime'] = change['ApproximateCreationDateTime'].timestamp()
+            records.append({**record, 'dynamodb': change})
+        return {'Records': records}
+
+    def visit(self, page=None):
+        visit_handler({'queryStringParameters': {'page': page}} if page else {}, {})
+
+    def test_fast_path_values(self):
+        self.assertEqual(aggregates.value({'N': '42'}), 42)
+        self.assertEqual(aggregates.value({'N': '-3'}), -3)
+        self.assertEqual(aggregates.value({'N': '1.5'}), 1.5)
+        self.assertEqual(aggregates.value({'S': 'page#about'}), 'page#about')
+        self.assertEqual(aggregates.value({'SS': ['a']}), {'a'})
+
+    @patch.dict(os.environ, {'COUNTER_SHARDS': '3'})
+    def test_totals_and_daily_counts(self):
+        for page in ['about'] * 4 + ['projects'] * 2 + [None]:
+            self.visit(page)
+
+        response = stream_handler(self.read_stream(), {})
+        self.assertEqual(response, {'batchItemFailures': []})
+
+        top, total = aggregates.leaderboard(self.dynamodb, 'TestTable')
+        self.assertEqual(top, [('page#about', 4), ('page#projects', 2), ('page_counter', 1)])
+        self.assertEqual(total, 7)
+        today = datetime.now(timezone.utc).strftime('%Y-%m-%d')
+        daily, daily_total = aggregates.daily_totals(self.dynamodb, 'TestTable', today)
+        self.assertEqual(daily['page#about'], 4)
+        self.assertEqual(daily_total, 7)
+
+    def test_derived_writes_are_skipped(self):
+        self.visit('about')
+        stream_handler(self.read_stream(), {})
+
+        with patch.object(clients.dynamodb(), 'update_item') as update:
+            stream_handler(self.read_stream(), {})
+
+        update.assert_not_called()
+
+    def test_redelivered_records_are_not_counted_twice(self):
+        for page in ('about', 'about', 'about'):
+            self.visit(page)
+        event = self.read_stream()
+        first = [r for r in event['Records'] if r['dynamodb'].get('NewImage', {}).get('count')][:2]
+
+        stream_handler({'Records': first}, {})
+        stream_handler(event, {})
+        stream_handler(event, {})
+
+        top, total = aggregates.leaderboard(self.dynamodb, 'TestTable')
+        self.assertEqual(top, [('page#about', 3)])
+        self.assertEqual(total, 3)
+
+    def test_forty_digit_sequence_numbers(self):
+        def record(sequence, old, new):
+            return {'dynamodb': {
+                'Keys': {'ID': {'S': 'page#about'}},
+                'OldImage': {'count': {'N': str(old)}}, 'NewImage': {'count': {'N': str(new)}},
+                'ApproximateCreationDateTime': 1792221729, 'SequenceNumber': sequence}}
+
+        # An earlier version stored the sequence number as N.
+        self.dynamodb.put_item(TableName='TestTable', Item={
+            'ID': {'S': aggregates.TOTALS_ID}, 'seq#page#about': {'N': '99'}})
+        first, second = '9' * 39, '1' + '0' * 39
+        self.assertEqual(aggregates.apply(self.dynamodb, 'TestTable', [record(first, 0, 1)]), [])
+        aggregates.apply(self.dynamodb, 'TestTable', [record(first, 0, 1), record(second, 1, 3)])
+
+        self.assertEqual(aggregates.leaderboard(self.dynamodb, 'TestTable'),
+                         ([('page#about', 3)], 3))
+        item = self.dynamodb.get_item(TableName='TestTable',
+                                      Key={'ID': {'S': aggregates.TOTALS_ID}})['Item']
+        self.assertEqual(item['seq#page#about'], {'S': second})
+
+    def test_failed_group_reports_its_first_sequence_number(self):
+        self.visit('about')
+        self.visit('projects')
+        event = self.read_stream()
+        real = self.dynamodb.update_item
+
+        def flaky(**kwargs):
+            if kwargs['ExpressionAttributeNames']['#key'] == 'page#projects':
+                raise RuntimeError('throttled')
+            return real(**kwargs)
+
+        with patch.object(clients.dynamodb(), 'update_item', side_effect=flaky):
+            response = stream_handler(event, {})
+
+        projects = [r['dynamodb']['SequenceNumber'] for r in event['Records']
+                    if r['dynamodb']['Keys']['ID']['S'] == 'page#projects'
+                    and 'count' in r['dynamodb'].get('NewImage', {})]
+        self.assertEqual(response, {'batchItemFailures': [{'itemIdentifier': projects[0]}]})
+        self.assertEqual(aggregates.leaderboard(self.dynamodb, 'TestTable')[1], 1)
+
+    def test_top_handler(self):
+        for page in ('projects', 'about', 'projects'):
+            self.visit(page)
+        stream_handler(self.read_stream(), {})
+
+        body = json.loads(top_handler({'queryStringParameters': {'limit': '1'}}, {})['body'])
+        self.assertEqual(body, {'total': 3, 'pages': [{'page': 'projects', 'count': 2}]})
+        response = top_handler({'queryStringParameters': {'limit': '0'}}, {})
+        self.assertEqual(response['statusCode'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import base64
+import os
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+import json
+
+
+from app import batch, clients, counter, rollups
+from app.lambda_module import beacon_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+def beacon_event(events, encode=False):
+    body = json.dumps({'events': events})
+    if encode:
+        return {'body': base64.b64encode(body.encode()).decode(), 'isBase64Encoded': True}
+    return {'body': body}
+
+
+@patch.dict(os.environ, {
+    'TABLE_NAME': 'TestTable',
+    'COUNTER_PAGES': 'about,projects',
+    'BEACON_EVENTS_TABLE': 'EventsTable'
+})
+class TestBeacon(unittest.TestCase):
+    def setUp(self):
+        clients.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+        self.dynamodb.create_table(
+            TableName='EventsTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'},
+                       {'AttributeName': 'EventAt', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'},
+                                  {'AttributeName': 'EventAt', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        self.now = int(time.time())
+
+    def tearDown(self):
+        clients.reset()
+
+    def events(self, *pages):
+        return [{'page': page, 'ts': self.now - i, 'client': 'ab' * 16}
+                for i, page in enumerate(pages)]
+
+    def test_one_update_per_key(self):
+        event = beacon_event(self.events(*['about'] * 30, *['projects'] * 5, None), encode=True)
+
+        with patch.object(clients.dynamodb(), 'update_item',
+                          wraps=clients.dynamodb().update_item) as update, \
+                patch.object(clients.dynamodb(), 'batch_write_item',
+                             wraps=clients.dynamodb().batch_write_item) as batch_write:
+            response = beacon_handler(event, {})
+
+        self.assertEqual(response, {'statusCode': 204,
+                                    'headers': {'Access-Control-Allow-Origin': '*'}})
+        self.assertEqual(update.call_count, 3)
+        self.assertEqual(batch_write.call_count, 2)
+        totals = counter.read_totals(self.dynamodb, 'TestTable',
+                                     ['page#about', 'page#projects', 'page_counter'])
+        self.assertEqual(totals, {'page#about': 30, 'page#projects': 5, 'page_counter': 1})
+        stored = self.dynamodb.scan(TableName='EventsTable')['Items']
+        self.assertEqual(len(stored), 36)
+        self.assertEqual(stored[0]['client'], {'S': 'ab' * 16})
+        self.assertIn('ExpiresAt', stored[0])
+
+    @patch.dict(os.environ, {'ROLLUP_TABLE_NAME': 'RollupTable',
+                             'ROLLUP_GRANULARITIES': 'minute,day'})
+    def test_rollups_get_one_update_per_bucket(self):
+        self.dynamodb.create_table(
+            TableName='RollupTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'},
+                       {'AttributeName': 'Bucket', 'KeyType': 'RANGE'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'},
+                                  {'AttributeName': 'Bucket', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        minute = self.now - self.now % 86400 + 3600
+        views = [minute + 5, minute + 10, minute + 65, minute + 70, minute + 75]
+        with patch('time.time', return_value=minute + 120):
+            response = beacon_handler(beacon_event(
+                [{'page': 'about', 'ts': ts} for ts in views]), {})
+
+        self.assertEqual(response['statusCode'], 204)
+        start = datetime.fromtimestamp(minute, timezone.utc)
+        end = start + timedelta(minutes=1)
+        series = rollups.series(self.dynamodb, 'page#about', 'minute', start, end)
+        self.assertEqual([point['count'] for point in series], [2, 3])
+        days = rollups.series(self.dynamodb, 'page#about', 'day', start, start)
+        self.assertEqual(days[0]['count'], 5)
+        self.assertEqual(counter.read_total(self.dynamodb, 'TestTable', 'page#about'), 5)
+
+    def test_failures_mid_batch_are_logged_and_answered_204(self):
+        real = self.dynamodb.update_item
+
+        def flaky(**kwargs):
+            if kwargs['Key']['ID']['S'] == 'page#projects':
+                raise RuntimeError('throttled')
+            return real(**kwargs)
+
+        with patch.object(self.dynamodb, 'update_item', side_effect=flaky), \
+                patch.object(batch, 'batch_write', side_effect=RuntimeError('unprocessed')), \
+                patch('builtins.print') as printed:
+            response = beacon_handler(beacon_event(self.events('projects', 'about', 'about')), {})
+
+        self.assertEqual(response['statusCode'], 204)
+        totals = counter.read_totals(self.dynamodb, 'TestTable', ['page#about', 'page#projects'])
+        self.assertEqual(totals, {'page#about': 2, 'page#projects': 0})
+        self.assertEqual(printed.call_count, 2)
+
+    def test_invalid_beacons_write_nothing(self):
+        bodies = [
+            {'body': 'not json'},
+            {'body': json.dumps({'events': []})},
+            beacon_event(self.events('about', 'contact')),
+            beacon_event([{'page': 'about', 'ts': self.now - 2 * 86400}]),
+            beacon_event([{'page': 'about', 'ts': str(self.now)}]),
+            beacon_event([{'page': 'about', 'ts': self.now, 'client': 'not-hex'}]),
+            beacon_event([{'ts': self.now}] * 101),
+        ]
+        for event in bodies:
+            self.assertEqual(beacon_handler(event, {})['statusCode'], 400, event)
+
+        self.assertEqual(self.dynamodb.scan(TableName='TestTable')['Items'], [])
+        self.assertEqual(self.dynamodb.scan(TableName='EventsTable')['Items'], [])
+
+    def test_unprocessed_items_are_retried(self):
+        real = self.dynamodb.batch_write_item
+        calls = []
+
+        def flaky(RequestItems):
+            calls.append(RequestItems)
+            if len(calls) == 1:
+                requests = RequestItems['EventsTable']
+                real(RequestItems={'EventsTable': requests[:10]})
+                return {'UnprocessedItems': {'EventsTable': requests[10:]}}
+            return real(RequestItems=RequestItems)
+
+        items = [{'ID': {'S': 'page#about'}, 'EventAt': {'S': str(i)}} for i in range(25)]
+        with patch.object(self.dynamodb, 'batch_write_item', side_effect=flaky), \
+                patch.object(batch.time, 'sleep') as sleep:
+            batch.batch_write(self.dynamodb, 'EventsTable', items)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(calls[1]['EventsTable']), 15)
+        sleep.assert_called_once()
+        self.assertEqual(len(self.dynamodb.scan(TableName='EventsTable')['Items']), 25)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+import json
+
+
+from app import bots, clients, counter, visit_buffer
+from app.lambda_module import beacon_handler, visit_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+CHROME = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+          '(KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36')
+GOOGLEBOT = 'Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)'
+
+
+def browser_event(user_agent=CHROME, **headers):
+    return {'headers': {'User-Agent': user_agent, 'Accept-Language': 'en', **headers}}
+
+
+class TestClassify(unittest.TestCase):
+    def test_browsers_are_visits(self):
+        self.assertIsNone(bots.classify(browser_event()))
+        self.assertIsNone(bots.classify(
+            {'headers': {'user-agent': CHROME, 'accept-language': 'en'}}))
+        self.assertIsNone(bots.classify(browser_event(
+            'Mozilla/5.0 (Linux; Android 9; CUBOT P30) AppleWebKit/537.36 '
+            '(KHTML, like Gecko) Chrome/118.0.0.0 Mobile Safari/537.36')))
+
+    def test_crawlers_and_libraries(self):
+        for user_agent in (GOOGLEBOT, 'curl/8.5.0', 'python-requests/2.32.3',
+                           'Mozilla/5.0 (X11; Linux x86_64) HeadlessChrome/129.0.0.0'):
+            self.assertEqual(bots.classify(browser_event(user_agent)), 'user-agent')
+
+    def test_header_heuristics(self):
+        self.assertEqual(bots.classify({}), 'no-user-agent')
+        self.assertEqual(bots.classify(browser_event('')), 'no-user-agent')
+        self.assertEqual(bots.classify({'headers': {'User-Agent': CHROME}}), 'headers')
+        self.assertEqual(bots.classify(browser_event(**{'Sec-Purpose': 'prefetch'})),
+                         'prefetch')
+        self.assertIsNone(bots.classify(
+            {'headers': {'USER-AGENT': CHROME, 'ACCEPT-LANGUAGE': 'en'}}))
+
+
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'BOT_FILTER': '1'})
+class TestBotFilter(unittest.TestCase):
+    def setUp(self):
+        clients.reset()
+        visit_buffer.buffer.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        clients.reset()
+        visit_buffer.buffer.reset()
+
+    def test_bot_visit_is_not_written(self):
+        visit_handler(browser_event(), {})
+
+        with patch.object(clients.dynamodb(), 'update_item') as update:
+            response = visit_handler(browser_event(GOOGLEBOT), {})
+
+        update.assert_not_called()
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body']),
+                         {'message': 'Not counted', 'updated_value': '1'})
+        self.assertEqual(counter.read_total(self.dynamodb, 'TestTable'), 1)
+
+    def test_bot_beacon_is_not_written(self):
+        event = browser_event('curl/8.5.0')
+        event['body'] = json.dumps({'events': [{'ts': int(time.time())}]})
+
+        response = beacon_handler(event, {})
+
+        self.assertEqual(response['statusCode'], 204)
+        self.assertEqual(counter.read_total(self.dynamodb, 'TestTable'), 0)
+
+    def test_disabled_by_default(self):
+        with patch.dict(os.environ, {'BOT_FILTER': '0'}):
+            visit_handler(browser_event(GOOGLEBOT), {})
+
+        self.assertEqual(counter.read_total(self.dynamodb, 'TestTable'), 1)
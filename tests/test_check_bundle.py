@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+
+from scripts.check_bundle import bundle_size, main, parse_importtime
+
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       352 |        352 |     _datetime
+import time:      1136 |       1487 |   datetime
+import time:       842 |        842 |   app.clients
+import time:       818 |       8963 | app.lambda_module
+"""
+
+
+class TestCheckBundle(unittest.TestCase):
+    def setUp(self):
+        self.bundle = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.bundle.name, 'app'))
+        for name, source in (('__init__.py', ''),
+                             ('lambda_module.py', 'import json\n')):
+            with open(os.path.join(self.bundle.name, 'app', name), 'w') as f:
+                f.write(source)
+
+    def tearDown(self):
+        self.bundle.cleanup()
+
+    def test_parse_importtime(self):
+        self.assertEqual(parse_importtime(IMPORTTIME, 'app.lambda_module'), 8963)
+        self.assertEqual(parse_importtime(IMPORTTIME, 'app.clients'), 842)
+        with self.assertRaises(ValueError):
+            parse_importtime(IMPORTTIME, 'app.missing')
+
+    def test_bundle_size(self):
+        self.assertEqual(bundle_size(self.bundle.name), len('import json\n'))
+
+    def test_within_budget(self):
+        self.assertEqual(main([self.bundle.name, '--runs', '1']), 0)
+
+    def test_over_size_budget(self):
+        self.assertEqual(main([self.bundle.name, '--runs', '1',
+                               '--max-size-mb', '0.000001']), 1)
+
+    def test_over_import_budget(self):
+        self.assertEqual(main([self.bundle.name, '--runs', '1',
+                               '--max-import-ms', '0']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
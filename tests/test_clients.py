@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import unittest
+from unittest.mock import patch
+from botocore.config import Config
+from moto import mock_aws
+
+
+from app import clients
+
+
+@mock_aws
+class TestClientRegistry(unittest.TestCase):
+    def setUp(self):
+        clients.reset()
+
+    def tearDown(self):
+        clients.reset()
+
+    def test_handler_module_import_does_not_load_boto3(self):
+        result = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, app.lambda_module; print("boto3" in sys.modules)'],
+            capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_client_is_created_once_and_shared(self):
+        self.assertIs(clients.dynamodb(), clients.get('dynamodb'))
+
+    def test_registered_client_is_used(self):
+        fake = object()
+        clients.register('dynamodb', fake)
+        self.assertIs(clients.dynamodb(), fake)
+
+    @patch.dict(os.environ, {
+        'DDB_CONNECT_TIMEOUT': '0.5',
+        'DDB_READ_TIMEOUT': '1.5',
+        'DDB_MAX_POOL_CONNECTIONS': '4',
+        'DDB_RETRY_MODE': 'adaptive'
+    })
+    def test_config_from_environment(self):
+        config = clients.dynamodb().meta.config
+
+        self.assertEqual(config.connect_timeout, 0.5)
+        self.assertEqual(config.read_timeout, 1.5)
+        self.assertEqual(config.max_pool_connections, 4)
+        self.assertEqual(config.retries['mode'], 'adaptive')
+
+    @patch.dict(os.environ, {'DDB_MAX_ATTEMPTS': '1', 'DDB_READ_TIMEOUT': '1.5'})
+    def test_other_services_keep_default_retries(self):
+        config = clients.get('sqs').meta.config
+
+        self.assertEqual(config.read_timeout, 5)
+        self.assertEqual(config.retries['mode'], 'standard')
+        self.assertNotIn('total_max_attempts', config.retries)
+
+    def test_configure_overrides_config(self):
+        clients.configure(Config(read_timeout=7))
+        self.assertEqual(clients.dynamodb().meta.config.read_timeout, 7)
+
+    def test_preload_only_loads_dynamodb_model(self):
+        clients.preload()
+        loader = clients._get_session().get_component('data_loader')
+        loaded = {key[1] for key in loader._cache if key[0] == 'load_service_model'}
+        self.assertEqual(loaded, {'dynamodb'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import base64
+import gzip
+import os
+import unittest
+from unittest.mock import patch
+import boto3
+from moto import mock_aws
+import json
+
+
+from app import clients, compression, health
+from app.table_cache import cache
+from app.lambda_module import lambda_handler, visit_handler
+
+
+class TestNegotiation(unittest.TestCase):
+    def test_negotiate(self):
+        cases = {
+            None: None,
+            '': None,
+            'identity': None,
+            'gzip': 'gzip',
+            'GZIP, deflate': 'gzip',
+            'gzip;q=0': None,
+            'gzip;q=0, *': None if compression.brotli is None else 'br',
+            '*': 'br' if compression.brotli is not None else 'gzip',
+            'gzip;q=1.0, br;q=0.5': 'gzip',
+            'gzip;q=bogus': None,
+        }
+        for header, expected in cases.items():
+            self.assertEqual(compression.negotiate(header), expected, header)
+
+    @unittest.skipIf(compression.brotli is None, 'brotli is not installed')
+    def test_brotli_is_preferred_on_a_tie(self):
+        self.assertEqual(compression.negotiate('gzip, deflate, br'), 'br')
+
+    def test_small_bodies_are_left_alone(self):
+        response = {'headers': {}, 'body': '{"message":"Update successful"}'}
+
+        compression.compress(response, 'gzip')
+
+        self.assertNotIn('isBase64Encoded', response)
+        self.assertNotIn('Vary', response['headers'])
+
+    @patch.dict(os.environ, {'COMPRESSION_MIN_SIZE': '0'})
+    def test_zero_threshold_disables_compression(self):
+        response = {'headers': {}, 'body': 'x' * 4096}
+
+        compression.compress(response, 'gzip')
+
+        self.assertEqual(response['body'], 'x' * 4096)
+
+    def test_large_bodies_vary_even_when_not_compressed(self):
+        response = {'headers': {}, 'body': 'x' * 4096}
+
+        compression.compress(response, None)
+
+        self.assertEqual(response['headers'], {'Vary': 'Accept-Encoding'})
+        self.assertEqual(response['body'], 'x' * 4096)
+
+    @patch.dict(os.environ, {'COMPRESSION_LEVEL': '9'})
+    def test_gzip_round_trip(self):
+        body = json.dumps({'series': list(range(2000))})
+        response = compression.compress({'body': body}, 'gzip')
+
+        self.assertTrue(response['isBase64Encoded'])
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+        data = base64.b64decode(response['body'])
+        self.assertLess(len(data), len(body) / 2)
+        self.assertEqual(gzip.decompress(data).decode(), body)
+
+
+@mock_aws
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'HEALTH_DEBUG': '1'})
+class TestCompressedHandlers(unittest.TestCase):
+    def setUp(self):
+        cache.reset()
+        health.reset()
+        clients.reset()
+        boto3.client('dynamodb').create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        clients.reset()
+
+    def test_debug_response_is_compressed(self):
+        response = lambda_handler({'headers': {'Accept-Encoding': 'gzip, deflate'}}, {})
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(response['headers']['Content-Encoding'], 'gzip')
+        body = json.loads(gzip.decompress(base64.b64decode(response['body'])))
+        self.assertEqual(body['table']['Table']['TableName'], 'TestTable')
+
+    def test_visit_response_is_not_compressed(self):
+        response = visit_handler({'headers': {'Accept-Encoding': 'gzip'}}, {})
+
+        self.assertNotIn('Content-Encoding', response['headers'])
+        self.assertEqual(json.loads(response['body'])['updated_value'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
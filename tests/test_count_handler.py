@@ -0,0 +1,97 @@
+import os
+import unittest
+from unittest.mock import patch
+import json
+
+
+from app import clients
+from app.count_cache import cache
+from app.lambda_module import count_handler, visit_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+@patch.dict(os.environ, {
+    'TABLE_NAME': 'TestTable',
+    'COUNTER_PAGES': 'about',
+    'COUNT_CACHE_TTL': '60',
+    'COUNT_MAX_AGE': '30',
+    'COUNT_STALE_WHILE_REVALIDATE': '120'
+})
+class TestCountHandler(unittest.TestCase):
+    def setUp(self):
+        cache.reset()
+        clients.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+        self.dynamodb.put_item(
+            TableName='TestTable',
+            Item={'ID': {'S': 'page_counter'}, 'count': {'N': '41'}}
+        )
+
+    def tearDown(self):
+        cache.reset()
+        clients.reset()
+
+    def test_returns_count_without_writing(self):
+        with patch.object(clients.dynamodb(), 'update_item') as update:
+            response = count_handler({}, {})
+
+        update.assert_not_called()
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body']), {'count': 41})
+        self.assertEqual(response['headers']['ETag'], '"41"')
+        self.assertEqual(response['headers']['Cache-Control'],
+                         'public, max-age=30, stale-while-revalidate=120')
+
+    def test_read_is_eventually_consistent_get_item(self):
+        with patch.object(clients.dynamodb(), 'get_item',
+                          wraps=clients.dynamodb().get_item) as get:
+            count_handler({}, {})
+
+        self.assertFalse(get.call_args.kwargs['ConsistentRead'])
+
+    def test_matching_if_none_match_gets_304(self):
+        for header in ('"41"', 'W/"41"', '"40", "41"', '*'):
+            response = count_handler({'headers': {'If-None-Match': header}}, {})
+            self.assertEqual(response['statusCode'], 304, header)
+            self.assertNotIn('body', response)
+            self.assertEqual(response['headers']['ETag'], '"41"')
+
+        response = count_handler({'headers': {'if-none-match': '"40"'}}, {})
+        self.assertEqual(response['statusCode'], 200)
+
+    def test_count_is_cached_in_container(self):
+        count_handler({}, {})
+        visit_handler({}, {})
+
+        with patch.object(clients.dynamodb(), 'get_item') as get:
+            body = json.loads(count_handler({}, {})['body'])
+
+        get.assert_not_called()
+        self.assertEqual(body['count'], 41)
+
+        with patch.dict(os.environ, {'COUNT_CACHE_TTL': '0'}):
+            body = json.loads(count_handler({}, {})['body'])
+        self.assertEqual(body['count'], 42)
+
+    def test_page_counts(self):
+        visit_handler({'queryStringParameters': {'page': 'about'}}, {})
+
+        response = count_handler({'queryStringParameters': {'page': 'about'}}, {})
+        self.assertEqual(json.loads(response['body']), {'count': 1})
+
+        response = count_handler({'queryStringParameters': {'page': 'contact'}}, {})
+        self.assertEqual(response['statusCode'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import json
+
+
+from app import clients, counter
+from app.lambda_module import visit_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'COUNTER_SHARDS': '4'})
+class TestShardedCounter(unittest.TestCase):
+    def setUp(self):
+        # The stand-in applies each request atomically, as DynamoDB does.
+        self.dynamodb = MemoryDynamoDB()
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def test_increment_writes_to_shard_items(self):
+        for _ in range(20):
+            counter.increment(self.dynamodb, 'TestTable')
+
+        items = self.dynamodb.scan(TableName='TestTable')['Items']
+        keys = {item['ID']['S'] for item in items}
+        self.assertTrue(keys <= set(counter.shard_keys('page_counter', 4)))
+        self.assertEqual(sum(int(i['count']['N']) for i in items), 20)
+
+    def test_total_is_read_consistently(self):
+        with patch.object(self.dynamodb, 'batch_get_item',
+                          wraps=self.dynamodb.batch_get_item) as batch_get:
+            counter.increment(self.dynamodb, 'TestTable')
+
+        request = batch_get.call_args.kwargs['RequestItems']['TestTable']
+        self.assertTrue(request['ConsistentRead'])
+
+    def test_total_includes_legacy_item(self):
+        self.dynamodb.put_item(
+            TableName='TestTable',
+            Item={'ID': {'S': 'page_counter'}, 'count': {'N': '41'}}
+        )
+
+        self.assertEqual(counter.increment(self.dynamodb, 'TestTable'), 42)
+        self.assertEqual(counter.read_total(self.dynamodb, 'TestTable'), 42)
+
+    def test_concurrent_increments_sum_exactly(self):
+        visits = 100
+        clients.register('dynamodb', self.dynamodb)
+        try:
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                responses = list(pool.map(lambda _: visit_handler({}, {}), range(visits)))
+        finally:
+            clients.reset()
+
+        self.assertTrue(all(r['statusCode'] == 200 for r in responses))
+        counts = [int(json.loads(r['body'])['updated_value']) for r in responses]
+        self.assertLessEqual(max(counts), visits)
+        self.assertEqual(
+            counter.read_total(self.dynamodb, 'TestTable', consistent=True),
+            visits
+        )
+
+    def test_single_shard_uses_plain_key(self):
+        self.assertEqual(counter.increment(self.dynamodb, 'TestTable', shards=1), 1)
+
+        result = self.dynamodb.get_item(
+            TableName='TestTable',
+            Key={'ID': {'S': 'page_counter'}}
+        )
+        self.assertEqual(result['Item']['count']['N'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import http.client
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch
+import json
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
+from botocore.credentials import Credentials
+
+
+from app import clients
+from app.dynamodb_lite import DynamoDBClient, DynamoDBError
+from app.lambda_module import lambda_handler, visit_handler
+from tests.http_dynamodb import HTTPDynamoDB, canned, error
+
+
+RESPONSES = {
+    'UpdateItem': {'Attributes': {'count': {'N': '7'}}},
+    'DescribeTable': {'Table': {'TableName': 'TestTable', 'ItemCount': 1,
+                                'CreationDateTime': 1700000000.5}},
+}
+
+
+class TestDynamoDBLiteClient(unittest.TestCase):
+    def setUp(self):
+        self.standin = HTTPDynamoDB(canned(RESPONSES)).start()
+        self.client = DynamoDBClient(
+            region='eu-west-1',
+            access_key='AKIDEXAMPLE',
+            secret_key='secret',
+            session_token='token',
+            endpoint_url=self.standin.endpoint_url
+        )
+
+    def tearDown(self):
+        self.client.close()
+        self.standin.stop()
+
+    def test_request_uses_json_protocol(self):
+        response = self.client.update_item(
+            TableName='TestTable',
+            Key={'ID': {'S': 'page_counter'}},
+            ReturnValues='UPDATED_NEW'
+        )
+
+        self.assertEqual(response, RESPONSES['UpdateItem'])
+        operation, headers, body = self.standin.requests[0]
+        self.assertEqual(operation, 'UpdateItem')
+        self.assertEqual(headers['x-amz-target'], 'DynamoDB_20120810.UpdateItem')
+        self.assertEqual(headers['content-type'], 'application/x-amz-json-1.0')
+        self.assertEqual(headers['x-amz-security-token'], 'token')
+        self.assertEqual(json.loads(body)['Key'], {'ID': {'S': 'page_counter'}})
+
+    def test_signature_matches_botocore(self):
+        self.client.get_item(TableName='TestTable', Key={'ID': {'S': 'a'}})
+        _, headers, body = self.standin.requests[0]
+        authorization = headers['authorization']
+        signed = authorization.split('SignedHeaders=')[1].split(',')[0].split(';')
+
+        request = AWSRequest(
+            method='POST', url=self.standin.endpoint_url + '/', data=body,
+            headers={name: headers[name] for name in signed}
+        )
+        request.context['timestamp'] = headers['x-amz-date']
+        auth = SigV4Auth(Credentials('AKIDEXAMPLE', 'secret', 'token'),
+                         'dynamodb', 'eu-west-1')
+        canonical = auth.canonical_request(request)
+        expected = auth.signature(auth.string_to_sign(request, canonical), request)
+
+        self.assertTrue(authorization.endswith('Signature=' + expected))
+
+    def test_connection_is_kept_alive(self):
+        for _ in range(5):
+            self.client.describe_table(TableName='TestTable')
+
+        self.assertEqual(len(self.standin.requests), 5)
+        self.assertEqual(len(self.standin.connections), 1)
+
+    def test_closed_pooled_connection_is_retried(self):
+        self.client.describe_table(TableName='TestTable')
+        pooled = self.client._pool.queue[0]
+
+        with patch.object(pooled, 'getresponse',
+                          side_effect=http.client.RemoteDisconnected('closed')):
+            response = self.client.update_item(TableName='TestTable', Key={})
+
+        self.assertEqual(response, RESPONSES['UpdateItem'])
+        self.assertEqual(len(self.standin.requests), 3)
+
+    def test_timeout_is_never_retried(self):
+        client = DynamoDBClient('eu-west-1', 'AKIDEXAMPLE', 'secret',
+                                endpoint_url=self.standin.endpoint_url, timeout=0.05)
+        self.addCleanup(client.close)
+        client.describe_table(TableName='TestTable')
+        answered = threading.Event()
+
+        def slow(operation, payload):
+            time.sleep(0.2)
+            answered.set()
+            return 200, RESPONSES.get(operation, {})
+
+        self.standin.backend = slow
+        for _ in range(2):
+            # First on the pooled connection, then on a fresh one.
+            answered.clear()
+            with self.assertRaises(TimeoutError):
+                client.update_item(TableName='TestTable', Key={})
+            answered.wait(1)
+
+        self.assertEqual([r[0] for r in self.standin.requests],
+                         ['DescribeTable', 'UpdateItem', 'UpdateItem'])
+
+    def test_error_is_shaped_like_client_error(self):
+        self.standin.backend = lambda operation, payload: error(
+            'ProvisionedThroughputExceededException', 'slow down')
+
+        with self.assertRaises(DynamoDBError) as raised:
+            self.client.update_item(TableName='TestTable', Key={})
+
+        self.assertEqual(raised.exception.response['Error']['Code'],
+                         'ProvisionedThroughputExceededException')
+        self.assertEqual(raised.exception.response['Error']['Message'], 'slow down')
+        self.assertEqual(raised.exception.operation_name, 'UpdateItem')
+
+
+class TestHandlersWithLiteClient(unittest.TestCase):
+    def setUp(self):
+        clients.reset()
+        self.standin = HTTPDynamoDB(canned(RESPONSES)).start()
+        self.env = patch.dict(os.environ, {
+            'TABLE_NAME': 'TestTable',
+            'DYNAMODB_CLIENT': 'lite',
+            'AWS_ENDPOINT_URL_DYNAMODB': self.standin.endpoint_url,
+            'AWS_REGION': 'eu-west-1',
+            'AWS_ACCESS_KEY_ID': 'testing',
+            'AWS_SECRET_ACCESS_KEY': 'testing'
+        })
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        clients.reset()
+        self.standin.stop()
+
+    def test_registry_selects_lite_client(self):
+        self.assertIsInstance(clients.dynamodb(), DynamoDBClient)
+
+    def test_visit_handler(self):
+        body = json.loads(visit_handler({}, {})['body'])
+        self.assertEqual(body['updated_value'], '7')
+
+    @patch.dict(os.environ, {'HEALTH_DEBUG': '1'})
+    def test_lambda_handler(self):
+        with patch('app.table_cache.cache.get',
+                   side_effect=lambda client, name: client.describe_table(TableName=name)):
+            response = lambda_handler({}, {})
+
+        body = json.loads(response['body'])
+        self.assertEqual(body['table']['Table']['TableName'], 'TestTable')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import unittest
+from unittest.mock import patch
+import json
+
+
+from app import clients, health
+from app.lambda_module import lambda_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable'})
+class TestHealth(unittest.TestCase):
+    def setUp(self):
+        health.reset()
+        clients.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        health.reset()
+        clients.reset()
+
+    def test_deep_check_is_one_get_item(self):
+        client = clients.dynamodb()
+        with patch.object(client, 'get_item', wraps=client.get_item) as get, \
+                patch.object(client, 'describe_table') as describe:
+            response = lambda_handler({'headers': {'X-Large': 'x' * 4096}}, {})
+            lambda_handler({}, {})
+
+        describe.assert_not_called()
+        get.assert_called_once()
+        self.assertEqual(get.call_args.kwargs['Key'], {'ID': {'S': 'health#sentinel'}})
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body']), {'message': 'Hello World', 'status': 'ok'})
+        self.assertEqual(response['headers']['Cache-Control'], 'no-store')
+
+    @patch.dict(os.environ, {'TABLE_NAME': 'MissingTable', 'HEALTH_CHECK_INTERVAL': '0'})
+    def test_unreachable_table_is_503(self):
+        response = lambda_handler({}, {})
+
+        self.assertEqual(response['statusCode'], 503)
+        self.assertEqual(json.loads(response['body'])['status'], 'unavailable')
+
+    @patch.dict(os.environ, {'HEALTH_MODE': 'shallow'})
+    def test_shallow_mode_makes_no_request(self):
+        with patch.object(clients, 'dynamodb') as dynamodb:
+            response = lambda_handler({}, {})
+
+        dynamodb.assert_not_called()
+        self.assertEqual(response['statusCode'], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+
+
+from app.hll import RELATIVE_ERROR, SIZE, HyperLogLog
+
+
+def sketch_of(values):
+    sketch = HyperLogLog()
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_empty_sketch(self):
+        self.assertEqual(HyperLogLog().estimate(), 0)
+
+    def test_estimates_within_error_bounds(self):
+        for cardinality in (100, 1000, 10000, 100000):
+            sketch = sketch_of(f'visitor-{i}' for i in range(cardinality))
+            error = abs(sketch.estimate() - cardinality) / cardinality
+            self.assertLess(error, 3 * RELATIVE_ERROR, cardinality)
+
+    def test_duplicates_do_not_change_registers(self):
+        sketch = sketch_of(f'visitor-{i}' for i in range(500))
+        before = sketch.copy()
+
+        changed = [sketch.add(f'visitor-{i}') for i in range(500)]
+
+        self.assertFalse(any(changed))
+        self.assertEqual(sketch, before)
+
+    def test_merge_counts_union(self):
+        monday = sketch_of(f'visitor-{i}' for i in range(0, 6000))
+        tuesday = sketch_of(f'visitor-{i}' for i in range(4000, 10000))
+
+        merged = monday.copy().merge(tuesday)
+
+        self.assertEqual(merged, sketch_of(f'visitor-{i}' for i in range(10000)))
+        self.assertLess(abs(merged.estimate() - 10000) / 10000, 3 * RELATIVE_ERROR)
+
+    def test_serialisation_round_trip(self):
+        sketch = sketch_of(f'visitor-{i}' for i in range(20000))
+
+        data = sketch.to_bytes()
+
+        self.assertEqual(len(data), SIZE)
+        self.assertEqual(HyperLogLog.from_bytes(data), sketch)
+        with self.assertRaises(ValueError):
+            HyperLogLog.from_bytes(data[:-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
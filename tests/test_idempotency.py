@@ -0,0 +1,156 @@
+import os
+import unittest
+from unittest.mock import patch
+import json
+
+
+from app import clients, counter, idempotency, visit_buffer
+from app.lambda_module import visit_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+def visit_event(request_id=None, key=None):
+    event = {'requestContext': {'requestId': request_id}} if request_id else {}
+    if key is not None:
+        event['headers'] = {'Idempotency-Key': key}
+    return event
+
+
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'IDEMPOTENCY': '1'})
+class TestIdempotentVisits(unittest.TestCase):
+    def setUp(self):
+        idempotency.reset()
+        clients.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        idempotency.reset()
+        clients.reset()
+
+    def visit(self, *args):
+        response = visit_handler(visit_event(*args), {})
+        return response['statusCode'], json.loads(response['body'])
+
+    def total(self):
+        return counter.read_total(self.dynamodb, 'TestTable')
+
+    def test_failed_read_after_the_transaction_is_not_an_error(self):
+        visit_buffer.buffer.reset()
+        self.addCleanup(visit_buffer.buffer.reset)
+        client = clients.dynamodb()
+        with patch.object(client, 'get_item', side_effect=RuntimeError('throttled')), \
+                patch('builtins.print'):
+            status, body = self.visit('req-1')
+
+        self.assertEqual((status, body), (200, {'message': 'Update successful',
+                                                'estimated': True}))
+        self.assertEqual(self.total(), 1)
+        self.assertEqual(self.visit('req-1')[1]['updated_value'], '1')
+
+    def test_refused_with_buffered_or_queued_visits(self):
+        for env in ({'VISIT_BUFFERING': '1'}, {'VISIT_INGEST_MODE': 'queue'}):
+            with patch.dict(os.environ, env), patch('builtins.print'):
+                self.assertFalse(idempotency.enabled())
+
+    @patch.dict(os.environ, {'VISIT_BUFFERING': '1'})
+    def test_buffered_visits_do_not_pretend_to_be_idempotent(self):
+        visit_buffer.buffer.reset()
+        self.addCleanup(visit_buffer.buffer.reset)
+
+        with patch('builtins.print') as printed:
+            self.visit('req-1', 'same')
+            status, body = self.visit('req-1', 'not valid!')
+
+        self.assertEqual(status, 200)
+        self.assertNotIn('duplicate', body)
+        printed.assert_called_once()
+
+    def test_fast_duplicate_is_answered_from_memory(self):
+        self.visit('req-1')
+        client = clients.dynamodb()
+
+        with patch.object(client, 'transact_write_items') as transact, \
+                patch.object(client, 'get_item') as get:
+            status, body = self.visit('req-1')
+
+        transact.assert_not_called()
+        get.assert_not_called()
+        self.assertEqual(body, {'message': 'Update successful', 'updated_value': '1',
+                                'duplicate': True})
+        self.assertEqual(self.total(), 1)
+
+    def test_duplicate_from_another_container_is_not_counted(self):
+        self.visit(None, 'checkout-42')
+        idempotency.reset()
+
+        status, body = self.visit(None, 'checkout-42')
+
+        self.assertEqual(status, 200)
+        self.assertTrue(body['duplicate'])
+        self.assertEqual(body['updated_value'], '1')
+        self.assertEqual(self.total(), 1)
+
+    def test_warm_visit_is_one_round_trip(self):
+        self.visit('req-1')
+        client = clients.dynamodb()
+
+        with patch.object(client, 'transact_write_items',
+                          wraps=client.transact_write_items) as transact, \
+                patch.object(client, 'update_item') as update, \
+                patch.object(client, 'get_item') as get:
+            status, body = self.visit('req-2')
+
+        self.assertEqual(transact.call_count, 1)
+        update.assert_not_called()
+        get.assert_not_called()
+        self.assertEqual(body['updated_value'], '2')
+        self.assertNotIn('duplicate', body)
+        self.assertEqual(self.total(), 2)
+
+    def test_record_expires(self):
+        self.visit('req-1')
+        item = self.dynamodb.get_item(
+            TableName='TestTable', Key={'ID': {'S': 'idem#request#req-1'}})['Item']
+        self.assertIn('ExpiresAt', item)
+
+        with patch.dict(os.environ, {'IDEMPOTENCY_CACHE_TTL': '0', 'IDEMPOTENCY_TTL': '-1'}):
+            self.visit('req-3')
+            status, body = self.visit('req-3')
+
+        self.assertNotIn('duplicate', body)
+        self.assertEqual(self.total(), 3)
+
+    def test_lru_is_bounded(self):
+        with patch.dict(os.environ, {'IDEMPOTENCY_CACHE_SIZE': '2'}):
+            for request_id in ('a', 'b', 'c'):
+                self.visit(request_id)
+
+        self.assertEqual(list(idempotency._recent), ['request#b', 'request#c'])
+
+    def test_invalid_client_key_is_rejected(self):
+        status, _ = self.visit(None, 'not valid!')
+
+        self.assertEqual(status, 400)
+        self.assertEqual(self.total(), 0)
+
+    def test_events_without_a_key_use_plain_update(self):
+        client = clients.dynamodb()
+        with patch.object(client, 'transact_write_items') as transact:
+            status, body = self.visit()
+
+        transact.assert_not_called()
+        self.assertEqual(body['updated_value'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import os
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+import boto3
+from moto import mock_aws
+import json
+
+
+from app import clients, counter, uniques, visits
+from app.lambda_module import ingest_handler, visit_handler
+
+
+@mock_aws
+@patch.dict(os.environ, {
+    'TABLE_NAME': 'TestTable',
+    'COUNTER_PAGES': 'about,projects',
+    'VISIT_INGEST_MODE': 'queue'
+})
+class TestQueueIngestion(unittest.TestCase):
+    def setUp(self):
+        uniques.reset()
+        clients.reset()
+        self.dynamodb = boto3.client('dynamodb')
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+        self.sqs = boto3.client('sqs')
+        queue_url = self.sqs.create_queue(QueueName='visits')['QueueUrl']
+        patcher = patch.dict(os.environ, {'VISIT_QUEUE_URL': queue_url})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        uniques.reset()
+        clients.reset()
+
+    def drain(self):
+        """Receive every queued message as a Lambda SQS event."""
+        records = []
+        while True:
+            messages = self.sqs.receive_message(
+                QueueUrl=os.environ['VISIT_QUEUE_URL'], MaxNumberOfMessages=10
+            ).get('Messages', [])
+            if not messages:
+                return {'Records': [
+                    {'messageId': m['MessageId'], 'body': m['Body']} for m in records
+                ]}
+            records.extend(messages)
+
+    def visit(self, page=None):
+        event = {'queryStringParameters': {'page': page}} if page else {}
+        return visit_handler(event, {})
+
+    def test_visit_is_enqueued_without_a_write(self):
+        with patch.object(clients.dynamodb(), 'update_item') as update:
+            response = self.visit('about')
+
+        update.assert_not_called()
+        self.assertEqual(response['statusCode'], 202)
+        body = json.loads(self.drain()['Records'][0]['body'])
+        self.assertEqual(body['k'], 'page#about')
+        self.assertNotIn('f', body)
+
+    def test_invalid_page_is_not_enqueued(self):
+        self.assertEqual(self.visit('contact')['statusCode'], 400)
+        self.assertEqual(self.drain(), {'Records': []})
+
+    def test_batch_is_applied_once_per_key(self):
+        for page in ['about'] * 5 + ['projects'] * 3 + [None] * 2:
+            self.visit(page)
+
+        with patch.object(visits, 'record', wraps=visits.record) as record:
+            response = ingest_handler(self.drain(), {})
+
+        self.assertEqual(response, {'batchItemFailures': []})
+        self.assertEqual(record.call_count, 3)
+        totals = counter.read_totals(self.dynamodb, 'TestTable',
+                                     ['page#about', 'page#projects', 'page_counter'])
+        self.assertEqual(totals, {'page#about': 5, 'page#projects': 3, 'page_counter': 2})
+
+    def test_only_failed_keys_are_reported(self):
+        for page in ('about', 'projects', 'about'):
+            self.visit(page)
+        event = self.drain()
+        event['Records'].append({'messageId': 'garbage', 'body': 'not json'})
+        event['Records'].append({'messageId': 'bad-time', 'body': '{"k":"page#about","t":"x"}'})
+        real = visits.record
+
+        def flaky(client, table_name, key, amount, now=None):
+            if key == 'page#about':
+                raise RuntimeError('throttled')
+            return real(client, table_name, key, amount, now=now)
+
+        with patch.object(visits, 'record', side_effect=flaky):
+            response = ingest_handler(event, {})
+
+        about_ids = {r['messageId'] for r in event['Records']
+                     if r['messageId'] not in ('garbage', 'bad-time')
+                     and json.loads(r['body'])['k'] == 'page#about'}
+        self.assertEqual({f['itemIdentifier'] for f in response['batchItemFailures']}, about_ids)
+        self.assertEqual(counter.read_total(self.dynamodb, 'TestTable', 'page#projects'), 1)
+
+    @patch.dict(os.environ, {'UNIQUE_VISITORS': '1'})
+    def test_fingerprints_are_forwarded(self):
+        for ip in ('198.51.100.1', '198.51.100.2', '198.51.100.1'):
+            visit_handler({'requestContext': {'identity': {'sourceIp': ip}}}, {})
+
+        ingest_handler(self.drain(), {})
+
+        today = datetime.now(timezone.utc).date()
+        self.assertEqual(uniques.unique_visitors(self.dynamodb, 'TestTable', today, today), 2)
+
+
+    @patch.dict(os.environ, {'UNIQUE_VISITORS': '1'})
+    def test_fingerprints_count_on_the_day_they_were_sent(self):
+        sent = datetime(2026, 10, 12, 23, 59, 50, tzinfo=timezone.utc)
+        event = {'Records': [{'messageId': 'late', 'body': json.dumps(
+            {'k': 'page_counter', 't': int(sent.timestamp()), 'f': 'ab' * 16})}]}
+
+        ingest_handler(event, {})
+
+        sent_day, today = sent.date(), datetime.now(timezone.utc).date()
+        self.assertEqual(uniques.unique_visitors(self.dynamodb, 'TestTable', sent_day, sent_day), 1)
+        self.assertEqual(uniques.unique_visitors(self.dynamodb, 'TestTable', today, today), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
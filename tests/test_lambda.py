@@ -1,18 +1,18 @@
 import os
 import unittest
 from unittest.mock import patch
-import boto3
-from moto import mock_aws
 import json
 
 
+from app import clients
 from app.lambda_module import lambda_handler, visit_handler  
+from tests.memory_dynamodb import MemoryDynamoDB
 
-@mock_aws
 @patch.dict(os.environ, {'TABLE_NAME': 'TestTable'})
 class TestLambdaFunctions(unittest.TestCase):
     def setUp(self):
-        self.dynamodb = boto3.client('dynamodb')
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
         self.dynamodb.create_table(
             TableName='TestTable',
             KeySchema=[
@@ -38,8 +38,10 @@ class TestLambdaFunctions(unittest.TestCase):
             Item={'ID': {'S': 'page_counter'}, 'count': {'N': '0'}}
         )
 
+    def tearDown(self):
+        clients.reset()
+
 
-    @mock_aws
     @patch.dict(os.environ, {'TABLE_NAME': 'TestTable'})
     def test_lambda_handler(self):
         # Invoke the lambda_handler function
@@ -53,10 +55,18 @@ class TestLambdaFunctions(unittest.TestCase):
         # Assert the response
         self.assertEqual(response['statusCode'], 200)
         self.assertEqual(body['message'], 'Hello World')
+        self.assertEqual(body['status'], 'ok')
+        self.assertNotIn('table', body)
+
+    @patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'HEALTH_DEBUG': '1'})
+    def test_lambda_handler_debug(self):
+        response = lambda_handler({}, {})
+
+        body = json.loads(response['body'])
+        self.assertEqual(response['statusCode'], 200)
         self.assertIn('table', body)
 
     
-    @mock_aws
     @patch.dict(os.environ, {'TABLE_NAME': 'TestTable'})
     def test_visit_handler(self):
         # Invoke the visit_handler function
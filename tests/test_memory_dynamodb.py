@@ -0,0 +1,252 @@
+import os
+import unittest
+from unittest.mock import patch
+import boto3
+from moto import mock_aws
+
+
+from app import clients
+from app.dynamodb_lite import DynamoDBClient
+from tests.http_dynamodb import HTTPDynamoDB
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+def create_tables(dynamodb):
+    dynamodb.create_table(
+        TableName='TestTable',
+        KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+        ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+    )
+    dynamodb.create_table(
+        TableName='SeriesTable',
+        KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'},
+                   {'AttributeName': 'Bucket', 'KeyType': 'RANGE'}],
+        AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'},
+                              {'AttributeName': 'Bucket', 'AttributeType': 'S'}],
+        ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+    )
+
+
+def increment(dynamodb, amount=1, **params):
+    return dynamodb.update_item(**{
+        'TableName': 'TestTable',
+        'Key': {'ID': {'S': 'page_counter'}},
+        'UpdateExpression': "SET #c = if_not_exists(#c, :start) + :inc",
+        'ExpressionAttributeNames': {'#c': 'count'},
+        'ExpressionAttributeValues': {':start': {'N': '0'}, ':inc': {'N': str(amount)}},
+        **params
+    })
+
+
+class Behaviour:
+    """Checks run against both moto and the stand-in, so they agree."""
+
+    def error_code(self, call, *args, **kwargs):
+        with self.assertRaises(Exception) as caught:
+            call(*args, **kwargs)
+        return clients.error_code(caught.exception)
+
+    def test_if_not_exists_increment(self):
+        increment(self.dynamodb)
+        response = increment(self.dynamodb, 2, ReturnValues='UPDATED_NEW')
+
+        self.assertEqual(response['Attributes'], {'count': {'N': '3'}})
+
+    def test_add_and_set_if_not_exists(self):
+        for ttl in ('100', '200'):
+            response = self.dynamodb.update_item(
+                TableName='TestTable',
+                Key={'ID': {'S': 'rl#a#1'}},
+                UpdateExpression="ADD #c :one SET #ttl = if_not_exists(#ttl, :ttl)",
+                ExpressionAttributeNames={'#c': 'count', '#ttl': 'ExpiresAt'},
+                ExpressionAttributeValues={':one': {'N': '1'}, ':ttl': {'N': ttl}},
+                ReturnValues='ALL_NEW'
+            )
+
+        self.assertEqual(response['Attributes'], {
+            'ID': {'S': 'rl#a#1'}, 'count': {'N': '2'}, 'ExpiresAt': {'N': '100'}})
+
+    def test_condition_failure_leaves_item(self):
+        increment(self.dynamodb, 5)
+
+        code = self.error_code(
+            increment, self.dynamodb,
+            ConditionExpression="attribute_not_exists(#c) OR #c < :limit",
+            ExpressionAttributeValues={':start': {'N': '0'}, ':inc': {'N': '1'},
+                                       ':limit': {'N': '5'}})
+
+        self.assertEqual(code, 'ConditionalCheckFailedException')
+        item = self.dynamodb.get_item(TableName='TestTable', Key={'ID': {'S': 'page_counter'}})
+        self.assertEqual(item['Item']['count'], {'N': '5'})
+
+    def test_condition_with_not_and_parentheses(self):
+        increment(self.dynamodb, 5)
+
+        response = increment(
+            self.dynamodb,
+            ConditionExpression="NOT (#c = :five AND attribute_not_exists(#c)) AND #c >= :five",
+            ExpressionAttributeValues={':start': {'N': '0'}, ':inc': {'N': '1'},
+                                       ':five': {'N': '5'}},
+            ReturnValues='UPDATED_OLD')
+
+        self.assertEqual(response['Attributes'], {'count': {'N': '5'}})
+
+    def test_unused_expression_values_are_rejected(self):
+        code = self.error_code(
+            increment, self.dynamodb,
+            ExpressionAttributeValues={':start': {'N': '0'}, ':inc': {'N': '1'},
+                                       ':extra': {'N': '1'}})
+
+        self.assertEqual(code, 'ValidationException')
+
+    def test_get_item_projection(self):
+        self.dynamodb.put_item(TableName='TestTable', Item={
+            'ID': {'S': 'a'}, 'count': {'N': '1'}, 'version': {'N': '2'}})
+
+        missing = self.dynamodb.get_item(TableName='TestTable', Key={'ID': {'S': 'b'}})
+        item = self.dynamodb.get_item(
+            TableName='TestTable', Key={'ID': {'S': 'a'}},
+            ProjectionExpression="#v, ID", ExpressionAttributeNames={'#v': 'version'},
+            ConsistentRead=True)
+
+        self.assertNotIn('Item', missing)
+        self.assertEqual(item['Item'], {'ID': {'S': 'a'}, 'version': {'N': '2'}})
+
+    def test_batch_write_and_get(self):
+        self.dynamodb.batch_write_item(RequestItems={'TestTable': [
+            {'PutRequest': {'Item': {'ID': {'S': f'k{i}'}, 'count': {'N': str(i)}}}}
+            for i in range(3)]})
+
+        response = self.dynamodb.batch_get_item(RequestItems={'TestTable': {
+            'Keys': [{'ID': {'S': 'k1'}}, {'ID': {'S': 'k2'}}, {'ID': {'S': 'k9'}}],
+            'ProjectionExpression': '#c',
+            'ExpressionAttributeNames': {'#c': 'count'}}})
+
+        self.assertCountEqual(response['Responses']['TestTable'],
+                              [{'count': {'N': '1'}}, {'count': {'N': '2'}}])
+        self.assertFalse(response.get('UnprocessedKeys'))
+        self.assertEqual(len(self.dynamodb.scan(TableName='TestTable')['Items']), 3)
+
+    def test_query_between_with_pages(self):
+        for minute in range(5):
+            self.dynamodb.put_item(TableName='SeriesTable', Item={
+                'ID': {'S': 'page_counter#minute'}, 'Bucket': {'S': f'00:0{minute}'},
+                'count': {'N': str(minute)}})
+        self.dynamodb.put_item(TableName='SeriesTable', Item={
+            'ID': {'S': 'other'}, 'Bucket': {'S': '00:02'}, 'count': {'N': '9'}})
+
+        params = {
+            'TableName': 'SeriesTable',
+            'KeyConditionExpression': "ID = :id AND #b BETWEEN :start AND :end",
+            'ProjectionExpression': "#b, #c",
+            'ExpressionAttributeNames': {'#b': 'Bucket', '#c': 'count'},
+            'ExpressionAttributeValues': {':id': {'S': 'page_counter#minute'},
+                                          ':start': {'S': '00:01'}, ':end': {'S': '00:03'}},
+            'Limit': 2
+        }
+        first = self.dynamodb.query(**params)
+        second = self.dynamodb.query(**params, ExclusiveStartKey=first['LastEvaluatedKey'])
+
+        self.assertEqual([item['count']['N'] for item in first['Items']], ['1', '2'])
+        self.assertEqual(second['Items'], [{'Bucket': {'S': '00:03'}, 'count': {'N': '3'}}])
+
+    def test_transaction_is_cancelled_as_a_whole(self):
+        put = {'Put': {
+            'TableName': 'TestTable',
+            'Item': {'ID': {'S': 'idem#a'}},
+            'ConditionExpression': 'attribute_not_exists(ID)'}}
+        update = {'Update': {
+            'TableName': 'TestTable',
+            'Key': {'ID': {'S': 'page_counter'}},
+            'UpdateExpression': 'ADD #c :one',
+            'ExpressionAttributeNames': {'#c': 'count'},
+            'ExpressionAttributeValues': {':one': {'N': '1'}}}}
+        self.dynamodb.transact_write_items(TransactItems=[put, update])
+
+        with self.assertRaises(Exception) as caught:
+            self.dynamodb.transact_write_items(TransactItems=[put, update])
+
+        self.assertEqual(clients.error_code(caught.exception), 'TransactionCanceledException')
+        reasons = caught.exception.response['CancellationReasons']
+        self.assertEqual([reason['Code'] for reason in reasons],
+                         ['ConditionalCheckFailed', 'None'])
+        item = self.dynamodb.get_item(TableName='TestTable', Key={'ID': {'S': 'page_counter'}})
+        self.assertEqual(item['Item']['count'], {'N': '1'})
+
+
+class TestMotoBehaviour(Behaviour, unittest.TestCase):
+    def setUp(self):
+        # mock_aws as a class decorator would miss the inherited tests.
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        self.dynamodb = boto3.client('dynamodb')
+        create_tables(self.dynamodb)
+
+
+class TestMemoryDynamoDB(Behaviour, unittest.TestCase):
+    def setUp(self):
+        self.dynamodb = MemoryDynamoDB()
+        create_tables(self.dynamodb)
+
+    def test_throttling_refills_every_second(self):
+        now = [0.0]
+        self.dynamodb = MemoryDynamoDB(throttling=True, burst_seconds=1, clock=lambda: now[0])
+        create_tables(self.dynamodb)
+
+        for _ in range(5):
+            increment(self.dynamodb)
+        code = self.error_code(increment, self.dynamodb)
+        now[0] += 0.2
+        increment(self.dynamodb)
+
+        self.assertEqual(code, 'ProvisionedThroughputExceededException')
+        self.assertEqual(self.dynamodb.throttles['UpdateItem'], 1)
+        self.assertEqual(self.dynamodb.operations['UpdateItem'], 7)
+
+    def test_throttled_transaction_reports_throttling_error(self):
+        self.dynamodb = MemoryDynamoDB(throttling=True, burst_seconds=1, clock=lambda: 0)
+        create_tables(self.dynamodb)
+        update = {'Update': {
+            'TableName': 'TestTable',
+            'Key': {'ID': {'S': 'page_counter'}},
+            'UpdateExpression': 'ADD #c :one',
+            'ExpressionAttributeNames': {'#c': 'count'},
+            'ExpressionAttributeValues': {':one': {'N': '1'}}}}
+        self.dynamodb.transact_write_items(TransactItems=[update])
+        self.dynamodb.transact_write_items(TransactItems=[update])
+
+        with self.assertRaises(Exception) as caught:
+            self.dynamodb.transact_write_items(TransactItems=[update])
+
+        self.assertEqual(caught.exception.response['CancellationReasons'][0]['Code'],
+                         'ThrottlingError')
+
+    def test_serves_the_lite_client_over_http(self):
+        with HTTPDynamoDB(self.dynamodb.backend) as standin:
+            client = DynamoDBClient('eu-west-1', 'testing', 'testing',
+                                    endpoint_url=standin.endpoint_url)
+            try:
+                response = increment(client, 4, ReturnValues='UPDATED_NEW')
+                code = self.error_code(client.get_item, TableName='Missing',
+                                       Key={'ID': {'S': 'a'}})
+                table = client.describe_table(TableName='TestTable')['Table']
+            finally:
+                client.close()
+
+        self.assertEqual(response['Attributes'], {'count': {'N': '4'}})
+        self.assertEqual(code, 'ResourceNotFoundException')
+        self.assertEqual(table['ItemCount'], 1)
+
+    @patch.dict(os.environ, {'TABLE_NAME': 'TestTable'})
+    def test_registered_for_the_handlers(self):
+        from app.lambda_module import visit_handler
+
+        clients.register('dynamodb', self.dynamodb)
+        try:
+            visit_handler({}, {})
+        finally:
+            clients.reset()
+
+        self.assertEqual(self.dynamodb.operations['UpdateItem'], 1)
@@ -0,0 +1,120 @@
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+import boto3
+from moto import mock_aws
+
+from app import clients, metrics
+from app.dynamodb_lite import DynamoDBClient
+from app.lambda_module import visit_handler
+from tests.http_dynamodb import HTTPDynamoDB, canned
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+class Context:
+    aws_request_id = 'req-1'
+
+
+def create_table(dynamodb):
+    dynamodb.create_table(
+        TableName='TestTable',
+        KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+        ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+    )
+
+
+@patch.dict(os.environ, {'METRICS': '1', 'TABLE_NAME': 'TestTable',
+                         'AWS_LAMBDA_FUNCTION_NAME': 'VisitorsCounter'})
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+        self.addCleanup(clients.reset)
+
+    def invoke(self, handler, event=None):
+        """Invoke ``handler`` instrumented and return its EMF document."""
+        with patch('builtins.print') as printed:
+            metrics.instrument(handler)(event or {}, Context())
+        printed.assert_called_once()
+        return json.loads(printed.call_args.args[0])
+
+    def test_disabled_returns_the_handler_itself(self):
+        def handler(event, context):
+            return 'response'
+
+        with patch.dict(os.environ, {'METRICS': '0'}):
+            self.assertIs(metrics.instrument(handler), handler)
+
+    def test_one_line_per_invocation(self):
+        def handler(event, context):
+            return 'response'
+
+        metrics.initialized()
+        cold = self.invoke(handler)
+        warm = self.invoke(handler)
+
+        directive = cold['_aws']['CloudWatchMetrics'][0]
+        self.assertEqual(directive['Dimensions'], [['Function', 'Operation', 'Start']])
+        self.assertEqual(
+            (cold['Function'], cold['Operation'], cold['Start'], cold['requestId']),
+            ('VisitorsCounter', 'handler', 'cold', 'req-1'))
+        self.assertIn({'Name': 'InitDuration', 'Unit': 'Milliseconds'}, directive['Metrics'])
+        self.assertEqual(warm['Start'], 'warm')
+        self.assertNotIn('InitDuration', warm)
+        self.assertGreaterEqual(warm['HandlerDuration'], 0)
+
+    def test_timing_points_outside_an_invocation_are_ignored(self):
+        metrics.record('Serialization', 0)
+        metrics.api_call('GetItem', 0)
+
+        document = self.invoke(lambda event, context: None)
+
+        self.assertNotIn('SerializationDuration', document)
+        self.assertNotIn('DynamoDBCalls', document)
+
+    def test_handler_serialization_and_compression(self):
+        dynamodb = MemoryDynamoDB()
+        create_table(dynamodb)
+        clients.register('dynamodb', dynamodb)
+
+        document = self.invoke(visit_handler)
+
+        self.assertEqual(document['Operation'], 'visit_handler')
+        self.assertIn('SerializationDuration', document)
+        self.assertIn('CompressionDuration', document)
+
+    def test_botocore_calls_are_timed_through_event_hooks(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        create_table(boto3.client('dynamodb'))
+        client = clients.dynamodb()
+
+        def handler(event, context):
+            client.get_item(TableName='TestTable', Key={'ID': {'S': 'a'}})
+            client.get_item(TableName='TestTable', Key={'ID': {'S': 'b'}})
+            with self.assertRaises(Exception):
+                client.get_item(TableName='Missing', Key={'ID': {'S': 'a'}})
+
+        document = self.invoke(handler)
+
+        self.assertEqual(document['DynamoDBCalls'], 3)
+        self.assertEqual(document['DynamoDBRetries'], 0)
+        self.assertIn('GetItemDuration', document)
+        self.assertAlmostEqual(document['GetItemDuration'], document['DynamoDBDuration'])
+
+    def test_lite_client_calls_are_timed(self):
+        with HTTPDynamoDB(canned({'UpdateItem': {}})) as standin:
+            client = DynamoDBClient('eu-west-1', 'testing', 'testing',
+                                    endpoint_url=standin.endpoint_url)
+            try:
+                document = self.invoke(lambda event, context: client.update_item(
+                    TableName='TestTable', Key={'ID': {'S': 'a'}}))
+            finally:
+                client.close()
+
+        self.assertEqual(document['DynamoDBCalls'], 1)
+        self.assertIn('UpdateItemDuration', document)
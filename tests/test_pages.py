@@ -0,0 +1,115 @@
+import os
+import unittest
+from unittest.mock import patch
+import json
+
+
+from app import batch, clients, counter
+from app.lambda_module import counts_handler, visit_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+PAGES = ','.join(['home', 'about', 'projects'] + [f'post-{i}' for i in range(40)])
+
+
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'COUNTER_PAGES': PAGES})
+class TestPageCounters(unittest.TestCase):
+    def setUp(self):
+        clients.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        clients.reset()
+
+    def visit(self, page=None, via='query'):
+        event = {}
+        if page is not None:
+            event['pathParameters' if via == 'path' else 'queryStringParameters'] = {'page': page}
+        return visit_handler(event, {})
+
+    def keys(self):
+        return {i['ID']['S'] for i in self.dynamodb.scan(TableName='TestTable')['Items']}
+
+    def test_visits_are_counted_per_page(self):
+        self.visit('about')
+        self.visit('about', via='path')
+        body = json.loads(self.visit('projects')['body'])
+        self.visit()
+
+        self.assertEqual(body['updated_value'], '1')
+        self.assertEqual(self.keys(), {'page#about', 'page#projects', 'page_counter'})
+        self.assertEqual(counter.read_total(self.dynamodb, 'TestTable', 'page#about'), 2)
+
+    def test_unknown_pages_are_rejected_without_a_write(self):
+        for page in ('contact', 'About', '../../etc', 'a' * 500):
+            response = self.visit(page)
+            self.assertEqual(response['statusCode'], 400)
+
+        self.assertEqual(self.keys(), set())
+
+    def test_batched_read_uses_one_batch_get(self):
+        for page in ('home', 'about', 'about'):
+            self.visit(page)
+
+        with patch.object(clients.dynamodb(), 'batch_get_item',
+                          wraps=clients.dynamodb().batch_get_item) as batch_get:
+            response = counts_handler({'queryStringParameters': {
+                'pages': 'home,about,projects,about'}}, {})
+
+        self.assertEqual(batch_get.call_count, 1)
+        self.assertEqual(json.loads(response['body']), {
+            'counts': {'home': 1, 'about': 2, 'projects': 0}
+        })
+
+    @patch.dict(os.environ, {'COUNTER_SHARDS': '4'})
+    def test_batched_read_is_chunked(self):
+        self.visit('post-39')
+        requested = ','.join(f'post-{i}' for i in range(40))
+
+        with patch.object(clients.dynamodb(), 'batch_get_item',
+                          wraps=clients.dynamodb().batch_get_item) as batch_get:
+            response = counts_handler({'queryStringParameters': {'pages': requested}}, {})
+
+        # 40 pages x (4 shards + legacy item) = 200 keys
+        self.assertEqual(batch_get.call_count, 2)
+        counts = json.loads(response['body'])['counts']
+        self.assertEqual(counts['post-39'], 1)
+        self.assertEqual(sum(counts.values()), 1)
+
+    def test_batched_read_validates_pages(self):
+        for pages in ('', 'about,contact'):
+            response = counts_handler({'queryStringParameters': {'pages': pages}}, {})
+            self.assertEqual(response['statusCode'], 400)
+
+    def test_unprocessed_keys_are_retried(self):
+        self.visit('about')
+        real = self.dynamodb.batch_get_item
+        calls = []
+
+        def flaky(RequestItems):
+            calls.append(RequestItems)
+            if len(calls) == 1:
+                return {'Responses': {}, 'UnprocessedKeys': RequestItems}
+            return real(RequestItems=RequestItems)
+
+        with patch.object(self.dynamodb, 'batch_get_item', side_effect=flaky), \
+                patch.object(batch.time, 'sleep') as sleep:
+            totals = counter.read_totals(self.dynamodb, 'TestTable', ['page#about'])
+
+        self.assertEqual(totals, {'page#about': 1})
+        self.assertEqual(len(calls), 2)
+        sleep.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+import json
+from botocore.exceptions import ClientError
+
+
+from app import clients, counter, rate_limit, resilience
+from app.lambda_module import beacon_handler, visit_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+def visit_event(ip='203.0.113.7', agent='Mozilla/5.0'):
+    return {'requestContext': {'identity': {'sourceIp': ip}},
+            'headers': {'User-Agent': agent}}
+
+
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'RATE_LIMIT': '1',
+                         'RATE_LIMIT_BURST': '3', 'RATE_LIMIT_PER_MINUTE': '6'})
+class TestRateLimit(unittest.TestCase):
+    def setUp(self):
+        rate_limit.reset()
+        clients.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        rate_limit.reset()
+        clients.reset()
+
+    def test_burst_is_allowed_then_rejected_without_a_write(self):
+        for _ in range(3):
+            self.assertEqual(visit_handler(visit_event(), {})['statusCode'], 200)
+
+        with patch.object(clients.dynamodb(), 'update_item') as update:
+            response = visit_handler(visit_event(), {})
+
+        update.assert_not_called()
+        self.assertEqual(response['statusCode'], 429)
+        self.assertEqual(response['headers']['Retry-After'], '1')
+        self.assertEqual(counter.read_total(self.dynamodb, 'TestTable'), 3)
+        self.assertEqual(rate_limit.stats(),
+                         {'allowed': 3, 'rejected_local': 1, 'rejected_shared': 0,
+                          'shared_failed_open': 0})
+
+    def test_clients_are_limited_separately(self):
+        for _ in range(4):
+            visit_handler(visit_event(), {})
+
+        response = visit_handler(visit_event(ip='198.51.100.1'), {})
+
+        self.assertEqual(response['statusCode'], 200)
+
+    def test_beacons_are_limited(self):
+        event = {**visit_event(), 'body': json.dumps({'events': [{'ts': int(time.time())}]})}
+        for _ in range(3):
+            rate_limit.check(event, None, 'TestTable')
+
+        response = beacon_handler(event, {})
+
+        self.assertEqual(response['statusCode'], 429)
+
+    def test_disabled_by_default(self):
+        with patch.dict(os.environ, {'RATE_LIMIT': '0'}):
+            for _ in range(5):
+                self.assertEqual(visit_handler(visit_event(), {})['statusCode'], 200)
+
+    def test_client_id_ignores_user_agent_by_default(self):
+        self.assertEqual(rate_limit.client_id(visit_event(agent='a')),
+                         rate_limit.client_id(visit_event(agent='b')))
+        with patch.dict(os.environ, {'RATE_LIMIT_KEY': 'fingerprint'}):
+            self.assertNotEqual(rate_limit.client_id(visit_event(agent='a')),
+                                rate_limit.client_id(visit_event(agent='b')))
+
+    @patch.dict(os.environ, {'RATE_LIMIT_SHARED': '1', 'FINGERPRINT_SALT': ''})
+    def test_shared_window_needs_a_salt(self):
+        with patch.object(self.dynamodb, 'update_item') as update, patch('builtins.print'):
+            self.assertEqual(rate_limit.check(visit_event(), self.dynamodb, 'TestTable'), 0)
+
+        update.assert_not_called()
+        self.assertFalse(rate_limit.shared())
+
+    @patch.dict(os.environ, {'RATE_LIMIT_SHARED': '1', 'RATE_LIMIT_BURST': '10',
+                             'FINGERPRINT_SALT': 'pepper'})
+    def test_shared_window_counts_across_containers(self):
+        caller = rate_limit.client_id(visit_event())
+        with patch('app.rate_limit.time.time', return_value=60 * 1000 + 30):
+            for _ in range(4):
+                self.assertEqual(rate_limit.check(visit_event(), self.dynamodb, 'TestTable'), 0)
+            # Another container, with a fresh bucket, shares the window.
+            rate_limit.reset()
+            for _ in range(2):
+                self.assertEqual(rate_limit.check(visit_event(), self.dynamodb, 'TestTable'), 0)
+            retry_after = rate_limit.check(visit_event(), self.dynamodb, 'TestTable')
+
+            with patch.object(self.dynamodb, 'update_item') as update:
+                self.assertEqual(rate_limit.check(visit_event(), self.dynamodb, 'TestTable'),
+                                 30)
+            update.assert_not_called()
+
+        self.assertEqual(retry_after, 30)
+        item = self.dynamodb.get_item(TableName='TestTable',
+                                      Key={'ID': {'S': rate_limit.item_id(caller, 1000)}})['Item']
+        self.assertEqual(item['count'], {'N': '6'})
+        self.assertEqual(item['ExpiresAt'], {'N': str(1002 * 60)})
+        self.assertEqual(rate_limit.stats(),
+                         {'allowed': 2, 'rejected_local': 0, 'rejected_shared': 2,
+                          'shared_failed_open': 0})
+
+    @patch.dict(os.environ, {'RATE_LIMIT_SHARED': '1', 'FINGERPRINT_SALT': 'pepper',
+                             'DDB_RESILIENCE_MAX_ATTEMPTS': '1'})
+    def test_throttled_window_fails_open(self):
+        self.addCleanup(resilience.reset)
+        real = self.dynamodb.update_item
+
+        def throttled(**kwargs):
+            if kwargs['Key']['ID']['S'].startswith('rl#'):
+                raise ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}},
+                                  'UpdateItem')
+            return real(**kwargs)
+
+        statuses = []
+        with patch.object(self.dynamodb, 'update_item', side_effect=throttled), \
+                patch('builtins.print') as printed:
+            for resilient in ('0', '1'):
+                resilience.reset()
+                with patch.dict(os.environ, {'DDB_RESILIENCE': resilient}):
+                    statuses.append(visit_handler(visit_event(), {})['statusCode'])
+
+        self.assertEqual(statuses, [200, 200])
+        self.assertEqual(counter.read_total(self.dynamodb, 'TestTable'), 2)
+        self.assertEqual(rate_limit.stats()['shared_failed_open'], 2)
+        printed.assert_called_once()
+
+    @patch.dict(os.environ, {'RATE_LIMIT_SHARED': '1', 'RATE_LIMIT_BURST': '10',
+                             'FINGERPRINT_SALT': 'pepper'})
+    def test_previous_window_is_weighted(self):
+        with patch('app.rate_limit.time.time', return_value=60 * 1000 + 50):
+            for _ in range(6):
+                rate_limit.check(visit_event(), self.dynamodb, 'TestTable')
+        # A quarter into the next minute, three quarters of the previous
+        # six visits still count: floor(4.5) leaves room for two more.
+        with patch('app.rate_limit.time.time', return_value=60 * 1001 + 15):
+            results = [rate_limit.check(visit_event(), self.dynamodb, 'TestTable')
+                       for _ in range(3)]
+
+        self.assertEqual(results, [0, 0, 45])
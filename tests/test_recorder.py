@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import clients, recorder
+from app.lambda_module import visit_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+def api_event(ip='203.0.113.7', **headers):
+    return {
+        'httpMethod': 'POST',
+        'path': '/visits',
+        'headers': {'User-Agent': 'Mozilla/5.0', 'Cookie': 'session=secret', **headers},
+        'queryStringParameters': {'page': 'about', 'email': 'someone@example.com'},
+        'multiValueHeaders': {'Cookie': ['session=secret']},
+        'body': None,
+        'requestContext': {'requestId': 'req-1', 'identity': {'sourceIp': ip}},
+    }
+
+
+class TestSanitize(unittest.TestCase):
+    def test_only_allowed_values_are_kept(self):
+        sanitized = recorder.sanitize(api_event(Authorization='Bearer token'))
+
+        self.assertEqual(sanitized['headers'], {
+            'User-Agent': 'Mozilla/5.0', 'Cookie': 'redacted', 'Authorization': 'redacted'})
+        self.assertEqual(sanitized['queryStringParameters'],
+                         {'page': 'about', 'email': 'redacted'})
+        self.assertNotIn('multiValueHeaders', sanitized)
+        self.assertNotIn('body', sanitized)
+        self.assertEqual(sanitized['requestContext']['requestId'], 'req-1')
+
+    def test_source_ip_is_a_stable_pseudonym(self):
+        with patch.dict(os.environ, {'RECORD_SALT': 'pepper'}):
+            first = recorder.sanitize(api_event())['requestContext']['identity']['sourceIp']
+            again = recorder.sanitize(api_event())['requestContext']['identity']['sourceIp']
+            other = recorder.sanitize(api_event('198.51.100.1'))
+        with patch.dict(os.environ, {'RECORD_SALT': 'salt'}):
+            salted = recorder.sanitize(api_event())
+
+        self.assertEqual(first, again)
+        self.assertTrue(first.startswith('10.'))
+        self.assertNotEqual(first, other['requestContext']['identity']['sourceIp'])
+        self.assertNotEqual(first, salted['requestContext']['identity']['sourceIp'])
+
+    def test_unset_salt_is_random_per_container(self):
+        with patch.dict(os.environ, {'RECORD_SALT': ''}):
+            first = recorder.sanitize(api_event())['requestContext']['identity']['sourceIp']
+            with patch.object(recorder, '_container_salt', 'another container'):
+                other = recorder.sanitize(api_event())['requestContext']['identity']['sourceIp']
+
+        self.assertNotEqual(first, other)
+
+    def test_large_bodies_are_dropped(self):
+        event = {'body': '{"events": []}'}
+        self.assertEqual(recorder.sanitize(event)['body'], '{"events": []}')
+        event = {'body': 'x' * (recorder.MAX_BODY + 1)}
+        self.assertNotIn('body', recorder.sanitize(event))
+
+
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'COUNTER_PAGES': 'about'})
+class TestRecording(unittest.TestCase):
+    def setUp(self):
+        self.dynamodb = MemoryDynamoDB()
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+        )
+        clients.register('dynamodb', self.dynamodb)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'events.jsonl')
+
+    def tearDown(self):
+        recorder.reset()
+        clients.reset()
+
+    def lines(self):
+        recorder.reset()
+        with open(self.path) as f:
+            return [json.loads(line) for line in f]
+
+    def test_disabled_by_default(self):
+        with patch.dict(os.environ, {'RECORD_EVENTS_PATH': self.path}):
+            visit_handler(api_event(), {})
+
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_handler_events_are_appended_as_lines(self):
+        with patch.dict(os.environ, {'RECORD_EVENTS': '1', 'RECORD_EVENTS_PATH': self.path}):
+            visit_handler(api_event(), {})
+            visit_handler(api_event(), {})
+
+        lines = self.lines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]['h'], 'visit_handler')
+        self.assertEqual(lines[0]['e']['headers']['Cookie'], 'redacted')
+        self.assertLessEqual(lines[0]['t'], lines[1]['t'])
+
+    def test_log_lines_and_sampling(self):
+        with patch.dict(os.environ, {'RECORD_EVENTS': '1'}), \
+                patch('builtins.print') as printed:
+            recorder.record('visit_handler', api_event())
+            with patch.dict(os.environ, {'RECORD_SAMPLE_RATE': '0'}):
+                recorder.record('visit_handler', api_event())
+
+        printed.assert_called_once()
+        line = printed.call_args.args[0]
+        self.assertTrue(line.startswith(recorder.LOG_PREFIX))
+        self.assertEqual(json.loads(line[len(recorder.LOG_PREFIX):])['h'], 'visit_handler')
+
+    def test_recording_failure_does_not_fail_the_request(self):
+        with patch.dict(os.environ, {'RECORD_EVENTS': '1',
+                                     'RECORD_EVENTS_PATH': os.path.dirname(self.path)}), \
+                patch('builtins.print'):
+            response = visit_handler(api_event(), {})
+
+        self.assertEqual(response['statusCode'], 200)
@@ -0,0 +1,226 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch
+import json
+
+
+from app import clients, count_cache, resilience, visit_buffer
+from app.lambda_module import count_handler, visit_handler
+from tests.http_dynamodb import HTTPDynamoDB, error
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+class Context:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+class FakeClock:
+    """Stands in for the ``time`` module; sleeping advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class ThrottlingTable:
+    """Stand-in backend holding one counter that can be made to throttle."""
+
+    def __init__(self):
+        self.count = 0
+        self.throttle = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, operation, payload):
+        with self._lock:
+            self.calls += 1
+            if self.throttle:
+                self.throttle -= 1
+                return error('ProvisionedThroughputExceededException', 'slow down')
+            if operation == 'UpdateItem':
+                self.count += int(payload['ExpressionAttributeValues'][':inc']['N'])
+                return 200, {'Attributes': {'count': {'N': str(self.count)}}}
+            if operation == 'GetItem':
+                return 200, {'Item': {'count': {'N': str(self.count)}}}
+            return error('ValidationException', operation)
+
+
+class TestResilience(unittest.TestCase):
+    def setUp(self):
+        clients.reset()
+        resilience.reset()
+        visit_buffer.buffer.reset()
+        count_cache.cache.reset()
+        self.table = ThrottlingTable()
+        self.standin = HTTPDynamoDB(self.table).start()
+        self.env = patch.dict(os.environ, {
+            'TABLE_NAME': 'TestTable',
+            'DYNAMODB_CLIENT': 'lite',
+            'AWS_ENDPOINT_URL_DYNAMODB': self.standin.endpoint_url,
+            'AWS_REGION': 'eu-west-1',
+            'AWS_ACCESS_KEY_ID': 'testing',
+            'AWS_SECRET_ACCESS_KEY': 'testing',
+            'DDB_RESILIENCE': '1',
+            'DDB_WRITE_CAPACITY': '1000',
+            'DDB_READ_CAPACITY': '1000',
+            'COUNT_CACHE_TTL': '0'
+        })
+        self.env.start()
+        self.clock = FakeClock()
+        patch.object(resilience, 'time', self.clock).start()
+        self.addCleanup(patch.stopall)
+
+    def tearDown(self):
+        self.env.stop()
+        visit_buffer.buffer.reset()
+        count_cache.cache.reset()
+        resilience.reset()
+        clients.reset()
+        self.standin.stop()
+
+    def visit(self, remaining_ms=3000):
+        response = visit_handler({}, Context(remaining_ms))
+        return response['statusCode'], json.loads(response['body'])
+
+    def test_throttled_write_is_retried(self):
+        self.table.throttle = 2
+
+        status, body = self.visit()
+
+        self.assertEqual((status, body['updated_value']), (200, '1'))
+        self.assertEqual(self.table.calls, 3)
+        self.assertEqual(len(self.clock.sleeps), 2)
+
+    def test_backoff_never_outlasts_the_invocation(self):
+        self.visit()
+        self.table.throttle = 100
+
+        with patch.object(resilience.random, 'uniform', return_value=0.3):
+            status, body = self.visit(remaining_ms=1100)
+
+        # 600 ms of budget after the 500 ms margin: two 300 ms backoffs fit.
+        self.assertEqual(self.table.calls, 1 + 3)
+        self.assertEqual(status, 503)
+        self.assertEqual(visit_buffer.buffer.pending(), 0)
+
+    @patch.dict(os.environ, {'VISIT_BUFFERING': '1', 'VISIT_BUFFER_MAX_COUNT': '1'})
+    def test_buffered_visits_are_written_later(self):
+        self.visit()
+        self.table.throttle = 100
+        status, body = self.visit()
+        self.visit()
+        self.table.throttle = 0
+        resilience.reset()
+
+        self.assertEqual(status, 200)
+        self.assertEqual(body, {'message': 'Update deferred', 'updated_value': '2', 'stale': True})
+        status, body = self.visit()
+
+        self.assertEqual((status, body['updated_value']), (200, '4'))
+        self.assertEqual(self.table.count, 4)
+        self.assertEqual(visit_buffer.buffer.pending(), 0)
+
+    def test_failed_read_back_does_not_defer_a_counted_visit(self):
+        dynamodb = MemoryDynamoDB()
+        dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}])
+
+        def backend(operation, payload):
+            if operation == 'BatchGetItem':
+                return error('ProvisionedThroughputExceededException', 'slow down')
+            return dynamodb.backend(operation, payload)
+
+        standin = HTTPDynamoDB(backend).start()
+        self.addCleanup(standin.stop)
+        with patch.dict(os.environ, {'AWS_ENDPOINT_URL_DYNAMODB': standin.endpoint_url,
+                                     'COUNTER_SHARDS': '4'}), patch('builtins.print'):
+            clients.reset()
+            status, body = self.visit()
+            visit_buffer.buffer.flush()
+
+        self.assertEqual((status, body), (200, {'message': 'Update successful', 'estimated': True}))
+        self.assertEqual(visit_buffer.buffer.pending(), 0)
+        items = dynamodb.scan(TableName='TestTable')['Items']
+        self.assertEqual(sum(int(item['count']['N']) for item in items), 1)
+
+    def test_cold_container_without_a_count_gets_503(self):
+        self.table.throttle = 100
+
+        response = visit_handler({}, Context(3000))
+
+        self.assertEqual(response['statusCode'], 503)
+        self.assertEqual(response['headers']['Retry-After'], '1')
+        self.assertEqual(visit_buffer.buffer.pending(), 0)
+
+    @patch.dict(os.environ, {'CIRCUIT_FAILURE_THRESHOLD': '2', 'DDB_RESILIENCE_MAX_ATTEMPTS': '2'})
+    def test_circuit_opens_and_recovers(self):
+        self.visit()
+        self.table.throttle = 100
+        self.visit()
+        self.visit()
+        calls = self.table.calls
+
+        status, body = self.visit()
+
+        self.assertEqual(self.table.calls, calls)
+        self.assertEqual(status, 503)
+
+        self.table.throttle = 0
+        with patch.dict(os.environ, {'CIRCUIT_RESET_SECONDS': '0'}):
+            status, body = self.visit()
+        self.assertEqual(body['updated_value'], '2')
+        self.assertNotIn('stale', body)
+
+    def test_count_serves_last_known_value_while_throttled(self):
+        self.visit()
+        count_handler({}, Context(3000))
+        self.table.throttle = 100
+
+        response = count_handler({}, Context(3000))
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(json.loads(response['body']), {'count': 1, 'stale': True})
+        self.assertEqual(response['headers']['Cache-Control'], 'no-store')
+
+    def test_other_errors_are_not_retried(self):
+        with self.assertRaises(Exception) as raised:
+            resilience.guard(clients.dynamodb(), {}).query(TableName='TestTable')
+
+        self.assertEqual(clients.error_code(raised.exception), 'ValidationException')
+        self.assertEqual(self.table.calls, 1)
+
+    def test_token_bucket_slows_down_after_throttling(self):
+        bucket = resilience.TokenBucket(10)
+        waits = [bucket.wait_time() for _ in range(11)]
+        self.assertEqual(waits[:10], [0.0] * 10)
+        self.assertAlmostEqual(waits[10], 0.1, places=2)
+
+        bucket.throttled()
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 2.5)
+        for _ in range(10):
+            bucket.succeeded()
+        self.assertEqual(bucket.rate, 10)
+
+    @patch.dict(os.environ, {'DDB_RESILIENCE': '0'})
+    def test_disabled_returns_plain_client(self):
+        client = clients.dynamodb()
+        self.assertIs(resilience.guard(client, Context(3000)), client)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+import json
+
+
+from app import clients, rollups, visits
+from app.lambda_module import series_handler, visit_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+NOW = datetime(2026, 10, 17, 15, 30, 20, tzinfo=timezone.utc)
+
+
+@patch.dict(os.environ, {
+    'TABLE_NAME': 'TestTable',
+    'ROLLUP_TABLE_NAME': 'RollupTable',
+    'ROLLUP_GRANULARITIES': 'minute,hour,day',
+    'ROLLUP_RETENTION': 'minute=3600,hour=86400,day=0'
+})
+class TestRollups(unittest.TestCase):
+    def setUp(self):
+        clients.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+        self.dynamodb.create_table(
+            TableName='RollupTable',
+            KeySchema=[
+                {'AttributeName': 'ID', 'KeyType': 'HASH'},
+                {'AttributeName': 'Bucket', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'ID', 'AttributeType': 'S'},
+                {'AttributeName': 'Bucket', 'AttributeType': 'S'}
+            ],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        clients.reset()
+
+    def get_bucket(self, series, bucket):
+        return self.dynamodb.get_item(
+            TableName='RollupTable',
+            Key={'ID': {'S': series}, 'Bucket': {'S': bucket}}
+        ).get('Item')
+
+    def test_visit_updates_lifetime_and_buckets(self):
+        total = visits.record(self.dynamodb, 'TestTable', now=NOW)
+        total = visits.record(self.dynamodb, 'TestTable', now=NOW)
+
+        self.assertEqual(total, 2)
+        minute = self.get_bucket('page_counter#minute', '2026-10-17T15:30')
+        hour = self.get_bucket('page_counter#hour', '2026-10-17T15')
+        day = self.get_bucket('page_counter#day', '2026-10-17')
+        self.assertEqual(minute['count']['N'], '2')
+        self.assertEqual(hour['count']['N'], '2')
+        self.assertEqual(day['count']['N'], '2')
+
+    def test_fine_grained_buckets_expire(self):
+        visits.record(self.dynamodb, 'TestTable', now=NOW)
+
+        minute = self.get_bucket('page_counter#minute', '2026-10-17T15:30')
+        hour = self.get_bucket('page_counter#hour', '2026-10-17T15')
+        day = self.get_bucket('page_counter#day', '2026-10-17')
+        minute_end = datetime(2026, 10, 17, 15, 31, tzinfo=timezone.utc).timestamp()
+        hour_end = datetime(2026, 10, 17, 16, tzinfo=timezone.utc).timestamp()
+        self.assertEqual(int(minute['ExpiresAt']['N']), minute_end + 3600)
+        self.assertEqual(int(hour['ExpiresAt']['N']), hour_end + 86400)
+        self.assertNotIn('ExpiresAt', day)
+
+    @patch.dict(os.environ, {'ROLLUP_GRANULARITIES': 'day'})
+    def test_granularities_are_configurable(self):
+        visits.record(self.dynamodb, 'TestTable', now=NOW)
+
+        items = self.dynamodb.scan(TableName='RollupTable')['Items']
+        self.assertEqual([i['ID']['S'] for i in items], ['page_counter#day'])
+
+    def test_series_is_zero_filled_and_uses_query(self):
+        visits.record(self.dynamodb, 'TestTable', now=NOW)
+        visits.record(self.dynamodb, 'TestTable',
+                      now=NOW.replace(hour=17))
+
+        with patch.object(self.dynamodb, 'scan') as scan:
+            points = rollups.series(self.dynamodb, 'page_counter', 'hour',
+                                    NOW.replace(hour=14), NOW.replace(hour=17))
+
+        scan.assert_not_called()
+        self.assertEqual(points, [
+            {'bucket': '2026-10-17T14', 'count': 0},
+            {'bucket': '2026-10-17T15', 'count': 1},
+            {'bucket': '2026-10-17T16', 'count': 0},
+            {'bucket': '2026-10-17T17', 'count': 1},
+        ])
+
+    def test_series_rejects_oversized_range(self):
+        with self.assertRaises(ValueError):
+            rollups.series(self.dynamodb, 'page_counter', 'minute',
+                           NOW.replace(day=1), NOW)
+
+    def test_handlers(self):
+        visit_handler({}, {})
+
+        response = series_handler({'queryStringParameters': {
+            'granularity': 'day',
+            'from': '2000-01-01',
+            'to': '2000-01-03'
+        }}, {})
+        body = json.loads(response['body'])
+
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual([p['count'] for p in body['series']], [0, 0, 0])
+
+        response = series_handler({'queryStringParameters': {'granularity': 'day'}}, {})
+        body = json.loads(response['body'])
+        self.assertEqual(len(body['series']), 24)
+        self.assertEqual(body['series'][-1]['count'], 1)
+
+    def test_series_handler_rejects_bad_input(self):
+        for params in ({'granularity': 'week'}, {'from': 'yesterday'},
+                       {'from': '2026-10-17', 'to': '2026-10-16'}):
+            response = series_handler({'queryStringParameters': params}, {})
+            self.assertEqual(response['statusCode'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
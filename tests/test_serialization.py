@@ -0,0 +1,65 @@
+import os
+import unittest
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import patch
+import json
+
+
+from app import serialization
+from app.lambda_module import _response
+
+
+BODY = {
+    'created': datetime(2024, 3, 1, 12, 30, 5, 123000, tzinfo=timezone.utc),
+    'day': date(2026, 10, 17),
+    'count': Decimal('41'),
+    'ratio': Decimal('0.5'),
+    'name': 'café',
+    'nested': [{'ok': True, 'none': None}]
+}
+
+
+class TestSerialization(unittest.TestCase):
+    def test_backends_agree(self):
+        outputs = set()
+        backends = ['json'] + (['orjson'] if serialization.orjson is not None else [])
+        for backend in backends:
+            with patch.dict(os.environ, {'JSON_BACKEND': backend}):
+                self.assertEqual(serialization.backend(), backend)
+                outputs.add(serialization.dumps(BODY))
+
+        self.assertEqual(len(outputs), 1)
+        self.assertEqual(json.loads(outputs.pop()), {
+            'created': '2024-03-01T12:30:05.123000+00:00',
+            'day': '2026-10-17',
+            'count': 41,
+            'ratio': 0.5,
+            'name': 'café',
+            'nested': [{'ok': True, 'none': None}]
+        })
+
+    @patch.dict(os.environ, {'JSON_BACKEND': 'json'})
+    def test_unknown_types_are_rejected(self):
+        with self.assertRaises(TypeError):
+            serialization.dumps({'value': object()})
+
+    def test_constant_is_passed_through(self):
+        body = serialization.constant({'message': 'Hello World'})
+
+        self.assertEqual(serialization.dumps(body), '{"message":"Hello World"}')
+        self.assertIs(serialization.dumps(body), body)
+
+    def test_response_headers_are_not_shared(self):
+        response = _response(200, {}, {'ETag': '"1"'})
+        response['headers']['X-Extra'] = '1'
+
+        self.assertEqual(serialization.JSON_HEADERS, {
+            'Access-Control-Allow-Origin': '*',
+            'Content-Type': 'application/json'
+        })
+        self.assertNotIn('ETag', _response(200, {})['headers'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import threading
+import unittest
+from unittest.mock import patch
+import boto3
+from moto import mock_aws
+
+
+from app.lambda_module import lambda_handler
+from app.table_cache import cache
+
+
+@mock_aws
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'TABLE_CACHE_TTL': '60'})
+class TestTableMetadataCache(unittest.TestCase):
+    def setUp(self):
+        cache.reset()
+        self.dynamodb = boto3.client('dynamodb')
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        cache.reset()
+
+    def test_describe_table_called_once_per_ttl(self):
+        with patch.object(self.dynamodb, 'describe_table',
+                          wraps=self.dynamodb.describe_table) as describe:
+            for _ in range(5):
+                cache.get(self.dynamodb, 'TestTable')
+
+        self.assertEqual(describe.call_count, 1)
+        self.assertEqual(cache.stats(), {
+            'hits': 4, 'stale_hits': 0, 'misses': 1, 'refreshes': 1
+        })
+
+    def test_expired_entry_is_fetched_again(self):
+        with patch.dict(os.environ, {'TABLE_CACHE_TTL': '0'}):
+            cache.get(self.dynamodb, 'TestTable')
+            cache.get(self.dynamodb, 'TestTable')
+
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_explicit_refresh(self):
+        cache.get(self.dynamodb, 'TestTable')
+        self.dynamodb.update_table(
+            TableName='TestTable',
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 10,
+                'WriteCapacityUnits': 10
+            }
+        )
+
+        stale = cache.get(self.dynamodb, 'TestTable')
+        fresh = cache.refresh(self.dynamodb, 'TestTable')
+
+        self.assertEqual(stale['Table']['ProvisionedThroughput']['ReadCapacityUnits'], 5)
+        self.assertEqual(fresh['Table']['ProvisionedThroughput']['ReadCapacityUnits'], 10)
+
+    @patch.dict(os.environ, {'TABLE_CACHE_TTL': '0',
+                             'TABLE_CACHE_BACKGROUND_REFRESH': '1'})
+    def test_background_refresh_serves_stale_entry(self):
+        first = cache.get(self.dynamodb, 'TestTable')
+        second = cache.get(self.dynamodb, 'TestTable')
+        for thread in threading.enumerate():
+            if thread.daemon and thread.is_alive():
+                thread.join(timeout=5)
+
+        self.assertIs(second, first)
+        stats = cache.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['stale_hits'], 1)
+        self.assertEqual(stats['refreshes'], 2)
+
+    @patch.dict(os.environ, {'HEALTH_DEBUG': '1'})
+    def test_lambda_handler_uses_cache(self):
+        with patch.object(cache, 'refresh', wraps=cache.refresh) as refresh:
+            lambda_handler({}, {})
+            lambda_handler({}, {})
+
+        self.assertEqual(refresh.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
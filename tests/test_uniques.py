@@ -0,0 +1,143 @@
+import os
+import unittest
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+import json
+
+
+from app import clients, uniques
+from app.events import client_fingerprint
+from app.hll import SIZE, HyperLogLog
+from app.lambda_module import uniques_handler, visit_handler
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+MONDAY = datetime(2026, 10, 12, 9, tzinfo=timezone.utc)
+TUESDAY = datetime(2026, 10, 13, 9, tzinfo=timezone.utc)
+
+
+def visit_event(ip, user_agent='Mozilla/5.0'):
+    return {
+        'headers': {'user-agent': user_agent},
+        'requestContext': {'identity': {'sourceIp': ip}}
+    }
+
+
+@patch.dict(os.environ, {'TABLE_NAME': 'TestTable', 'UNIQUE_VISITORS': '1'})
+class TestUniqueVisitors(unittest.TestCase):
+    def setUp(self):
+        uniques.reset()
+        clients.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        uniques.reset()
+        clients.reset()
+
+    def stored_sketch(self, day):
+        item = self.dynamodb.get_item(
+            TableName='TestTable',
+            Key={'ID': {'S': f'page_counter#uniques#{day}'}}
+        )['Item']
+        return HyperLogLog.from_bytes(item['hll']['B']), int(item['version']['N'])
+
+    def test_fingerprint_is_salted_hash(self):
+        event = visit_event('203.0.113.7')
+        fingerprint = client_fingerprint(event)
+
+        self.assertEqual(len(fingerprint), 32)
+        self.assertNotIn(b'203.0.113.7', fingerprint)
+        self.assertEqual(fingerprint, client_fingerprint(visit_event('203.0.113.7')))
+        self.assertNotEqual(fingerprint, client_fingerprint(visit_event('203.0.113.8')))
+        with patch.dict(os.environ, {'FINGERPRINT_SALT': 'pepper'}):
+            self.assertNotEqual(fingerprint, client_fingerprint(event))
+
+    def test_sketch_is_stored_as_fixed_size_binary(self):
+        uniques.observe(self.dynamodb, 'TestTable', b'visitor', now=MONDAY)
+
+        item = self.dynamodb.get_item(
+            TableName='TestTable',
+            Key={'ID': {'S': 'page_counter#uniques#2026-10-12'}}
+        )['Item']
+        self.assertEqual(len(item['hll']['B']), SIZE)
+        self.assertEqual(item['version']['N'], '1')
+
+    def test_repeat_visitor_costs_no_request(self):
+        uniques.observe(self.dynamodb, 'TestTable', b'visitor', now=MONDAY)
+
+        with patch.object(self.dynamodb, 'update_item') as update, \
+                patch.object(self.dynamodb, 'get_item') as get:
+            estimate = uniques.observe(self.dynamodb, 'TestTable', b'visitor', now=MONDAY)
+
+        update.assert_not_called()
+        get.assert_not_called()
+        self.assertEqual(estimate, 1)
+
+    def test_pages_keep_their_own_cached_sketch(self):
+        with patch.object(self.dynamodb, 'get_item', wraps=self.dynamodb.get_item) as get:
+            for key in ('page#a', 'page#b') * 3:
+                uniques.observe(self.dynamodb, 'TestTable', b'visitor', key, now=MONDAY)
+            self.assertEqual(get.call_count, 2)
+
+            uniques.observe(self.dynamodb, 'TestTable', b'visitor', 'page#a', now=TUESDAY)
+
+        self.assertEqual(sorted(uniques._sketches), [('page#a', '2026-10-13')])
+
+    def test_concurrent_containers_merge_on_conflict(self):
+        uniques.observe(self.dynamodb, 'TestTable', b'first', now=MONDAY)
+        stale_cache = dict(uniques._sketches)
+
+        uniques.reset()
+        uniques.observe(self.dynamodb, 'TestTable', b'second', now=MONDAY)
+
+        # A second container still holds the sketch before 'second' arrived.
+        uniques._sketches.clear()
+        uniques._sketches.update(stale_cache)
+        estimate = uniques.observe(self.dynamodb, 'TestTable', b'third', now=MONDAY)
+
+        sketch, version = self.stored_sketch('2026-10-12')
+        expected = HyperLogLog()
+        for value in (b'first', b'second', b'third'):
+            expected.add(value)
+        self.assertEqual(sketch, expected)
+        self.assertEqual(version, 3)
+        self.assertEqual(estimate, 3)
+
+    def test_days_merge_into_range_estimate(self):
+        for i in range(300):
+            uniques.observe(self.dynamodb, 'TestTable', f'visitor-{i}'.encode(), now=MONDAY)
+        for i in range(200, 500):
+            uniques.observe(self.dynamodb, 'TestTable', f'visitor-{i}'.encode(), now=TUESDAY)
+
+        estimate = uniques.unique_visitors(
+            self.dynamodb, 'TestTable', date(2026, 10, 12), date(2026, 10, 14))
+
+        self.assertLess(abs(estimate - 500) / 500, 0.1)
+
+    def test_handlers(self):
+        for ip in ('198.51.100.1', '198.51.100.2', '198.51.100.1'):
+            body = json.loads(visit_handler(visit_event(ip), {})['body'])
+        self.assertEqual(body['unique_visitors_today'], 2)
+
+        response = uniques_handler({}, {})
+        body = json.loads(response['body'])
+        self.assertEqual(response['statusCode'], 200)
+        self.assertEqual(body['unique_visitors'], 2)
+
+        response = uniques_handler({'queryStringParameters': {
+            'from': '2020-01-01', 'to': '2026-01-01'}}, {})
+        self.assertEqual(response['statusCode'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import subprocess
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import json
+
+
+from app import clients, counter, visit_buffer
+from app.lambda_module import visit_handler
+from app.visit_buffer import buffer
+from tests.memory_dynamodb import MemoryDynamoDB
+
+
+@patch.dict(os.environ, {
+    'TABLE_NAME': 'TestTable',
+    'VISIT_BUFFERING': '1',
+    'VISIT_BUFFER_MAX_COUNT': '5',
+    'VISIT_BUFFER_MAX_AGE': '60'
+})
+class TestVisitBuffer(unittest.TestCase):
+    def setUp(self):
+        buffer.reset()
+        self.dynamodb = MemoryDynamoDB()
+        clients.register('dynamodb', self.dynamodb)
+        self.dynamodb.create_table(
+            TableName='TestTable',
+            KeySchema=[{'AttributeName': 'ID', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'ID', 'AttributeType': 'S'}],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        )
+
+    def tearDown(self):
+        buffer.reset()
+        clients.reset()
+
+    def stored_count(self):
+        return counter.read_total(self.dynamodb, 'TestTable', consistent=True)
+
+    def test_first_visit_is_written_through(self):
+        body = json.loads(visit_handler({}, {})['body'])
+
+        self.assertEqual(body['updated_value'], '1')
+        self.assertFalse(body['estimated'])
+        self.assertEqual(self.stored_count(), 1)
+
+    def test_visits_are_coalesced_until_count_threshold(self):
+        visit_handler({}, {})
+        bodies = [json.loads(visit_handler({}, {})['body']) for _ in range(5)]
+
+        self.assertEqual([b['updated_value'] for b in bodies[:4]], ['2', '3', '4', '5'])
+        self.assertTrue(all(b['estimated'] for b in bodies[:4]))
+        self.assertEqual(self.stored_count(), 6)
+        self.assertEqual(bodies[4], {
+            'message': 'Update successful',
+            'updated_value': '6',
+            'estimated': False
+        })
+
+    @patch.dict(os.environ, {'VISIT_BUFFER_MAX_AGE': '0'})
+    def test_age_threshold_flushes(self):
+        visit_handler({}, {})
+        body = json.loads(visit_handler({}, {})['body'])
+
+        self.assertFalse(body['estimated'])
+        self.assertEqual(self.stored_count(), 2)
+
+    def test_explicit_flush_writes_pending_visits(self):
+        for _ in range(3):
+            visit_handler({}, {})
+        self.assertEqual(buffer.pending(), 2)
+
+        buffer.flush()
+
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(self.stored_count(), 3)
+        self.assertEqual(buffer.last_count(), 3)
+
+    def test_failed_flush_keeps_pending_visits(self):
+        for _ in range(3):
+            visit_handler({}, {})
+
+        with patch('app.visits.record', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                buffer.flush()
+
+        self.assertEqual(buffer.pending(), 2)
+
+
+class RuntimeAPI(BaseHTTPRequestHandler):
+    """Answers extension registration; ``next`` fails so the thread ends."""
+
+    requests = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.requests.append((self.path, self.headers['Lambda-Extension-Name'],
+                              json.loads(body)))
+        self.send_response(200)
+        self.send_header('Lambda-Extension-Identifier', 'ext-1')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers['Lambda-Extension-Identifier'], None))
+        self.send_error(500)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestShutdownExtension(unittest.TestCase):
+    def test_handler_module_import_does_not_load_urllib(self):
+        result = subprocess.run(
+            [sys.executable, '-c',
+             'import sys, app.lambda_module; print("urllib.request" in sys.modules)'],
+            capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), 'False')
+
+    def test_not_registered_outside_lambda(self):
+        with patch.dict(os.environ, {'AWS_LAMBDA_RUNTIME_API': ''}):
+            self.assertFalse(visit_buffer.register_extension())
+
+    def test_registers_with_no_events_and_installs_hooks(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), RuntimeAPI)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        RuntimeAPI.requests = []
+        api = f'127.0.0.1:{server.server_port}'
+
+        with patch.dict(os.environ, {'AWS_LAMBDA_RUNTIME_API': api}), \
+                patch.object(visit_buffer, '_install_shutdown_hooks') as install, \
+                patch('builtins.print'):
+            self.assertTrue(visit_buffer.register_extension())
+            for thread in threading.enumerate():
+                if thread.name == visit_buffer.EXTENSION_NAME:
+                    thread.join(5)
+
+        install.assert_called_once()
+        self.assertEqual(RuntimeAPI.requests, [
+            ('/2020-01-01/extension/register', 'visit-buffer', {'events': []}),
+            ('/2020-01-01/extension/event/next', 'ext-1', None),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()